@@ -2,7 +2,21 @@
 #Description-Parametrically drive a user parameter
 
 import adsk.core, adsk.fusion, adsk.cam, traceback
-import csv, os, re
+import math, os, tempfile
+
+from .paraparamlib.sweep import SweepPlan, ShardedPlan, variantStem, ORDERS, ORDER_NESTED, SHARD_MODES
+from .paraparamlib.progress import REFRESH_MODES, REFRESH_ALWAYS
+from .paraparamlib.settings import SweepSettings, SettingsError, STL_FORMATS, MESH_REFINEMENTS, MESH_HIGH, MESH_MEDIUM, MESH_LOW, MESH_CUSTOM, ACCURACY_LOW, ACCURACY_MEDIUM, ACCURACY_HIGH, ACCURACY_VERY_HIGH
+from .paraparamlib.manifest import variantKey, mergeManifests
+from .paraparamlib.journal import SweepJournal, JournalError, loadJournal, isResumable, shardJournalFilename
+from .paraparamlib.postprocess import LAYOUTS, LAYOUT_FLAT
+from .paraparamlib.paramfile import readParamFile, isDesignTable, DesignTable, ParamFileError
+from .paraparamlib.preflight import runPreflight
+from .paraparamlib.sampling import SampledPlan, SAMPLING_GRID
+from .paraparamlib.scheduler import SweepScheduler, Ticker, STATE_PAUSED
+from .paraparamlib.jobs import JobQueue, JobError, POLL_INTERVAL, JOB_DONE, JOB_CANCELLED, JOB_FAILED
+from .paraparamlib.filenames import FilenameTemplate, FilenameError
+from .paraparamlib.runner import SweepRunner, SweepHost, applyVariant, getOperationKey, exportOperations, OPERATIONS, OP_LOOP_ONLY, OP_EXPORT_STL
 
 # Globals
 _app = adsk.core.Application.cast(None)
@@ -11,17 +25,11 @@ _ui = adsk.core.UserInterface.cast(None)
 _exportFolder = ''
 _csvFolder = ''
 
-_OP_LOOP_ONLY = 0
-_OP_EXPORT_FUSION = 1
-_OP_EXPORT_IGES = 2
-_OP_EXPORT_SAT = 3
-_OP_EXPORT_SMT = 4
-_OP_EXPORT_STEP = 5
-_OP_EXPORT_STL = 6
-
-_OPERATIONS = [ "LoopOnly", "ExportFusion", "ExportIGES", "ExportSAT", "ExportSMT", "ExportSTEP", "ExportSTL" ]
 _OPERATIONDEFAULT = "LoopOnly"
 
+_ORDERDEFAULT = ORDER_NESTED
+_REFRESHDEFAULT = REFRESH_ALWAYS
+
 # Command inputs
 _group_inputs = adsk.core.GroupCommandInput.cast(None)
 _paramNameDropDown = adsk.core.DropDownCommandInput.cast(None)
@@ -29,18 +37,78 @@ _valueStartInput = adsk.core.ValueCommandInput.cast(None)
 _valueEndInput = adsk.core.ValueCommandInput.cast(None)
 _valueStepInput = adsk.core.ValueCommandInput.cast(None)
 _operationDropDown = adsk.core.DropDownCommandInput.cast(None)
+_orderDropDown = adsk.core.DropDownCommandInput.cast(None)
+_refreshDropDown = adsk.core.DropDownCommandInput.cast(None)
+_refreshIntervalInput = adsk.core.IntegerSpinnerCommandInput.cast(None)
 _unitsStandardDropDown = adsk.core.DropDownCommandInput.cast(None)
 _exportSTLPerBodyBoolInput = adsk.core.BoolValueCommandInput.cast(None)
 _restoreValuesBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_resumeBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_postProcessGroup = adsk.core.GroupCommandInput.cast(None)
+_postProcessBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_compressBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_validateSTLBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_layoutDropDown = adsk.core.DropDownCommandInput.cast(None)
+_stlGroup = adsk.core.GroupCommandInput.cast(None)
+_stlFormatDropDown = adsk.core.DropDownCommandInput.cast(None)
+_meshRefinementDropDown = adsk.core.DropDownCommandInput.cast(None)
+_surfaceDeviationInput = adsk.core.ValueCommandInput.cast(None)
+_normalDeviationInput = adsk.core.ValueCommandInput.cast(None)
+_maximumEdgeLengthInput = adsk.core.ValueCommandInput.cast(None)
+_aspectRatioInput = adsk.core.ValueCommandInput.cast(None)
+_shardGroup = adsk.core.GroupCommandInput.cast(None)
+_shardIndexInput = adsk.core.IntegerSpinnerCommandInput.cast(None)
+_shardCountInput = adsk.core.IntegerSpinnerCommandInput.cast(None)
+_shardModeDropDown = adsk.core.DropDownCommandInput.cast(None)
+_mergeShardsBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_reportBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_profileBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_preflightBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_backgroundBoolInput = adsk.core.BoolValueCommandInput.cast(None)
+_jobQueueBoolInput = adsk.core.BoolValueCommandInput.cast(None)
 
 _handlers = []
 
+# The sweep running in the background, see startBackgroundSweep
+_scheduler = None
+_sweepTickEvent = None
+_stopping = False
+
+_SWEEP_TICK_EVENT = 'ParaParamSweepTick'
+_PAUSE_COMMAND = 'ParaParamPauseSweep'
+_CANCEL_COMMAND = 'ParaParamCancelSweep'
+_CONTROLS_PANEL = 'SolidScriptsAddinsPanel'
+
+# The spool folder watched for jobs, see startJobQueue
+_jobQueue = None
+_jobTicker = None
+_jobPollEvent = None
+_currentJob = None
+
+_JOB_POLL_EVENT = 'ParaParamJobPoll'
+_STOP_QUEUE_COMMAND = 'ParaParamStopJobQueue'
+
+# Setting this environment variable to a folder starts watching it for jobs
+# when the script is run, without showing the dialog.
+_SPOOL_VARIABLE = 'PARAPARAM_SPOOL'
+
+# Whether the document had unsaved changes before the sweep, it is then never
+# closed to free memory since the changes would be lost.
+_documentModified = True
+
 def run(context):
     try:
         global _app, _ui
         _app = adsk.core.Application.get()
         _ui  = _app.userInterface
 
+        # Run the jobs of the spool folder instead of showing the dialog.
+        spoolFolder = os.environ.get(_SPOOL_VARIABLE, '')
+        if spoolFolder != '':
+            startJobQueue(spoolFolder)
+            adsk.autoTerminate(False)
+            return
+
         cmdDef = _ui.commandDefinitions.itemById('ParaParamPythonScript')
         if not cmdDef:
             # Create a command definition.
@@ -69,11 +137,22 @@ class ParaParamCommandDestroyHandler(adsk.core.CommandEventHandler):
 
             # when the command is done, terminate the script
             # this will release all globals which will remove all event handlers
-            adsk.terminate()
+            # unless a sweep is still running in the background or the job
+            # queue is watched
+            if _scheduler is None and _jobQueue is None:
+                adsk.terminate()
         except:
             if _ui:
                 _ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
+# Returns the value of a ParaParam attribute of the design, or the default
+# if the attribute has not been saved yet.
+def getAttributeValue(des, name, default):
+    attrib = des.attributes.itemByName('ParaParam', name)
+    if attrib:
+        return attrib.value
+    return default
+
 # Verifies that a value command input has a valid expression and returns the 
 # value if it does.  Otherwise it returns False.  This works around a 
 # problem where when you get the value from a ValueCommandInput it causes the
@@ -113,7 +192,7 @@ class ParaParamCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
                 _ui.messageBox('A Fusion design must be active when invoking this command.')
                 return()
                 
-            global _exportFolder, _csvFolder, _group_inputs, _paramNameDropDown, _valueStartInput, _valueEndInput, _valueStepInput, _operationDropDown, _unitsStandardDropDown, _exportSTLPerBodyBoolInput, _restoreValuesBoolInput, _errMessage
+            global _exportFolder, _csvFolder, _group_inputs, _paramNameDropDown, _valueStartInput, _valueEndInput, _valueStepInput, _operationDropDown, _orderDropDown, _refreshDropDown, _refreshIntervalInput, _unitsStandardDropDown, _exportSTLPerBodyBoolInput, _restoreValuesBoolInput, _resumeBoolInput, _postProcessGroup, _postProcessBoolInput, _compressBoolInput, _validateSTLBoolInput, _layoutDropDown, _stlGroup, _stlFormatDropDown, _meshRefinementDropDown, _surfaceDeviationInput, _normalDeviationInput, _maximumEdgeLengthInput, _aspectRatioInput, _shardGroup, _shardIndexInput, _shardCountInput, _shardModeDropDown, _mergeShardsBoolInput, _reportBoolInput, _profileBoolInput, _preflightBoolInput, _backgroundBoolInput, _jobQueueBoolInput, _errMessage
 
             paramName = ''
             paramNameAttrib = des.attributes.itemByName('ParaParam', 'paramName')
@@ -140,6 +219,21 @@ class ParaParamCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             if operationAttrib:
                 operationSetting = operationAttrib.value
             
+            orderSetting = _ORDERDEFAULT
+            orderAttrib = des.attributes.itemByName('ParaParam', 'order')
+            if orderAttrib:
+                orderSetting = orderAttrib.value
+
+            refreshSetting = _REFRESHDEFAULT
+            refreshAttrib = des.attributes.itemByName('ParaParam', 'refreshMode')
+            if refreshAttrib:
+                refreshSetting = refreshAttrib.value
+
+            refreshIntervalSetting = 1
+            refreshIntervalAttrib = des.attributes.itemByName('ParaParam', 'refreshInterval')
+            if refreshIntervalAttrib:
+                refreshIntervalSetting = int(refreshIntervalAttrib.value)
+
             exportSTLPerBodySetting = True
             exportSTLPerBodyAttrib = des.attributes.itemByName('ParaParam', 'exportSTLPerBody')
             if exportSTLPerBodyAttrib:
@@ -150,6 +244,27 @@ class ParaParamCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             if restoreValuesAttrib:
                 restoreValuesSetting = restoreValuesAttrib.value == 'True'
 
+            postProcessSetting = getAttributeValue(des, 'postProcess', 'False') == 'True'
+            compressSetting = getAttributeValue(des, 'compress', 'False') == 'True'
+            validateSTLSetting = getAttributeValue(des, 'validateSTL', 'False') == 'True'
+            layoutSetting = getAttributeValue(des, 'layout', LAYOUT_FLAT)
+
+            defaults = SweepSettings()
+            stlFormatSetting = getAttributeValue(des, 'stlFormat', defaults.stlFormat)
+            meshRefinementSetting = getAttributeValue(des, 'meshRefinement', defaults.meshRefinement)
+            surfaceDeviationSetting = float(getAttributeValue(des, 'surfaceDeviation', defaults.surfaceDeviation))
+            normalDeviationSetting = float(getAttributeValue(des, 'normalDeviation', defaults.normalDeviation))
+            maximumEdgeLengthSetting = float(getAttributeValue(des, 'maximumEdgeLength', defaults.maximumEdgeLength))
+            aspectRatioSetting = float(getAttributeValue(des, 'aspectRatio', defaults.aspectRatio))
+
+            shardIndexSetting = int(getAttributeValue(des, 'shardIndex', defaults.shardIndex))
+            shardCountSetting = int(getAttributeValue(des, 'shardCount', defaults.shardCount))
+            shardModeSetting = getAttributeValue(des, 'shardMode', defaults.shardMode)
+
+            reportSetting = getAttributeValue(des, 'report', 'False') == 'True'
+            preflightSetting = getAttributeValue(des, 'preflight', 'False') == 'True'
+            backgroundSetting = getAttributeValue(des, 'background', 'False') == 'True'
+
             _exportFolder = ''
             exportFolderAttrib = des.attributes.itemByName('ParaParam', 'exportFolder')
             if exportFolderAttrib:
@@ -193,16 +308,92 @@ class ParaParamCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             _group_inputs.isExpanded = paramName != ''
             _group_inputs.isEnabled = True
 
-            _operationDropDown = inputs.addDropDownCommandInput('operation', 'Operation', adsk.core.DropDownStyles.TextListDropDownStyle)
-            for operation in _OPERATIONS:
-                if operation == operationSetting:
+            # Several export operations may be checked, they are all done
+            # after a single compute of each variant.
+            operationSettings = operationSetting.split(',')
+            _operationDropDown = inputs.addDropDownCommandInput('operation', 'Operation', adsk.core.DropDownStyles.CheckBoxDropDownStyle)
+            for operation in OPERATIONS:
+                if operation in operationSettings:
                     _operationDropDown.listItems.add(operation, True)
                 else:
                     _operationDropDown.listItems.add(operation, False)
 
+            _orderDropDown = inputs.addDropDownCommandInput('order', 'Order', adsk.core.DropDownStyles.TextListDropDownStyle)
+            for order in ORDERS:
+                _orderDropDown.listItems.add(order, order == orderSetting)
+
+            # Refreshing the viewport after every iteration is slow for large
+            # models so allow it to be throttled or turned off.
+            _refreshDropDown = inputs.addDropDownCommandInput('refreshMode', 'Viewport Refresh', adsk.core.DropDownStyles.TextListDropDownStyle)
+            for refreshMode in REFRESH_MODES:
+                _refreshDropDown.listItems.add(refreshMode, refreshMode == refreshSetting)
+
+            _refreshIntervalInput = inputs.addIntegerSpinnerCommandInput('refreshInterval', 'Refresh Interval (N or T)', 1, 100000, 1, refreshIntervalSetting)
+
             _exportSTLPerBodyBoolInput = inputs.addBoolValueInput('exportSTLPerBody', 'Export STL Per Body', True, '', exportSTLPerBodySetting)
 
+            # STL export options
+            _stlGroup = inputs.addGroupCommandInput('stlGroup', 'STL Options')
+            _stlFormatDropDown = _stlGroup.children.addDropDownCommandInput('stlFormat', 'Format', adsk.core.DropDownStyles.TextListDropDownStyle)
+            for stlFormat in STL_FORMATS:
+                _stlFormatDropDown.listItems.add(stlFormat, stlFormat == stlFormatSetting)
+            _meshRefinementDropDown = _stlGroup.children.addDropDownCommandInput('meshRefinement', 'Refinement', adsk.core.DropDownStyles.TextListDropDownStyle)
+            for meshRefinement in MESH_REFINEMENTS:
+                _meshRefinementDropDown.listItems.add(meshRefinement, meshRefinement == meshRefinementSetting)
+
+            # The custom refinement tolerances.  Lengths are stored in cm
+            # and the normal deviation in degrees.
+            _surfaceDeviationInput = _stlGroup.children.addValueInput('surfaceDeviation', 'Surface Deviation', 'cm', adsk.core.ValueInput.createByReal(surfaceDeviationSetting))
+            _normalDeviationInput = _stlGroup.children.addValueInput('normalDeviation', 'Normal Deviation', 'deg', adsk.core.ValueInput.createByReal(math.radians(normalDeviationSetting)))
+            _maximumEdgeLengthInput = _stlGroup.children.addValueInput('maximumEdgeLength', 'Maximum Edge Length', 'cm', adsk.core.ValueInput.createByReal(maximumEdgeLengthSetting))
+            _aspectRatioInput = _stlGroup.children.addValueInput('aspectRatio', 'Aspect Ratio', '', adsk.core.ValueInput.createByReal(aspectRatioSetting))
+            updateMeshRefinementInputs()
+
+            _stlGroup.isExpanded = OPERATIONS[OP_EXPORT_STL] in operationSettings
+
+            # Split the sweep between several Fusion sessions, each one
+            # processes a disjoint part of the variants.
+            _shardGroup = inputs.addGroupCommandInput('shardGroup', 'Sharding')
+            _shardIndexInput = _shardGroup.children.addIntegerSpinnerCommandInput('shardIndex', 'Shard', 1, 1000, 1, shardIndexSetting)
+            _shardCountInput = _shardGroup.children.addIntegerSpinnerCommandInput('shardCount', 'Shard Count', 1, 1000, 1, shardCountSetting)
+            _shardModeDropDown = _shardGroup.children.addDropDownCommandInput('shardMode', 'Shard Mode', adsk.core.DropDownStyles.TextListDropDownStyle)
+            for shardMode in SHARD_MODES:
+                _shardModeDropDown.listItems.add(shardMode, shardMode == shardModeSetting)
+            _mergeShardsBoolInput = _shardGroup.children.addBoolValueInput('mergeShards', 'Merge Shard Manifests', True, '', False)
+            _shardGroup.isExpanded = shardCountSetting > 1
+
             _restoreValuesBoolInput = inputs.addBoolValueInput('restoreValues', 'Restore Values', True, '', restoreValuesSetting)
+
+            # Time each phase of the sweep loop, and optionally profile this
+            # one run.
+            _reportBoolInput = inputs.addBoolValueInput('report', 'Write Run Report', True, '', reportSetting)
+            _profileBoolInput = inputs.addBoolValueInput('profile', 'Profile Run', True, '', False)
+
+            # Check the sweep and estimate its duration before starting it.
+            _preflightBoolInput = inputs.addBoolValueInput('preflight', 'Pre-flight Check', True, '', preflightSetting)
+
+            # Keep Fusion usable while the sweep runs, with commands to
+            # pause, resume and cancel it.
+            _backgroundBoolInput = inputs.addBoolValueInput('background', 'Run in Background', True, '', backgroundSetting)
+
+            # Optional work done on the exported files by background threads
+            # while the next variant is computed.
+            _postProcessGroup = inputs.addGroupCommandInput('postProcessGroup', 'Post-Processing')
+            _postProcessBoolInput = _postProcessGroup.children.addBoolValueInput('postProcess', 'Background Post-Processing', True, '', postProcessSetting)
+            _compressBoolInput = _postProcessGroup.children.addBoolValueInput('compress', 'Compress (gzip)', True, '', compressSetting)
+            _validateSTLBoolInput = _postProcessGroup.children.addBoolValueInput('validateSTL', 'Validate STL Files', True, '', validateSTLSetting)
+            _layoutDropDown = _postProcessGroup.children.addDropDownCommandInput('layout', 'Folder Layout', adsk.core.DropDownStyles.TextListDropDownStyle)
+            for layout in LAYOUTS:
+                _layoutDropDown.listItems.add(layout, layout == layoutSetting)
+            _postProcessGroup.isExpanded = postProcessSetting
+
+            # Only offer to resume if the journal of an unfinished sweep exists.
+            journalAttrib = des.attributes.itemByName('ParaParam', 'journalFile')
+            _resumeBoolInput = inputs.addBoolValueInput('resume', 'Resume Previous Sweep', True, '', False)
+            _resumeBoolInput.isEnabled = journalAttrib is not None and isResumable(journalAttrib.value)
+
+            # Run the sweeps submitted as job files instead, see startJobQueue.
+            _jobQueueBoolInput = inputs.addBoolValueInput('jobQueue', 'Watch Job Queue', True, '', False)
             
             _errMessage = inputs.addTextBoxCommandInput('errMessage', '', '', 2, True)
             _errMessage.isFullWidth = True
@@ -233,9 +424,24 @@ class ParaParamCommandExecuteHandler(adsk.core.CommandEventHandler):
     def __init__(self):
         super().__init__()
     def notify(self, args):
+        global _documentModified
         try:
             eventArgs = adsk.core.CommandEventArgs.cast(args)
 
+            # Before the attributes below change the document
+            _documentModified = _app.activeDocument.isModified
+
+            # Continue the sweep recorded in the journal, the settings are
+            # those of the original sweep.
+            if _resumeBoolInput.value:
+                resumeParaParam()
+                return
+
+            # Watch a spool folder for jobs, the dialog values are not used.
+            if _jobQueueBoolInput.value:
+                watchJobQueue()
+                return
+
             # Save the current values as attributes.
             des = adsk.fusion.Design.cast(_app.activeProduct)
             attribs = des.attributes
@@ -247,7 +453,11 @@ class ParaParamCommandExecuteHandler(adsk.core.CommandEventHandler):
             else:
                 attribs.add('ParaParam', 'paramName', '')
 
-            attribs.add('ParaParam', 'operation', _operationDropDown.selectedItem.name)
+            operations = getSelectedOperations()
+            attribs.add('ParaParam', 'operation', ','.join(operations) if len(operations) > 0 else OPERATIONS[OP_LOOP_ONLY])
+            attribs.add('ParaParam', 'order', _orderDropDown.selectedItem.name)
+            attribs.add('ParaParam', 'refreshMode', _refreshDropDown.selectedItem.name)
+            attribs.add('ParaParam', 'refreshInterval', str(_refreshIntervalInput.value))
 
             attribs.add('ParaParam', 'startValue', str(_valueStartInput.value))
             attribs.add('ParaParam', 'endValue', str(_valueEndInput.value))
@@ -255,9 +465,49 @@ class ParaParamCommandExecuteHandler(adsk.core.CommandEventHandler):
 
             attribs.add('ParaParam', 'exportSTLPerBody', str(_exportSTLPerBodyBoolInput.value))
             attribs.add('ParaParam', 'restoreValues', str(_restoreValuesBoolInput.value))
+            attribs.add('ParaParam', 'report', str(_reportBoolInput.value))
+            attribs.add('ParaParam', 'preflight', str(_preflightBoolInput.value))
+            attribs.add('ParaParam', 'background', str(_backgroundBoolInput.value))
+
+            attribs.add('ParaParam', 'postProcess', str(_postProcessBoolInput.value))
+            attribs.add('ParaParam', 'compress', str(_compressBoolInput.value))
+            attribs.add('ParaParam', 'validateSTL', str(_validateSTLBoolInput.value))
+            attribs.add('ParaParam', 'layout', _layoutDropDown.selectedItem.name)
+
+            attribs.add('ParaParam', 'stlFormat', _stlFormatDropDown.selectedItem.name)
+            attribs.add('ParaParam', 'meshRefinement', _meshRefinementDropDown.selectedItem.name)
+            attribs.add('ParaParam', 'surfaceDeviation', str(_surfaceDeviationInput.value))
+            attribs.add('ParaParam', 'normalDeviation', str(math.degrees(_normalDeviationInput.value)))
+            attribs.add('ParaParam', 'maximumEdgeLength', str(_maximumEdgeLengthInput.value))
+            attribs.add('ParaParam', 'aspectRatio', str(_aspectRatioInput.value))
+
+            attribs.add('ParaParam', 'shardIndex', str(_shardIndexInput.value))
+            attribs.add('ParaParam', 'shardCount', str(_shardCountInput.value))
+            attribs.add('ParaParam', 'shardMode', _shardModeDropDown.selectedItem.name)
 
             # Get the current values.
-            operation = _operationDropDown.selectedItem.name
+            settings = SweepSettings()
+            settings.order = _orderDropDown.selectedItem.name
+            settings.refreshMode = _refreshDropDown.selectedItem.name
+            settings.refreshInterval = _refreshIntervalInput.value
+            settings.postProcess = _postProcessBoolInput.value
+            settings.compress = _compressBoolInput.value
+            settings.validateSTL = _validateSTLBoolInput.value
+            settings.layout = _layoutDropDown.selectedItem.name
+            settings.stlFormat = _stlFormatDropDown.selectedItem.name
+            settings.meshRefinement = _meshRefinementDropDown.selectedItem.name
+            settings.surfaceDeviation = _surfaceDeviationInput.value
+            settings.normalDeviation = math.degrees(_normalDeviationInput.value)
+            settings.maximumEdgeLength = _maximumEdgeLengthInput.value
+            settings.aspectRatio = _aspectRatioInput.value
+            settings.shardIndex = _shardIndexInput.value
+            settings.shardCount = _shardCountInput.value
+            settings.shardMode = _shardModeDropDown.selectedItem.name
+            settings.mergeShards = _mergeShardsBoolInput.value
+            settings.report = _reportBoolInput.value
+            settings.profile = _profileBoolInput.value
+            settings.preflight = _preflightBoolInput.value
+            settings.background = _backgroundBoolInput.value
             if _paramNameDropDown.selectedItem.index > 0:
                 userParamName = _paramNameDropDown.selectedItem.name
             else:
@@ -269,7 +519,7 @@ class ParaParamCommandExecuteHandler(adsk.core.CommandEventHandler):
             restoreValues = _restoreValuesBoolInput.value 
 
             # Perform the operation.
-            doParaParam(operation, userParamName, startValue, endValue, stepValue, exportSTLPerBody, restoreValues)
+            doParaParam(operations, userParamName, startValue, endValue, stepValue, exportSTLPerBody, restoreValues, settings)
 
         except:
             if _ui:
@@ -295,11 +545,32 @@ class ParaParamCommandInputChangedHandler(adsk.core.InputChangedEventHandler):
                     #_group_inputs.isEnabled = True
                     _group_inputs.isExpanded = True
 
+            elif changedInput.id == 'meshRefinement':
+                updateMeshRefinementInputs()
+
         except:
             if _ui:
                 _ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
         
         
+# The export operations checked in the dialog.  LoopOnly is implied when no
+# export is checked.
+def getSelectedOperations():
+    operations = []
+    for i in range(_operationDropDown.listItems.count):
+        listItem = _operationDropDown.listItems.item(i)
+        if listItem.isSelected and listItem.name != OPERATIONS[OP_LOOP_ONLY]:
+            operations.append(listItem.name)
+    return operations
+
+# The tolerance inputs are only used by the custom mesh refinement.
+def updateMeshRefinementInputs():
+    isCustom = _meshRefinementDropDown.selectedItem.name == MESH_CUSTOM
+    _surfaceDeviationInput.isVisible = isCustom
+    _normalDeviationInput.isVisible = isCustom
+    _maximumEdgeLengthInput.isVisible = isCustom
+    _aspectRatioInput.isVisible = isCustom
+
 # Event handler for the validateInputs event.
 class ParaParamCommandValidateInputsHandler(adsk.core.ValidateInputsEventHandler):
     def __init__(self):
@@ -310,6 +581,11 @@ class ParaParamCommandValidateInputsHandler(adsk.core.ValidateInputsEventHandler
             
             _errMessage.text = ''
 
+            # The dialog values are not used when resuming or watching the
+            # job queue.
+            if _resumeBoolInput.value or _jobQueueBoolInput.value:
+                return
+
             # User param selected or use param CSV file?
             param_index = _paramNameDropDown.selectedItem.index
             if param_index < 0:
@@ -317,6 +593,12 @@ class ParaParamCommandValidateInputsHandler(adsk.core.ValidateInputsEventHandler
                 eventArgs.areInputsValid = False
                 return
 
+            # Verify that the shard is one of the shards.
+            if _shardIndexInput.value > _shardCountInput.value:
+                _errMessage.text = 'The shard must be between 1 and the shard count.'
+                eventArgs.areInputsValid = False
+                return
+
             # Verify that start value != end value.
             if _valueStartInput.value == _valueEndInput.value:
                 _errMessage.text = 'The start value must be different than end value.'
@@ -340,13 +622,6 @@ class ParaParamCommandValidateInputsHandler(adsk.core.ValidateInputsEventHandler
             if _ui:
                 _ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
-def is_number(s):
-    try:
-        float(s)
-        return True
-    except ValueError:
-        return False
-    
 def getCSVFile():
     try:
 
@@ -365,191 +640,170 @@ def getCSVFile():
         # Show file open dialog
         dlgResult = fileDlg.showOpen()
         if dlgResult != adsk.core.DialogResults.DialogOK:
-            return []
+            return [], {}, None
 
         # Save the current folder values as attributes.
         attribs = des.attributes
         _csvFolder = os.path.dirname(fileDlg.filename)
         attribs.add('ParaParam', 'csvFolder', _csvFolder)
 
-        # Get the CSV file.
-        csv_params = []
-        with open(fileDlg.filename) as csv_file:
-
-            reader = csv.reader(csv_file)
-
-            # Skip the header row.
-            #next(reader)
-
-            for csv_row in reader:
-                # Validate the row.
-                if len(csv_row) != 4:
-                    _ui.messageBox("Values missing in line - File: '" + fileDlg.filename + "' - Line '" + str(csv_row) + "'")
-                    return []
-                
-                for i in range(3):
-                    if is_number(csv_row[i+1]) == False:
-                        _ui.messageBox("Invalid value - File: " + fileDlg.filename + " - Line: '" + str(csv_row) + "'")
-                        return []
-
-                # Add the row to the list but convert the values to floats.
-                csv_params.append([csv_row[0], float(csv_row[1]), float(csv_row[2]), float(csv_row[3])])
-
-        return csv_params
+        # Get the CSV file.  A design table is only indexed here, its rows
+        # are read as the sweep reaches them.
+        try:
+            if isDesignTable(fileDlg.filename):
+                designTable = DesignTable(fileDlg.filename)
+                return [], designTable.options, designTable
+            csv_params, csv_options = readParamFile(fileDlg.filename)
+            return csv_params, csv_options, None
+        except ParamFileError as error:
+            _ui.messageBox(str(error))
+            return [], {}, None
     
     except:
         if _ui:
             _ui.messageBox('ParaParam Failed:\n{}'.format(traceback.format_exc()))
+        return [], {}, None
+
+# Write a message to the Text Commands window.
+def log(message):
+    _app.log(message)
+
+_MESH_REFINEMENT_SETTINGS = {
+    MESH_HIGH: adsk.fusion.MeshRefinementSettings.MeshRefinementHigh,
+    MESH_MEDIUM: adsk.fusion.MeshRefinementSettings.MeshRefinementMedium,
+    MESH_LOW: adsk.fusion.MeshRefinementSettings.MeshRefinementLow,
+    MESH_CUSTOM: adsk.fusion.MeshRefinementSettings.MeshRefinementCustom,
+}
+
+_CALCULATION_ACCURACIES = {
+    ACCURACY_LOW: adsk.fusion.CalculationAccuracy.LowCalculationAccuracy,
+    ACCURACY_MEDIUM: adsk.fusion.CalculationAccuracy.MediumCalculationAccuracy,
+    ACCURACY_HIGH: adsk.fusion.CalculationAccuracy.HighCalculationAccuracy,
+    ACCURACY_VERY_HIGH: adsk.fusion.CalculationAccuracy.VeryHighCalculationAccuracy,
+}
+
+# The services of Fusion used by the sweep runner.
+class FusionSweepHost(SweepHost):
+    # The document is kept since another one may be activated while a
+    # sweep runs in the background.
+    def __init__(self):
+        self.document = _app.activeDocument
 
-# crappy Python doesn't support float ranges.
-# This is a custom range function that supports floats and also 
-# negative increments.
-def decimal_range(start, stop, increment):
-    if increment > 0:
-        while start <= stop: # and not math.isclose(start, stop): Py>3.5
-            yield start
-            start += increment
-    else:
-        while start >= stop:
-            yield start
-            start += increment
-
-# Now begin the param updates.  This is a recursive function which will
-# iterate over each param and update.
-def updateParams(paraParams, paramIndex, paramValues, exportSTLPerBody, operation):
-
-    global _OP_LOOP_ONLY, _OP_EXPORT_FUSION, _OP_EXPORT_IGES, _OP_EXPORT_SAT, _OP_EXPORT_SMT, _OP_EXPORT_STEP, _OP_EXPORT_STL
-    global _exportFolder
-
-    curParam = paraParams[paramIndex]
-
-    curParamName = curParam[0]
-    curParamStart = curParam[1]
-    curParamEnd = curParam[2]
-    curParamStep = curParam[3]
-
-    # Reverse the step if the start is greater than the end
-    if curParamStart > curParamEnd:
-        curParamStep = -curParamStep
-
-    # Get the actual parameter to modify
-    des = adsk.fusion.Design.cast(_app.activeProduct)
-    userParam = des.userParameters.itemByName(curParamName)
-    if userParam is None:
-        return False
-
-    # Create the list of param names that will be used to build the filename
-    # REVIEW: Better name based on all params?
-    # REVIEW: Clean names for valid filenames?
-    parentParamNameVals = ''
-    for i in range(len(paraParams) - 1):
-        parentParamName = paraParams[i][0]
-        if parentParamNameVals != '':
-            parentParamNameVals += '_'
-        parentParamNameVals += parentParamName + '_' + str(paramValues[parentParamName])
-
-    if parentParamNameVals != '':
-        parentParamNameVals += '_'
-    parentParamNameVals += curParamName
-
-    parentParamNameVals = re.sub(r"\s+", '_', parentParamNameVals)
-    parentParamNameVals = parentParamNameVals.replace('.', '_')
-
-    resExport = 0
-
-    # Loop from valueStart to valueEnd incrementing by valueStep
-    for val in decimal_range(curParamStart, curParamEnd, curParamStep):
+    def documentName(self):
+        return self.document.name
 
-        # NOTE: setting the 'value' property does not change the value.  Must set expression.
-        # REVIEW: Handle unit conversion?
-        userParam.expression = str(val); # + ' cm';
+    # The version of the active document, used to tell exports of different
+    # versions of the design apart in the export manifest.
+    def designVersion(self):
+        try:
+            dataFile = self.document.dataFile
+            if dataFile:
+                return 'v' + str(dataFile.versionNumber)
+        except:
+            pass
+        return 'unsaved'
 
-        # Track in running values
-        paramValues[curParamName] = userParam.expression
+    def log(self, message):
+        log(message)
 
-        adsk.doEvents() # Allow UI to update
+    def showMessage(self, message):
+        _ui.messageBox(message)
 
-        _app.activeViewport.refresh() # Force viewport to update
+    def doEvents(self):
+        adsk.doEvents()
 
-        # If exporting then we need to build the name for this iteration
-        # HACK: Really need to come up with a better way to do this.
-        exportFilename = ''
-        if _exportFolder != None and _exportFolder != '':
-            # REVIEW: Better name based on all params?
-            exportFilename = _exportFolder + '/' + _app.activeDocument.name + '_' + parentParamNameVals + '_' + str(val).replace('.', '_')
+    def refreshViewport(self):
+        _app.activeViewport.refresh()
 
-        # Is this a leaf node?
-        if paramIndex == len(paramValues) - 1:
+    def showProgress(self, message, total):
+        progressDialog = _ui.createProgressDialog()
+        progressDialog.isCancelButtonShown = True
+        progressDialog.cancelButtonText = 'Cancel'
+        progressDialog.show('ParaParam', message, 0, total, 1)
+        return progressDialog
 
-            # Yes, so perform the operation specified.
-            exportMgr = des.exportManager
+    def meshRefinement(self, name):
+        return _MESH_REFINEMENT_SETTINGS[name]
 
-            if operation == _OPERATIONS[_OP_LOOP_ONLY]:
-                # Do nothing
-                pass
-            elif operation == _OPERATIONS[_OP_EXPORT_FUSION]:
-                fusionArchiveOptions = exportMgr.createFusionArchiveExportOptions(exportFilename+'.f3d')
-                resExport = exportMgr.execute(fusionArchiveOptions)
-            elif operation == _OPERATIONS[_OP_EXPORT_IGES]:
-                igesOptions = exportMgr.createIGESExportOptions(exportFilename+'.igs')
-                resExport = exportMgr.execute(igesOptions)
-            elif operation == _OPERATIONS[_OP_EXPORT_SAT]:
-                satOptions = exportMgr.createSATExportOptions(exportFilename+'.sat')
-                resExport = exportMgr.execute(satOptions)
-            elif operation == _OPERATIONS[_OP_EXPORT_SMT]:
-                smtOptions = exportMgr.createSMTExportOptions(exportFilename+'.smt')
-                resExport = exportMgr.execute(smtOptions)
-            elif operation == _OPERATIONS[_OP_EXPORT_STEP]:
-                stepOptions = exportMgr.createSTEPExportOptions(exportFilename+'.step');
-                resExport = exportMgr.execute(stepOptions)
-            elif operation == _OPERATIONS[_OP_EXPORT_STL]:
-                # If exporting per body selected but not bodies, fall back to normal stl export
-                if exportSTLPerBody and des.rootComponent.bRepBodies.count > 0:
-                    bodies = des.rootComponent.bRepBodies
-                    for iBodies in range(bodies.count):
-                        body = bodies.item(iBodies)
-                        bname = body.name
-                        # console.log("STL Export Body '"+body+"' : Name '"+name+"'");
-
-                        # Create a clean filename
-                        exportFilename = _exportFolder + '/' + _app.activeDocument.name + '_' + bname + '_' + parentParamNameVals + '_' + str(val).replace('.', '_') + '.stl'
-
-                        stlOptions = exportMgr.createSTLExportOptions(body, exportFilename)
-                        #stlOptions.isBinaryFormat = True
-                        #stlOptions.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementHigh
-                        resExport = exportMgr.execute(stlOptions)
-                else:
-                    stlOptions = exportMgr.createSTLExportOptions(des.rootComponent, exportFilename + '.stl')
-                    #stlOptions.isBinaryFormat = True
-                    #stlOptions.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementHigh
-                    resExport = exportMgr.execute(stlOptions)
+    def valueInput(self, expression):
+        return adsk.core.ValueInput.createByString(expression)
 
-        else: # Not a leaf node so iterate downward
-            for paramIndex2 in range(paramIndex + 1, len(paramValues)):
-                updateParams(paraParams, paramIndex2, paramValues, False, operation)
+    def calculationAccuracy(self, name):
+        return _CALCULATION_ACCURACIES[name]
 
-def doParaParam(operation, userParamName, startValue, endValue, stepValue, exportSTLPerBody, restoreValues):
+    # Only a saved document without changes of its own is reopened, the
+    # changes of the sweep are not saved.
+    def reopenDocument(self, des):
+        if _documentModified:
+            log('ParaParam: the document had unsaved changes before the sweep, it is not reopened')
+            return None
+        try:
+            dataFile = self.document.dataFile
+        except:
+            dataFile = None
+        if dataFile is None:
+            log('ParaParam: the document is not saved, it can not be reopened')
+            return None
+
+        # Keep the attributes of the sweep, e.g. the journal to resume it.
+        attributes = [(attribute.name, attribute.value) for attribute in des.attributes.itemsByGroup('ParaParam')]
+
+        self.document.close(False)
+        self.document = _app.documents.open(dataFile, True)
+        des = adsk.fusion.Design.cast(self.document.products.itemByProductType('DesignProductType'))
+        for name, value in attributes:
+            des.attributes.add('ParaParam', name, value)
+        return des
+
+    # The features of the timeline in error after the last compute.  Direct
+    # modeling designs have no timeline.
+    def timelineErrors(self, des):
+        errors = []
+        if des.designType != adsk.fusion.DesignTypes.ParametricDesignType:
+            return errors
+        timeline = des.timeline
+        for i in range(timeline.count):
+            timelineObject = timeline.item(i)
+            if timelineObject.healthState == adsk.fusion.FeatureHealthStates.ErrorFeatureHealthState:
+                errors.append((timelineObject.name, timelineObject.errorOrWarningMessage))
+        return errors
+
+
+def doParaParam(operations, userParamName, startValue, endValue, stepValue, exportSTLPerBody, restoreValues, settings=None):
     try:
 
         global _exportFolder
 
         des = adsk.fusion.Design.cast(_app.activeProduct)
 
+        if settings is None:
+            settings = SweepSettings()
+
         paraParams = []
+        designTable = None
 
         # Use param CSV file?
         if userParamName == '':
-            paraParams = getCSVFile()
+            paraParams, csvOptions, designTable = getCSVFile()
+
+            # Settings in the CSV file override the dialog
+            settings.update(csvOptions)
         else:
             # Add single param row to the list.
             paraParams.append([userParamName, startValue, endValue, stepValue])
 
-        if len(paraParams) == 0:
+        if len(paraParams) == 0 and designTable is None:
+            return
+
+        try:
+            settings.validate()
+        except SettingsError as error:
+            _ui.messageBox(str(error))
             return
         
-        # If operation is an export then prompt for folder location and then
+        # If exporting then prompt for folder location and then
         # generate the filename prefix used for the exports.
-        if operation != _OPERATIONS[_OP_LOOP_ONLY]:
+        if len(operations) > 0:
 
             # Prompt for the folder to use for the exports.
             folderDlg = _ui.createFolderDialog()
@@ -564,43 +818,656 @@ def doParaParam(operation, userParamName, startValue, endValue, stepValue, expor
             _exportFolder = folderDlg.folder
             attribs.add('ParaParam', 'exportFolder', _exportFolder)
 
-        # Track current param value (expression) while iterating over all
-        paramValues = {}
-
-        # Get the current param values and also save them so we can restore later
-        userParamValuesOriginal = {}
-        for iParam in range(len(paraParams)):
+        # Combine the results of the shards instead of running a sweep.
+        if settings.mergeShards:
+            if len(exportOperations(operations)) == 0:
+                _ui.messageBox('Merging shard manifests requires an export operation.')
+                return
+            mergeShardManifests(getSweepPlan(paraParams, designTable.filename if designTable else None, settings), operations, exportSTLPerBody, settings)
+            return
 
-            # Get the custom param info
-            curParam = paraParams[iParam]
-            curParamName = curParam[0]
+        try:
+            userParamValuesOriginal = checkSweep(des, operations, paraParams, designTable, exportSTLPerBody, settings)
+        except FilenameError as error:
+            _ui.messageBox(str(error))
+            return
 
-            # Get the actual parameter to modify
-            userParam = des.userParameters.itemByName(curParamName)
-            if userParam is None:
+        # Check the sweep and show its projected cost before starting it.
+        if settings.preflight:
+            plan = getSweepPlan(paraParams, designTable.filename if designTable else None, settings, True)
+            preflight = runPreflight(FusionSweepHost(), des, plan, operations, _exportFolder, exportSTLPerBody, settings, settings.preflightSamples)
+            if preflight.cancelled:
+                return
+            if len(preflight.errors) > 0:
+                _ui.messageBox(preflight.message(), 'ParaParam Pre-flight Check')
+                return
+            dlgResult = _ui.messageBox(preflight.message(), 'ParaParam Pre-flight Check', adsk.core.MessageBoxButtonTypes.OKCancelButtonType, adsk.core.MessageBoxIconTypes.QuestionIconType)
+            if dlgResult != adsk.core.DialogResults.DialogOK:
                 return
 
-            userParamValuesOriginal[curParamName] = userParam.expression
-            paramValues[curParamName] = userParam.expression
+        sweep, journal = createSweep(des, operations, paraParams, designTable, exportSTLPerBody, restoreValues, settings, userParamValuesOriginal)
+        runSweep(sweep, journal, {})
+        return
+    
+    except Exception as error:
+        _ui.messageBox("ParaParam Failed : " + str(error)) 
+        return None
+
+# Check that the sweep can run and return the current values of its
+# parameters, saved so that they can be restored later.  Raises FilenameError
+# for an invalid filename template and ValueError for a missing parameter.
+def checkSweep(des, operations, paraParams, designTable, exportSTLPerBody, settings):
+    if designTable:
+        paramNames = designTable.names
+    else:
+        paramNames = [curParam[0] for curParam in paraParams]
+
+    # Check the filename templates before anything is exported.
+    if len(exportOperations(operations)) > 0:
+        FilenameTemplate(settings.filenameTemplate, paramNames)
+        if exportSTLPerBody and OPERATIONS[OP_EXPORT_STL] in operations:
+            FilenameTemplate(settings.bodyFilenameTemplate, paramNames, True)
+
+    # Get the current param values
+    userParamValuesOriginal = {}
+    for curParamName in paramNames:
+
+        # Get the actual parameter to modify
+        userParam = des.userParameters.itemByName(curParamName)
+        if userParam is None:
+            raise ValueError("The user parameter '" + curParamName + "' does not exist.")
+
+        userParamValuesOriginal[curParamName] = userParam.expression
+    return userParamValuesOriginal
+
+# Start the journal used to resume the sweep if it is interrupted, returns
+# the sweep described by its header and the journal.
+def createSweep(des, operations, paraParams, designTable, exportSTLPerBody, restoreValues, settings, userParamValuesOriginal):
+    sweep = {
+        'operations': operations,
+        'params': paraParams,
+        'table': designTable.filename if designTable else None,
+        'exportSTLPerBody': exportSTLPerBody,
+        'restoreValues': restoreValues,
+        'settings': settings.asDict(),
+        'exportFolder': _exportFolder if len(operations) > 0 else '',
+        'originalValues': userParamValuesOriginal,
+    }
+    journalPath = getJournalPath(operations, settings)
+    journal = SweepJournal.create(journalPath, sweep)
+    des.attributes.add('ParaParam', 'journalFile', journalPath)
+    return sweep, journal
+
+# Resume the sweep recorded in the journal of the active design, skipping the
+# variants that were completed.
+def resumeParaParam():
+    try:
+
+        global _exportFolder
+
+        des = adsk.fusion.Design.cast(_app.activeProduct)
+
+        journalAttrib = des.attributes.itemByName('ParaParam', 'journalFile')
+        if not journalAttrib:
+            _ui.messageBox('There is no previous sweep to resume.')
+            return
+
+        sweep, completed, finished = loadJournal(journalAttrib.value)
+        if finished:
+            _ui.messageBox('The previous sweep has already finished.')
+            return
 
-        # Now begin the param updates.  This is a recursive function which will
-        # iterate over each param and update.  It's really just a way of doing
-        # the following but for an arbitrary number of params:
-        # for i in range(iCount)
-        #   for j in range(jCount)
-        #     for k in range(kCount)
-        #       print(value(i,j,k))
-        updateParams(paraParams, 0, paramValues, exportSTLPerBody, operation)
+        _exportFolder = sweep['exportFolder']
 
+        journal = SweepJournal.reopen(journalAttrib.value)
+        runSweep(sweep, journal, completed)
+        return
+
+    except JournalError as error:
+        _ui.messageBox("ParaParam Failed : " + str(error))
+        return None
+    except Exception as error:
+        _ui.messageBox("ParaParam Failed : " + str(error))
+        return None
+
+# The journal is kept with the exports, or in the temp folder when there
+# is nothing exported.
+def getJournalPath(operations, settings):
+    journalFilename = shardJournalFilename(settings.shardIndex, settings.shardCount)
+    if len(operations) > 0:
+        return os.path.join(_exportFolder, journalFilename)
+
+    journalFolder = os.path.join(tempfile.gettempdir(), 'ParaParam')
+    os.makedirs(journalFolder, exist_ok=True)
+    return os.path.join(journalFolder, _app.activeDocument.name + '_' + journalFilename)
+
+# Combine the manifests written by the shards of a sweep into the manifest of
+# the export folder and report the variants that none of the shards exported.
+def mergeShardManifests(plan, operations, exportSTLPerBody, settings):
+    manifest, shardPaths = mergeManifests(_exportFolder)
+    if len(shardPaths) == 0:
+        _ui.messageBox("There are no shard manifests in '" + _exportFolder + "'.")
+        return
+
+    designVersion = FusionSweepHost().designVersion()
+    operationKeys = [getOperationKey(operation, exportSTLPerBody, settings) for operation in exportOperations(operations)]
+
+    missing = []
+    for variant in plan:
+        for operationKey in operationKeys:
+            if not manifest.isCurrent(variantKey(operationKey, designVersion, plan.names, variant.values)):
+                missing.append(variant)
+                break
+
+    message = 'Merged {} shard manifests into {} entries.'.format(len(shardPaths), len(manifest.entries))
+    if len(missing) == 0:
+        message += '\nAll {} variants are complete.'.format(plan.count)
+    else:
+        message += '\n{} of {} variants are missing, see the Text Commands window for the list.'.format(len(missing), plan.count)
+        for variant in missing:
+            log('ParaParam: missing variant {} - {}'.format(variant.index + 1, variantStem(plan.names, variant.values)))
+    _ui.messageBox(message)
+
+# The plan of the variants of a sweep, the rows of a design table or the
+# combinations of the parameter rows.  With sharded the plan is limited to
+# the shard of the settings.
+def getSweepPlan(params, tableFilename, settings, sharded=False):
+    if tableFilename:
+        plan = DesignTable(tableFilename)
+    else:
+        plan = SweepPlan.fromRows(params, settings.order)
+    if settings.sampling != SAMPLING_GRID:
+        plan = SampledPlan(plan, settings.sampling, settings.samples, settings.seed)
+    if sharded and settings.shardCount > 1:
+        plan = ShardedPlan(plan, settings.shardIndex, settings.shardCount, settings.shardMode)
+    return plan
+
+# Run the sweep described by the journal header.  completed holds the
+# indices of the variants already done by a previous run.  host replaces the
+# host chosen by the settings, and onDone(runner, finished, error) is called
+# once a background sweep has ended instead of showing its error.
+def runSweep(sweep, journal, completed, host=None, onDone=None):
+    background = False
+    try:
+        des = adsk.fusion.Design.cast(_app.activeProduct)
+        settings = SweepSettings.fromDict(sweep['settings'])
+        userParamValuesOriginal = sweep['originalValues']
+
+        # Track current param value (expression) while iterating over all
+        paramValues = {}
+        for name in userParamValuesOriginal:
+            userParam = des.userParameters.itemByName(name)
+            if userParam is None:
+                raise ValueError("The user parameter '" + name + "' does not exist.")
+            paramValues[name] = userParam.expression
+
+        # Visit every combination of the param values exactly once.
+        plan = getSweepPlan(sweep['params'], sweep.get('table'), settings, True)
+        if settings.sampling != SAMPLING_GRID:
+            log('ParaParam: {} sampling - {} variants, seed {}'.format(settings.sampling, plan.total, settings.seed))
+        if settings.shardCount > 1:
+            log('ParaParam: shard {} of {} - {} of {} variants'.format(settings.shardIndex, settings.shardCount, plan.count, plan.total))
+        if plan.count == 0:
+            return
+
+        # The run report is written next to the journal.
+        if host is None and settings.background:
+            host = FusionBackgroundHost()
+        elif host is None:
+            host = FusionSweepHost()
+        runner = SweepRunner(host, des, plan, paramValues, sweep['operations'], _exportFolder, sweep['exportSTLPerBody'], settings, journal, completed, os.path.dirname(journal.path))
+
+        if settings.background:
+            def onFinished(finished, error):
+                try:
+                    finishSweep(sweep, journal, runner.des, paramValues, finished)
+                except Exception as finishError:
+                    error = error or finishError
+                if onDone:
+                    onDone(runner, finished and error is None, error)
+                elif error:
+                    raise error
+            startBackgroundSweep(runner, onFinished)
+            background = True
+            return
+
+        finished = False
+        try:
+            finished = runner.run()
+        finally:
+            finishSweep(sweep, journal, runner.des, paramValues, finished)
+    finally:
+        if not background:
+            journal.close()
+
+# Restore the original parameter values if asked to, even when the sweep
+# failed, and close the journal.  A cancelled sweep may still be resumed.
+def finishSweep(sweep, journal, des, paramValues, finished):
+    try:
         # Restore original param values on finish?
-        if restoreValues == True:
+        if sweep['restoreValues'] == True:
             # For each of the params we modified, restore the original value
+            userParamValuesOriginal = sweep['originalValues']
+            userParams = {}
             for K in userParamValuesOriginal:
-                userParam = des.userParameters.itemByName(K)
-                userParam.expression = userParamValuesOriginal[K]
- 
+                userParams[K] = des.userParameters.itemByName(K)
+            applyVariant(des, userParams, paramValues, userParamValuesOriginal, adsk.core.ValueInput.createByString)
+
+        if finished:
+            journal.finish()
+    finally:
+        journal.close()
+
+# The progress of a background sweep, shown in the progress bar of the status
+# bar rather than in a dialog that would block Fusion.  The sweep is
+# cancelled with the Cancel ParaParam Sweep command.
+class StatusBarProgress:
+    def __init__(self, message, total):
+        self.total = total
+        self.value = 0
+        self.text = message
+        self.wasCancelled = False
+        _ui.progressBar.show(message, 0, total)
+
+    @property
+    def progressValue(self):
+        return self.value
+
+    @progressValue.setter
+    def progressValue(self, value):
+        self.value = value
+        _ui.progressBar.progressValue = value
+
+    @property
+    def message(self):
+        return self.text
+
+    @message.setter
+    def message(self, message):
+        self.text = message
+        _ui.progressBar.show(message, 0, self.total)
+        _ui.progressBar.progressValue = self.value
+
+    def hide(self):
+        _ui.progressBar.hide()
+
+# The host of a sweep run in the background.  The UI events are processed
+# by Fusion between the slices of the sweep.
+class FusionBackgroundHost(FusionSweepHost):
+    def doEvents(self):
+        pass
+
+    def showProgress(self, message, total):
+        return StatusBarProgress(message, total)
+
+# The progress of a job, also written to its status file.
+class JobProgress(StatusBarProgress):
+    def __init__(self, job, message, total):
+        super().__init__(message, total)
+        self.job = job
+
+    @StatusBarProgress.progressValue.setter
+    def progressValue(self, value):
+        StatusBarProgress.progressValue.fset(self, value)
+        self.job.progress(value, self.total)
+
+# The host of the sweep of a job.  Nobody is watching, so the messages are
+# written to the Text Commands window and to the status file of the job
+# rather than shown in message boxes.
+class FusionJobHost(FusionBackgroundHost):
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        self.messages = []
+
+    def showMessage(self, message):
+        log(message)
+        self.messages.append(message)
+
+    def showProgress(self, message, total):
+        return JobProgress(self.job, message, total)
+
+# Run the sweep of runner in time slices from a custom event, fired by the
+# ticker thread of the scheduler, and add the commands to pause, resume and
+# cancel it to the Add-Ins panel.  onFinished(finished, error) is called when
+# the sweep has ended.
+def startBackgroundSweep(runner, onFinished):
+    global _scheduler, _sweepTickEvent
+
+    def onSchedulerFinished(finished, error):
+        try:
+            onFinished(finished, error)
+        except Exception as finishError:
+            error = error or finishError
+        finally:
+            stopBackgroundSweep()
+        if error:
+            _ui.messageBox('ParaParam Failed : ' + str(error))
+
+    _scheduler = SweepScheduler(runner, onSchedulerFinished)
+
+    _sweepTickEvent = _app.registerCustomEvent(_SWEEP_TICK_EVENT)
+    onSweepTick = ParaParamSweepTickHandler()
+    _sweepTickEvent.add(onSweepTick)
+    _handlers.append(onSweepTick)
+
+    addSweepControl(_PAUSE_COMMAND, 'Pause ParaParam Sweep', 'Pause or resume the ParaParam sweep running in the background.', toggleSweepPause)
+    addSweepControl(_CANCEL_COMMAND, 'Cancel ParaParam Sweep', 'Cancel the ParaParam sweep running in the background.  The original parameter values are restored if Restore Values was checked.', cancelSweep)
+
+    log('ParaParam: sweep running in the background, see Pause and Cancel ParaParam Sweep in the Add-Ins panel')
+    _scheduler.start(lambda: _app.fireCustomEvent(_SWEEP_TICK_EVENT))
+
+# Remove the custom event and the commands of the background sweep, and
+# terminate the script once the sweep is done.
+def stopBackgroundSweep():
+    global _scheduler, _sweepTickEvent
+
+    _scheduler = None
+    if _sweepTickEvent:
+        _app.unregisterCustomEvent(_SWEEP_TICK_EVENT)
+        _sweepTickEvent = None
+
+    removeSweepControls([_PAUSE_COMMAND, _CANCEL_COMMAND])
+
+    # The job queue runs the next job instead.
+    if not _stopping and _jobQueue is None:
+        adsk.terminate()
+
+def addSweepControl(commandId, name, tooltip, action):
+    cmdDef = _ui.commandDefinitions.itemById(commandId)
+    if not cmdDef:
+        cmdDef = _ui.commandDefinitions.addButtonDefinition(commandId, name, tooltip, 'resources/ParaParam')
+    onCreated = ParaParamSweepControlCreatedHandler(action)
+    cmdDef.commandCreated.add(onCreated)
+    _handlers.append(onCreated)
+
+    panel = _ui.allToolbarPanels.itemById(_CONTROLS_PANEL)
+    if panel and not panel.controls.itemById(commandId):
+        panel.controls.addCommand(cmdDef)
+
+def removeSweepControls(commandIds):
+    panel = _ui.allToolbarPanels.itemById(_CONTROLS_PANEL)
+    for commandId in commandIds:
+        control = panel.controls.itemById(commandId) if panel else None
+        if control:
+            control.deleteMe()
+        cmdDef = _ui.commandDefinitions.itemById(commandId)
+        if cmdDef:
+            cmdDef.deleteMe()
+
+def toggleSweepPause():
+    if _scheduler is None:
         return
-    
+    cmdDef = _ui.commandDefinitions.itemById(_PAUSE_COMMAND)
+    if _scheduler.state == STATE_PAUSED:
+        _scheduler.resume()
+        cmdDef.name = 'Pause ParaParam Sweep'
+    else:
+        _scheduler.pause()
+        cmdDef.name = 'Resume ParaParam Sweep'
+
+def cancelSweep():
+    if _scheduler:
+        _scheduler.cancel()
+
+# Event handler for the custom event fired by the ticker of a background
+# sweep, runs the next slice of the sweep on the main thread.
+class ParaParamSweepTickHandler(adsk.core.CustomEventHandler):
+    def __init__(self):
+        super().__init__()
+    def notify(self, args):
+        try:
+            if _scheduler:
+                _scheduler.runSlice()
+        except:
+            if _ui:
+                _ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
+
+# Event handlers of the commands controlling a background sweep.
+class ParaParamSweepControlCreatedHandler(adsk.core.CommandCreatedEventHandler):
+    def __init__(self, action):
+        super().__init__()
+        self.action = action
+    def notify(self, args):
+        try:
+            eventArgs = adsk.core.CommandCreatedEventArgs.cast(args)
+            onExecute = ParaParamSweepControlExecuteHandler(self.action)
+            eventArgs.command.execute.add(onExecute)
+            _handlers.append(onExecute)
+        except:
+            if _ui:
+                _ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
+
+class ParaParamSweepControlExecuteHandler(adsk.core.CommandEventHandler):
+    def __init__(self, action):
+        super().__init__()
+        self.action = action
+    def notify(self, args):
+        try:
+            self.action()
+        except:
+            if _ui:
+                _ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
+
+# Prompt for the spool folder and start watching it.
+def watchJobQueue():
+    des = adsk.fusion.Design.cast(_app.activeProduct)
+
+    folderDlg = _ui.createFolderDialog()
+    folderDlg.title = 'Select Job Queue Folder'
+    spoolFolder = getAttributeValue(des, 'spoolFolder', '')
+    if spoolFolder != '':
+        folderDlg.initialDirectory = spoolFolder
+    if folderDlg.showDialog() != adsk.core.DialogResults.DialogOK:
+        return
+
+    des.attributes.add('ParaParam', 'spoolFolder', folderDlg.folder)
+    startJobQueue(folderDlg.folder)
+
+# Watch the spool folder for job files and run their sweeps one after the
+# other in the background, see paraparamlib/jobs.py.  The folder is looked at
+# from a custom event fired by a ticker thread, and a command to stop
+# watching is added to the Add-Ins panel.
+def startJobQueue(folder):
+    global _jobQueue, _jobTicker, _jobPollEvent
+
+    _jobQueue = JobQueue(folder)
+    for job in _jobQueue.interruptedJobs():
+        job.finish(JOB_FAILED, 'The job was interrupted, submit it again with "resume": true to continue its sweep')
+        log('ParaParam: job ' + job.name + ' was interrupted')
+
+    _jobPollEvent = _app.registerCustomEvent(_JOB_POLL_EVENT)
+    onJobPoll = ParaParamJobPollHandler()
+    _jobPollEvent.add(onJobPoll)
+    _handlers.append(onJobPoll)
+
+    addSweepControl(_STOP_QUEUE_COMMAND, 'Stop ParaParam Job Queue', 'Stop watching the ParaParam job queue.  The running job is cancelled.', stopJobQueue)
+
+    log("ParaParam: watching '" + folder + "' for jobs, see Stop ParaParam Job Queue in the Add-Ins panel")
+    _jobTicker = Ticker(lambda: _app.fireCustomEvent(_JOB_POLL_EVENT), POLL_INTERVAL)
+    _jobTicker.start()
+
+# Stop watching the spool folder and cancel the running job.  The script
+# terminates once its sweep has ended.
+def stopJobQueue():
+    global _jobQueue, _jobTicker, _jobPollEvent
+
+    if _jobTicker:
+        _jobTicker.stop()
+        _jobTicker = None
+    if _jobPollEvent:
+        _app.unregisterCustomEvent(_JOB_POLL_EVENT)
+        _jobPollEvent = None
+    removeSweepControls([_STOP_QUEUE_COMMAND])
+
+    _jobQueue = None
+    log('ParaParam: stopped watching the job queue')
+
+    if _scheduler:
+        _scheduler.cancel()
+    elif not _stopping:
+        adsk.terminate()
+
+# Start the next job once the previous one has ended, and cancel the running
+# job when its cancel file appears.
+def pollJobQueue():
+    if _jobQueue is None:
+        return
+    if _scheduler:
+        if _currentJob and _currentJob.cancelRequested():
+            _scheduler.cancel()
+        return
+
+    job = _jobQueue.nextJob()
+    if job:
+        runJob(job)
+
+# Start the sweep of a job in the background.  A job that can not be started
+# fails with the error in its status file.
+def runJob(job):
+    global _currentJob, _exportFolder, _documentModified
+
+    _currentJob = job
+    log('ParaParam: starting job ' + job.name)
+    opened = False
+    try:
+        job.writeStatus()
+
+        document, opened = openJobDocument(job)
+        _documentModified = document.isModified
+        des = adsk.fusion.Design.cast(_app.activeProduct)
+        if des is None:
+            raise JobError("The document '" + document.name + "' has no design")
+
+        # The settings of the job override those of the parameter file.
+        paraParams = []
+        designTable = None
+        if isDesignTable(job.params):
+            designTable = DesignTable(job.params)
+            options = designTable.options
+        else:
+            paraParams, options = readParamFile(job.params)
+        settings = SweepSettings()
+        settings.update(options)
+        settings.update(job.settings)
+        settings.background = True
+        settings.preflight = False
+        settings.validate()
+
+        _exportFolder = job.exportFolder
+        if _exportFolder != '':
+            os.makedirs(_exportFolder, exist_ok=True)
+
+        host = FusionJobHost(job)
+        def onDone(runner, finished, error):
+            finishJob(job, host, opened, runner, finished, error)
+
+        # Continue the unfinished sweep of a job that was interrupted.
+        journalPath = getJournalPath(job.operations, settings)
+        if job.resume and isResumable(journalPath):
+            sweep, completed, finished = loadJournal(journalPath)
+            _exportFolder = sweep['exportFolder']
+            journal = SweepJournal.reopen(journalPath)
+            log('ParaParam: resuming the sweep of ' + journalPath)
+        else:
+            userParamValuesOriginal = checkSweep(des, job.operations, paraParams, designTable, job.exportSTLPerBody, settings)
+            sweep, journal = createSweep(des, job.operations, paraParams, designTable, job.exportSTLPerBody, job.restoreValues, settings, userParamValuesOriginal)
+            completed = {}
+
+        runSweep(sweep, journal, completed, host, onDone)
+
+        # Nothing to run, e.g. an empty shard.
+        if _scheduler is None:
+            finishJob(job, host, opened, None, True, None)
     except Exception as error:
-        _ui.messageBox("ParaParam Failed : " + str(error)) 
-        return None
+        _currentJob = None
+        log('ParaParam: job ' + job.name + ' failed - ' + str(error))
+        job.finish(JOB_FAILED, str(error))
+        if opened:
+            document.close(False)
+
+# Return the document of a job, activated, and whether it was opened for
+# the job.  The document is the cloud document with the id of the job, the
+# open document with its name, or else the active document.
+def openJobDocument(job):
+    if job.documentId:
+        for document in _app.documents:
+            try:
+                if document.dataFile and document.dataFile.id == job.documentId:
+                    document.activate()
+                    return document, False
+            except:
+                pass
+        dataFile = _app.data.findFileById(job.documentId)
+        if dataFile is None:
+            raise JobError("There is no document with the id '" + job.documentId + "'")
+        return _app.documents.open(dataFile, True), True
+
+    if job.document:
+        for document in _app.documents:
+            # The name of a saved document ends with its version, e.g. "SpurGear v3"
+            if document.name == job.document or document.name.rsplit(' v', 1)[0] == job.document:
+                document.activate()
+                return document, False
+        raise JobError("The document '" + job.document + "' is not open")
+
+    if _app.activeDocument is None:
+        raise JobError('There is no active document')
+    return _app.activeDocument, False
+
+# Write the result of a job to its status file.  A document opened for the
+# job is closed without saving.
+def finishJob(job, host, opened, runner, finished, error):
+    global _currentJob
+
+    _currentJob = None
+    fields = { 'messages': host.messages, 'exportFolder': _exportFolder }
+    if runner:
+        fields['variantsDone'] = runner.position
+        fields['variants'] = runner.plan.count
+
+    if error:
+        state, message = JOB_FAILED, str(error)
+    elif finished:
+        state, message = JOB_DONE, 'Finished'
+    elif runner and runner.memoryStopped:
+        state, message = JOB_FAILED, 'Stopped above the memory limit, restart Fusion and submit the job again with "resume": true to continue its sweep'
+    else:
+        state, message = JOB_CANCELLED, 'Cancelled'
+    job.finish(state, message, **fields)
+    log('ParaParam: job ' + job.name + ' ' + state)
+
+    if opened:
+        try:
+            host.document.close(False)
+        except:
+            pass
+
+# Event handler for the custom event fired by the ticker of the job queue.
+class ParaParamJobPollHandler(adsk.core.CustomEventHandler):
+    def __init__(self):
+        super().__init__()
+    def notify(self, args):
+        try:
+            pollJobQueue()
+        except:
+            if _ui:
+                _ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
+        finally:
+            if _jobTicker:
+                _jobTicker.handled()
+
+# Called when the script is stopped.  A sweep still running in the
+# background is cancelled, which restores the parameter values.
+def stop(context):
+    global _stopping
+    try:
+        _stopping = True
+        if _jobQueue:
+            stopJobQueue()
+        if _scheduler:
+            _scheduler.cancel()
+            _scheduler.runSlice()
+    except:
+        if _ui:
+            _ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
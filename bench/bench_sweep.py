@@ -0,0 +1,219 @@
+#Description-Benchmarks of the ParaParam sweep runner
+#
+# Runs sweeps of synthetic grids against the adsk stand-in in bench/fakeadsk
+# and reports the variants per second, the number of design recomputes and
+# the peak memory of each.  Does not need Fusion, e.g.
+#
+#   python bench/bench_sweep.py
+#   python bench/bench_sweep.py --max-size 1000000 --json results.json
+#   python bench/bench_sweep.py --compute-latency 0.001 --export-latency 0.002
+#   python bench/bench_sweep.py --bodies 6 --export-latency 0.002
+#   python bench/bench_sweep.py --max-size 10000 --baseline bench/baseline.json
+#
+# With --baseline the results are compared with those of an earlier run
+# written with --json and the benchmark fails, with an exit status of 1, if
+# a sweep does more computes, assignments or exports than in the baseline.
+# These counts are the same on any machine.  With --tolerance the speed and
+# peak memory are compared as well, which only makes sense against a
+# baseline written on the same machine.
+
+import argparse, json, math, os, shutil, sys, tempfile, time, tracemalloc
+
+_BENCH_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_BENCH_FOLDER, 'fakeadsk'))
+sys.path.insert(0, os.path.dirname(_BENCH_FOLDER))
+
+import adsk.core, adsk.fusion
+
+from paraparamlib.sweep import SweepPlan, ORDERS
+from paraparamlib.settings import SweepSettings
+from paraparamlib.progress import REFRESH_NEVER
+from paraparamlib.paramfile import DesignTable
+from paraparamlib.runner import SweepRunner, SweepHost, OPERATIONS, OP_EXPORT_STL, OP_EXPORT_STEP
+
+_SIZES = [100, 1000, 10000, 100000, 1000000]
+
+# The pseudo order of the runs that read a design table
+TABLE = 'Table'
+
+# Counts the UI work requested by the runner.
+class BenchHost(SweepHost):
+    def __init__(self):
+        self.eventCount = 0
+        self.refreshCount = 0
+
+    def documentName(self):
+        return 'Bench'
+
+    def doEvents(self):
+        self.eventCount += 1
+
+    def refreshViewport(self):
+        self.refreshCount += 1
+
+    def valueInput(self, expression):
+        return adsk.core.ValueInput.createByString(expression)
+
+# The parameter rows of a grid of size variants, a power of 10, over three
+# parameters.
+def gridRows(size):
+    exponent = round(math.log10(size))
+    counts = [10 ** (exponent // 3 + (1 if i < exponent % 3 else 0)) for i in range(3)]
+    return [['Outer', 1, counts[0], 1], ['Middle', 1, counts[1], 1], ['Inner', 1, counts[2], 1]]
+
+# Write a design table with the variants of the grid of size variants, in
+# nested order and with the values in mm.
+def writeDesignTable(size, filename):
+    plan = SweepPlan.fromRows(gridRows(size))
+    with open(filename, 'w') as file:
+        file.write(','.join(plan.names) + '\n')
+        for variant in plan:
+            file.write(','.join('{:g} mm'.format(float(value)) for value in variant.values) + '\n')
+
+# Run one sweep and return its measurements.  order may also be 'Table' to
+# read the variants from a design table.
+# With bodyCount bodies each body follows one of the parameters and is
+# exported to its own STL file.
+def runBenchmark(size, order, operations, computeLatency, exportLatency, refreshMode, traceMemory, bodyCount=0):
+    rows = gridRows(size)
+    bodies = [('Body' + str(i + 1), rows[i % len(rows)][0]) for i in range(bodyCount)] or ['Body1']
+    tableFolder = None
+    if order == TABLE:
+        tableFolder = tempfile.mkdtemp(prefix='ParaParamBench')
+        tableFilename = os.path.join(tableFolder, 'table.csv')
+        writeDesignTable(size, tableFilename)
+        des = adsk.fusion.Design([(row[0], '0 mm', 'mm') for row in rows], computeLatency, exportLatency, bodies)
+        paramValues = { row[0]: '0 mm' for row in rows }
+    else:
+        plan = SweepPlan.fromRows(rows, order)
+        des = adsk.fusion.Design([(row[0], str(row[1])) for row in rows], computeLatency, exportLatency, bodies)
+        paramValues = { row[0]: str(row[1]) for row in rows }
+
+    settings = SweepSettings()
+    if order != TABLE:
+        settings.order = order
+    settings.refreshMode = refreshMode
+
+    exportFolder = tempfile.mkdtemp(prefix='ParaParamBench') if len(operations) > 0 else ''
+    host = BenchHost()
+    try:
+        if traceMemory:
+            tracemalloc.start()
+        startTime = time.perf_counter()
+        if tableFolder:
+            plan = DesignTable(tableFilename)
+        runner = SweepRunner(host, des, plan, paramValues, operations, exportFolder, bodyCount > 0, settings)
+        runner.run()
+        elapsed = time.perf_counter() - startTime
+        peakMemory = None
+        if traceMemory:
+            peakMemory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    finally:
+        if exportFolder:
+            shutil.rmtree(exportFolder, ignore_errors=True)
+        if tableFolder:
+            shutil.rmtree(tableFolder, ignore_errors=True)
+
+    return {
+        'size': plan.count,
+        'order': order,
+        'operations': operations,
+        'seconds': elapsed,
+        'variantsPerSecond': plan.count / elapsed if elapsed > 0 else None,
+        'computes': des.computeCount,
+        'assignments': des.assignmentCount,
+        'exports': des.exportCount,
+        'doEvents': host.eventCount,
+        'refreshes': host.refreshCount,
+        'peakMemory': peakMemory,
+    }
+
+def formatResult(result):
+    memory = '-' if result['peakMemory'] is None else '{:.1f} KiB'.format(result['peakMemory'] / 1024)
+    return '{:>9} {:<11} {:<22} {:>10.0f}/s {:>9} computes {:>9} assignments {:>8} exports {:>12}'.format(
+        result['size'], result['order'], ','.join(result['operations']) or '-',
+        result['variantsPerSecond'] or 0, result['computes'], result['assignments'], result['exports'], memory)
+
+# The key of a result in the baseline, the same sweep in each run
+def resultKey(result):
+    return (result['size'], result['order'], tuple(result['operations']))
+
+# Compare results with those of baseline and return the list of
+# regressions.  The counts must not grow at all.  With a tolerance the speed
+# and memory may be worse by that fraction, without one they are not
+# compared.  Sweeps that are not in both are skipped.
+def compareResults(results, baseline, tolerance=None):
+    baseline = { resultKey(result): result for result in baseline }
+    regressions = []
+    for result in results:
+        expected = baseline.get(resultKey(result))
+        if expected is None:
+            continue
+        name = '{} {} {}'.format(result['size'], result['order'], ','.join(result['operations']) or '-')
+
+        for count in ['computes', 'assignments', 'exports']:
+            if result[count] > expected[count]:
+                regressions.append('{}: {} {} instead of {}'.format(name, result[count], count, expected[count]))
+
+        if tolerance is None:
+            continue
+
+        if result['variantsPerSecond'] and expected.get('variantsPerSecond'):
+            if result['variantsPerSecond'] < expected['variantsPerSecond'] * (1 - tolerance):
+                regressions.append('{}: {:.0f} variants per second instead of {:.0f}'.format(name, result['variantsPerSecond'], expected['variantsPerSecond']))
+
+        if result['peakMemory'] is not None and expected.get('peakMemory') is not None:
+            if result['peakMemory'] > expected['peakMemory'] * (1 + tolerance):
+                regressions.append('{}: peak memory {:.1f} KiB instead of {:.1f} KiB'.format(name, result['peakMemory'] / 1024, expected['peakMemory'] / 1024))
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the ParaParam sweep runner.')
+    parser.add_argument('--max-size', type=int, default=100000, help='largest grid, up to 1000000 (default 100000)')
+    parser.add_argument('--export-size', type=int, default=1000, help='largest grid that is also exported (default 1000)')
+    parser.add_argument('--compute-latency', type=float, default=0.0, help='simulated seconds per recompute')
+    parser.add_argument('--export-latency', type=float, default=0.0, help='simulated seconds per exported file')
+    parser.add_argument('--bodies', type=int, default=0, help='export this many bodies to an STL file each, each following one parameter')
+    parser.add_argument('--refresh', default=REFRESH_NEVER, help='refresh mode (default Never)')
+    parser.add_argument('--no-memory', action='store_true', help='do not trace the memory, which slows the sweep down')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--baseline', help='fail if the results are worse than those of this file, written with --json')
+    parser.add_argument('--tolerance', type=float, help='also fail if the speed or memory is worse than the baseline by more than this fraction, e.g. 0.5')
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in _SIZES:
+        if size > args.max_size:
+            break
+
+        runs = [[]]
+        if size <= args.export_size:
+            runs.append([OPERATIONS[OP_EXPORT_STL], OPERATIONS[OP_EXPORT_STEP]])
+
+        for operations in runs:
+            for order in ORDERS + [TABLE]:
+                result = runBenchmark(size, order, operations, args.compute_latency, args.export_latency, args.refresh, not args.no_memory, args.bodies)
+                print(formatResult(result))
+                sys.stdout.flush()
+                results.append(result)
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compareResults(results, baseline, args.tolerance)
+        if len(regressions) > 0:
+            print('Regressions against ' + args.baseline + ':')
+            for regression in regressions:
+                print('  ' + regression)
+            return 1
+        print('No regressions against ' + args.baseline)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,10 @@
+#Description-Stand-in for the Fusion 360 adsk package
+#
+# Just enough of the API for the benchmarks to drive a sweep without Fusion.
+# Put the bench/fakeadsk folder on sys.path to use it.
+
+from . import core, fusion
+
+def doEvents():
+    core._eventCount[0] += 1
+    return True
@@ -0,0 +1,26 @@
+#Description-Stand-in for adsk.core
+
+# The number of calls to adsk.doEvents()
+_eventCount = [0]
+
+class DialogResults:
+    DialogOK = 0
+    DialogCancel = 1
+    DialogYes = 2
+    DialogNo = 3
+    DialogError = -1
+
+class Viewport:
+    def __init__(self):
+        self.refreshCount = 0
+
+    def refresh(self):
+        self.refreshCount += 1
+
+class ValueInput:
+    def __init__(self, stringValue):
+        self.stringValue = stringValue
+
+    @staticmethod
+    def createByString(stringValue):
+        return ValueInput(stringValue)
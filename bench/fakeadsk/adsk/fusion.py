@@ -0,0 +1,277 @@
+#Description-Stand-in for adsk.fusion
+#
+# The design counts its recomputes and parameter assignments and can
+# simulate the time taken by a recompute and by an export, so that the cost
+# of a sweep can be measured against a model of a real design.
+
+import struct, time
+
+class DesignTypes:
+    DirectDesignType = 0
+    ParametricDesignType = 1
+
+class FeatureHealthStates:
+    HealthyFeatureHealthState = 0
+    WarningFeatureHealthState = 1
+    ErrorFeatureHealthState = 2
+
+class CalculationAccuracy:
+    LowCalculationAccuracy = 0
+    MediumCalculationAccuracy = 1
+    HighCalculationAccuracy = 2
+    VeryHighCalculationAccuracy = 3
+
+class MeshRefinementSettings:
+    MeshRefinementHigh = 0
+    MeshRefinementMedium = 1
+    MeshRefinementLow = 2
+    MeshRefinementCustom = 3
+
+class UserParameter:
+    def __init__(self, design, name, expression, unit=''):
+        self.design = design
+        self.name = name
+        self.unit = unit
+        self._expression = expression
+
+    @property
+    def expression(self):
+        return self._expression
+
+    # Setting the expression recomputes the design.
+    @expression.setter
+    def expression(self, expression):
+        self._expression = expression
+        self.design.assignmentCount += 1
+        self.design.compute()
+
+    @property
+    def value(self):
+        return float(self._expression.split()[0])
+
+class UserParameters:
+    def __init__(self, params):
+        self.params = params
+
+    @property
+    def count(self):
+        return len(self.params)
+
+    def item(self, index):
+        return self.params[index]
+
+    def itemByName(self, name):
+        for param in self.params:
+            if param.name == name:
+                return param
+        return None
+
+# Accepts expressions that are a number optionally followed by a unit.
+class UnitsManager:
+    def isValidExpression(self, expression, units):
+        parts = expression.split()
+        if len(parts) == 0 or len(parts) > 2:
+            return False
+        try:
+            float(parts[0])
+        except ValueError:
+            return False
+        return True
+
+    def evaluateExpression(self, expression, units):
+        return float(expression.split()[0])
+
+class ExportOptions:
+    def __init__(self, geometry, filename):
+        self.geometry = geometry
+        self.filename = filename
+
+class ExportManager:
+    def __init__(self, design):
+        self.design = design
+
+    def createFusionArchiveExportOptions(self, filename):
+        return ExportOptions(None, filename)
+
+    def createIGESExportOptions(self, filename):
+        return ExportOptions(None, filename)
+
+    def createSATExportOptions(self, filename):
+        return ExportOptions(None, filename)
+
+    def createSMTExportOptions(self, filename):
+        return ExportOptions(None, filename)
+
+    def createSTEPExportOptions(self, filename):
+        return ExportOptions(None, filename)
+
+    def createSTLExportOptions(self, geometry, filename):
+        return ExportOptions(geometry, filename)
+
+    # Writes a small file, a valid binary STL with one triangle for STL.
+    def execute(self, options):
+        if self.design.exportLatency > 0:
+            time.sleep(self.design.exportLatency)
+        self.design.exportCount += 1
+        with open(options.filename, 'wb') as file:
+            if options.filename.lower().endswith('.stl'):
+                file.write(b'\0' * 80 + struct.pack('<I', 1) + b'\0' * 50)
+            else:
+                file.write(b'ParaParam benchmark export\n')
+        return True
+
+class Point3D:
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+    def asArray(self):
+        return [self.x, self.y, self.z]
+
+class BoundingBox3D:
+    def __init__(self, minPoint, maxPoint):
+        self.minPoint = minPoint
+        self.maxPoint = maxPoint
+
+# The physical properties of a solid of density 1 g/cm3.
+class PhysicalProperties:
+    def __init__(self, volume, area, centerOfMass):
+        self.volume = volume
+        self.area = area
+        self.density = 0.001
+        self.mass = volume * self.density
+        self.centerOfMass = centerOfMass
+
+class Count:
+    def __init__(self, count):
+        self.count = count
+
+# A cube whose size is the value of one user parameter, or a unit cube when
+# it does not follow any parameter.
+class BRepBody:
+    def __init__(self, design, name, paramName=None):
+        self.design = design
+        self.name = name
+        self.paramName = paramName
+        self.faces = Count(6)
+        self.edges = Count(12)
+        self.vertices = Count(8)
+
+    def size(self):
+        if self.paramName is None:
+            return 1.0
+        return self.design.userParameters.itemByName(self.paramName).value
+
+    @property
+    def volume(self):
+        return self.size() ** 3
+
+    @property
+    def area(self):
+        return 6 * self.size() ** 2
+
+    @property
+    def boundingBox(self):
+        size = self.size()
+        return BoundingBox3D(Point3D(0, 0, 0), Point3D(size, size, size))
+
+    def getPhysicalProperties(self, accuracy=CalculationAccuracy.LowCalculationAccuracy):
+        size = self.size()
+        return PhysicalProperties(self.volume, self.area, Point3D(size / 2, size / 2, size / 2))
+
+class BRepBodies:
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    @property
+    def count(self):
+        return len(self.bodies)
+
+    def item(self, index):
+        return self.bodies[index]
+
+class Component:
+    def __init__(self, bodies):
+        self.bRepBodies = BRepBodies(bodies)
+
+    # The bodies side by side, without overlapping.
+    @property
+    def boundingBox(self):
+        sizes = [body.size() for body in self.bRepBodies.bodies]
+        return BoundingBox3D(Point3D(0, 0, 0), Point3D(sum(sizes), max(sizes + [0]), max(sizes + [0])))
+
+    def getPhysicalProperties(self, accuracy=CalculationAccuracy.LowCalculationAccuracy):
+        bodies = self.bRepBodies.bodies
+        volume = sum(body.volume for body in bodies)
+        box = self.boundingBox
+        return PhysicalProperties(volume, sum(body.area for body in bodies), Point3D(box.maxPoint.x / 2, box.maxPoint.y / 2, box.maxPoint.z / 2))
+
+# A timeline of a single feature, which is in error when the design is not
+# feasible.
+class TimelineObject:
+    def __init__(self, design, name):
+        self.design = design
+        self.name = name
+
+    @property
+    def healthState(self):
+        if self.design.isFeasible():
+            return FeatureHealthStates.HealthyFeatureHealthState
+        return FeatureHealthStates.ErrorFeatureHealthState
+
+    @property
+    def errorOrWarningMessage(self):
+        return '' if self.design.isFeasible() else 'Compute Failed'
+
+class Timeline:
+    def __init__(self, items):
+        self.items = items
+
+    @property
+    def count(self):
+        return len(self.items)
+
+    def item(self, index):
+        return self.items[index]
+
+class Design:
+    # params is a list of (name, expression) or (name, expression, unit),
+    # latencies are in seconds.  bodies is a list of body names or of (name,
+    # parameter name) for bodies whose size follows a parameter.  feasible,
+    # if given, is called with the design and returns False when the
+    # timeline fails.
+    def __init__(self, params, computeLatency=0.0, exportLatency=0.0, bodies=('Body1',), feasible=None):
+        self.designType = DesignTypes.ParametricDesignType
+        self.feasible = feasible
+        self.timeline = Timeline([TimelineObject(self, 'Extrude1')])
+        self.computeLatency = computeLatency
+        self.exportLatency = exportLatency
+        self.computeCount = 0
+        self.assignmentCount = 0
+        self.exportCount = 0
+        self.userParameters = UserParameters([UserParameter(self, *param) for param in params])
+        self.unitsManager = UnitsManager()
+        self.exportManager = ExportManager(self)
+        self.rootComponent = Component([BRepBody(self, *((body,) if isinstance(body, str) else body)) for body in bodies])
+
+    def isFeasible(self):
+        return self.feasible is None or self.feasible(self)
+
+    @staticmethod
+    def cast(obj):
+        return obj if isinstance(obj, Design) else None
+
+    # Set the expressions of several parameters, given as ValueInputs made
+    # with createByString, and recompute the design once.
+    def modifyParameters(self, parameters, values):
+        if len(parameters) != len(values):
+            return False
+        for parameter, value in zip(parameters, values):
+            parameter._expression = value.stringValue
+            self.assignmentCount += 1
+        self.compute()
+        return True
+
+    def compute(self):
+        if self.computeLatency > 0:
+            time.sleep(self.computeLatency)
+        self.computeCount += 1
@@ -0,0 +1,2 @@
+#Author-Hans Kellner
+#Description-Fusion independent helpers used by the ParaParam script
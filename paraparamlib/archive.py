@@ -0,0 +1,274 @@
+#Author-Hans Kellner
+#Description-Archive output for ParaParam
+#
+# A large sweep leaves tens of thousands of files in the export folder, which
+# is slow to list, copy and clean up, especially on network shares.  With an
+# archive output the files of each completed variant are streamed into a zip
+# or tar archive and removed from the folder.  A new archive is started once
+# the current one reaches its size limit, and an index CSV file maps the
+# parameter values of each variant to its archive members.
+#
+# Archived files are referred to by the path of the archive followed by the
+# name of the member, e.g. "ParaParamOutputs-0001.zip/MyModel_Height_1_0.stl",
+# in the export manifest and the sweep journal.
+
+import csv, functools, glob, hashlib, os, re, shutil, tarfile, zipfile
+
+OUTPUTS_FILENAME = 'ParaParamOutputs'
+
+# Where the exported files end up.
+#   Folder - loose files in the export folder
+#   Zip    - zip archives, the files are stored without compression since
+#            the Compress (gzip) post-processing can compress them in the
+#            background
+#   Tar    - uncompressed tar archives
+ARCHIVE_FOLDER = 'Folder'
+ARCHIVE_ZIP = 'Zip'
+ARCHIVE_TAR = 'Tar'
+ARCHIVES = [ARCHIVE_FOLDER, ARCHIVE_ZIP, ARCHIVE_TAR]
+
+_EXTENSIONS = { ARCHIVE_ZIP: '.zip', ARCHIVE_TAR: '.tar' }
+
+# A member path: the path of an archive written by ParaParam, then the name
+# of the member.  Either separator may follow the archive since the paths of
+# the manifest are relative paths of the platform.
+_MEMBER_PATH = re.compile(r'^(.*' + OUTPUTS_FILENAME + r'(?:\.shard-\d+-of-\d+)?-\d+\.(?:zip|tar))[\\/](.+)$')
+
+# Size of the blocks copied into an archive
+_BLOCK_SIZE = 1024 * 1024
+
+# The name of the archives and index without the number and extension, e.g.
+# "ParaParamOutputs.shard-2-of-4"
+def outputsFilename(shardIndex, shardCount):
+    if shardCount <= 1:
+        return OUTPUTS_FILENAME
+    return '{}.shard-{}-of-{}'.format(OUTPUTS_FILENAME, shardIndex, shardCount)
+
+def memberPath(archivePath, member):
+    return archivePath + '/' + member
+
+# Return the archive path and member name of a member path, or None if path
+# is a plain file.
+def splitMemberPath(path):
+    match = _MEMBER_PATH.match(path)
+    if match is None:
+        return None
+    return match.group(1), match.group(2).replace('\\', '/')
+
+# Return the size of each complete member of an archive, by name.  An
+# archive that can not be read, e.g. a zip file that was never closed since
+# Fusion crashed, has no members.  The result is cached until the archive
+# changes.
+def archiveMembers(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    return _archiveMembers(path, stat.st_mtime_ns, stat.st_size)
+
+@functools.lru_cache(maxsize=8)
+def _archiveMembers(path, mtime, size):
+    members = {}
+    if path.endswith('.zip'):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    members[info.filename] = info.file_size
+        except (OSError, zipfile.BadZipFile):
+            pass
+    else:
+        # The members before the end of a truncated tar file are kept.
+        try:
+            with tarfile.open(path, 'r:') as archive:
+                for info in archive:
+                    if info.isfile() and info.offset_data + info.size <= size:
+                        members[info.name] = info.size
+        except (OSError, tarfile.TarError):
+            pass
+    return members
+
+# Return the size of an exported file or archive member, or None if it
+# does not exist.
+def outputSize(path):
+    member = splitMemberPath(path)
+    if member is None:
+        return os.path.getsize(path) if os.path.isfile(path) else None
+    return archiveMembers(member[0]).get(member[1])
+
+# Returns True if all the files of the outputs of a variant, a dict of the
+# files of each manifest key, exist.
+def outputsExist(outputs):
+    return all(outputSize(path) is not None for files in outputs.values() for path in files)
+
+# Return the SHA-256 checksum of an archive member.
+def memberChecksum(archivePath, member):
+    checksum = hashlib.sha256()
+    if archivePath.endswith('.zip'):
+        with zipfile.ZipFile(archivePath) as archive, archive.open(member) as file:
+            for block in iter(lambda: file.read(_BLOCK_SIZE), b''):
+                checksum.update(block)
+    else:
+        with tarfile.open(archivePath, 'r:') as archive:
+            file = archive.extractfile(member)
+            for block in iter(lambda: file.read(_BLOCK_SIZE), b''):
+                checksum.update(block)
+    return checksum.hexdigest()
+
+# Reads a file while computing its checksum, so that a file is only read
+# once when it is added to an archive.
+class ChecksumReader:
+    def __init__(self, file):
+        self.file = file
+        self.checksum = hashlib.sha256()
+
+    def read(self, size=-1):
+        block = self.file.read(size)
+        self.checksum.update(block)
+        return block
+
+class ArchiveSink:
+    # Write the archives in folder, filename is the name of the archives
+    # and index without the number and extension.  maxBytes is the size
+    # above which a new archive is started, 0 for no limit.
+    def __init__(self, folder, filename, format, maxBytes, names):
+        if format not in _EXTENSIONS:
+            raise ValueError('Unknown archive format: ' + str(format))
+
+        self.folder = folder
+        self.filename = filename
+        self.format = format
+        self.maxBytes = maxBytes
+        self.archive = None
+        self.file = None
+        self.archivePath = None
+        self.archiveCount = 0
+        self.memberCount = 0
+        self.subfolders = set()
+
+        # Archives are never appended to, a sweep that is resumed or rerun
+        # starts the archive after the last one in the folder.
+        pattern = os.path.join(glob.escape(folder), glob.escape(filename) + '-*' + _EXTENSIONS[format])
+        numbers = [int(m.group(1)) for m in (re.search(r'-(\d+)\.\w+$', path) for path in glob.glob(pattern)) if m]
+        self.number = max(numbers, default=0)
+
+        # The index lists the members of every archive in the folder, so
+        # the rows of a new sweep are added to it.
+        self.indexPath = os.path.join(folder, filename + '.csv')
+        append = os.path.isfile(self.indexPath) and os.path.getsize(self.indexPath) > 0
+        self.indexFile = open(self.indexPath, 'a' if append else 'w', newline='')
+        self.indexWriter = csv.writer(self.indexFile)
+        if append:
+            # Start on a new line after a row cut short by a crash.
+            with open(self.indexPath, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) not in b'\r\n':
+                    self.indexFile.write('\r\n')
+        else:
+            self.indexWriter.writerow(['index'] + list(names) + ['archive', 'member', 'size', 'sha256'])
+            self.indexFile.flush()
+
+    # Move the files of a variant into the current archive.  outputs maps a
+    # manifest key to its files, which are all written to the same archive.
+    # Returns the member paths, checksums and sizes of each output.
+    def add(self, index, values, outputs):
+        added = sum(self.memberSize(os.path.relpath(path, self.folder), os.path.getsize(path)) for files in outputs.values() for path in files)
+        if self.archive is None or (self.maxBytes > 0 and self.memberCount > 0 and self.archiveSize(added) > self.maxBytes):
+            self.rotate()
+
+        members = {}
+        checksums = {}
+        sizes = {}
+        for key, files in outputs.items():
+            members[key] = []
+            checksums[key] = []
+            sizes[key] = []
+            for path in files:
+                member = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                checksum, size = self.write(path, member)
+                self.indexWriter.writerow([index + 1] + [str(value) for value in values] + [os.path.basename(self.archivePath), member, size, checksum])
+                members[key].append(memberPath(self.archivePath, member))
+                checksums[key].append(checksum)
+                sizes[key].append(size)
+                self.memberCount += 1
+                os.remove(path)
+                if os.path.dirname(member) != '':
+                    self.subfolders.add(os.path.dirname(path))
+
+        self.file.flush()
+        self.indexFile.flush()
+        return members, checksums, sizes
+
+    # Returns the checksum and size of the member.
+    def write(self, path, member):
+        with open(path, 'rb') as source:
+            reader = ChecksumReader(source)
+            if self.format == ARCHIVE_ZIP:
+                info = zipfile.ZipInfo.from_file(path, member)
+                info.compress_type = zipfile.ZIP_STORED
+                with self.archive.open(info, 'w') as target:
+                    shutil.copyfileobj(reader, target, _BLOCK_SIZE)
+                size = info.file_size
+            else:
+                # A whole second mtime, a fraction would need a PAX header
+                # for every member.
+                info = self.archive.gettarinfo(path, member)
+                info.mtime = int(info.mtime)
+                self.archive.addfile(info, reader)
+                size = info.size
+        return reader.checksum.hexdigest(), size
+
+    # Return the size the current archive will have once it is closed, with
+    # added more bytes of members.  The directory of a zip file and the end
+    # blocks of a tar file are only written when it is closed, and a tar
+    # file is then padded to a whole number of records.
+    def archiveSize(self, added=0):
+        if self.format == ARCHIVE_ZIP:
+            return self.file.tell() + added + sum(46 + len(info.filename.encode()) + len(info.extra) for info in self.archive.filelist) + 22
+        size = self.file.tell() + added + 2 * tarfile.BLOCKSIZE
+        return -(-size // tarfile.RECORDSIZE) * tarfile.RECORDSIZE
+
+    # Return the bytes a file of size bytes adds to an archive: the local
+    # header and directory entry of a zip file, or the header and padding of
+    # a tar file, with a PAX header for a long name.
+    def memberSize(self, member, size):
+        nameSize = len(member.encode())
+        if self.format == ARCHIVE_ZIP:
+            return size + 30 + 46 + 2 * nameSize
+        headers = 3 if nameSize > 100 else 1
+        return headers * tarfile.BLOCKSIZE + -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+    # Close the current archive and start the next one.
+    def rotate(self):
+        self.closeArchive()
+        self.number += 1
+        self.archivePath = os.path.join(self.folder, '{}-{:04d}{}'.format(self.filename, self.number, _EXTENSIONS[self.format]))
+        self.file = open(self.archivePath, 'wb')
+        if self.format == ARCHIVE_ZIP:
+            self.archive = zipfile.ZipFile(self.file, 'w')
+        else:
+            self.archive = tarfile.open(fileobj=self.file, mode='w', format=tarfile.PAX_FORMAT)
+        self.archiveCount += 1
+        self.memberCount = 0
+
+    def closeArchive(self):
+        if self.archive is None:
+            return
+        try:
+            self.archive.close()
+        finally:
+            self.file.close()
+            self.archive = None
+
+    # Close the archive and index, and remove the sub folders of the layout
+    # of the post-processing left empty by the archived files.
+    def close(self):
+        try:
+            self.closeArchive()
+        finally:
+            self.indexFile.close()
+
+        for subfolder in sorted(self.subfolders, reverse=True):
+            try:
+                os.rmdir(subfolder)
+            except OSError:
+                pass
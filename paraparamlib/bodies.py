@@ -0,0 +1,64 @@
+#Author-Hans Kellner
+#Description-Reuse of the STL files of unchanged bodies for ParaParam
+#
+# When each body is exported to its own STL file, a parameter often changes
+# only some of the bodies.  A cheap fingerprint of the geometry of each body
+# is taken after the compute and a body whose fingerprint is the same as when
+# it was last exported gets a link to (or a copy of) its previous file
+# instead of being meshed and written again.
+
+import os, shutil
+
+# Significant digits of the measurements compared, so that the last bits of
+# a recompute do not make an unchanged body look changed.
+FINGERPRINT_DIGITS = 12
+
+def roundMeasure(value):
+    return float('{:.{}g}'.format(value, FINGERPRINT_DIGITS))
+
+# Return the fingerprint of a body: its volume, area, bounding box and the
+# number of faces, edges and vertices.  Two bodies with the same fingerprint
+# are taken to have the same mesh.
+def bodyFingerprint(body):
+    box = body.boundingBox
+    return (
+        roundMeasure(body.volume),
+        roundMeasure(body.area),
+        tuple(roundMeasure(v) for v in box.minPoint.asArray()),
+        tuple(roundMeasure(v) for v in box.maxPoint.asArray()),
+        body.faces.count,
+        body.edges.count,
+        body.vertices.count,
+    )
+
+# Create filename with the same content as the existing file source, as a
+# hard link when the file system allows it and as a copy otherwise.  Raises
+# OSError if source no longer exists.
+def linkFile(source, filename):
+    if os.path.lexists(filename):
+        os.remove(filename)
+    try:
+        os.link(source, filename)
+    except OSError:
+        shutil.copyfile(source, filename)
+
+# The fingerprint and file of the last export of each body, by body name.
+class BodyExportCache:
+    def __init__(self):
+        self.exports = {}
+        self.reuseCount = 0
+
+    # Return the file of the last export of the body if its fingerprint has
+    # not changed since and the file is still there, None otherwise.
+    def previousFile(self, name, fingerprint):
+        previous = self.exports.get(name)
+        if previous is None or previous[0] != fingerprint or not os.path.isfile(previous[1]):
+            return None
+        return previous[1]
+
+    def record(self, name, fingerprint, filename):
+        self.exports[name] = (fingerprint, filename)
+
+    # Forget the body, e.g. when its export failed.
+    def forget(self, name):
+        self.exports.pop(name, None)
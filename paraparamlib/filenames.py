@@ -0,0 +1,207 @@
+#Author-Hans Kellner
+#Description-Export filenames for ParaParam
+#
+# The names of the exported files are built from templates such as
+# "{doc}_{body}_{Diameter}_{Teeth}.{ext}", compiled once per sweep.  The
+# fields are:
+#   doc     - the name of the document
+#   body    - the name of the body, for STL files per body
+#   params  - every parameter name and value, e.g. "Height_1_0_Width_2_5"
+#   index   - the number of the variant, from 1, e.g. "{index:05}"
+#   ext     - the extension of the file, added at the end if missing
+#   <name>  - the value of the parameter with that name, e.g. "{Diameter}"
+#
+# Every field is cleaned of the characters that are not allowed in
+# filenames.  Values are cleaned the way they always were, dots and spaces
+# become underscores, and two values that end up with the same text are
+# told apart by a hash, so that no variant overwrites the files of another.
+# A name longer than the limit of the file system, or that would make the
+# path too long, is shortened and ends with a hash of the full name.
+
+import hashlib, re, string
+
+FIELD_DOC = 'doc'
+FIELD_BODY = 'body'
+FIELD_PARAMS = 'params'
+FIELD_INDEX = 'index'
+FIELD_EXT = 'ext'
+FIELDS = [FIELD_DOC, FIELD_BODY, FIELD_PARAMS, FIELD_INDEX, FIELD_EXT]
+
+# The templates of the names used before templates existed
+DEFAULT_TEMPLATE = '{doc}_{params}.{ext}'
+DEFAULT_BODY_TEMPLATE = '{doc}_{body}_{params}.{ext}'
+
+# The longest path of Windows without long path support, and the longest
+# filename of most file systems.
+MAX_PATH = 259
+MAX_NAME = 255
+
+# Hex digits of the hashes added to names
+HASH_DIGITS = 10
+
+# Above this number of distinct values of a parameter, e.g. in a large
+# design table, new values are no longer remembered to detect collisions.
+VALUE_LIMIT = 100000
+
+# Characters not allowed in filenames on Windows, and path separators
+_INVALID = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+# Names of devices on Windows, which can not be used as the name of a file
+# even with an extension, e.g. "con.stl"
+_RESERVED = re.compile(r'^(CON|PRN|AUX|NUL|COM[1-9]|LPT[1-9])(?= *(\.|$))', re.IGNORECASE)
+
+# Raised for a template that can not be used.
+class FilenameError(ValueError):
+    pass
+
+# Clean a name or a field of a filename so that Windows accepts it: the
+# invalid characters become underscores, trailing dots and spaces, which
+# Windows drops, are removed and the name of a device gets an underscore,
+# e.g. "CON" becomes "CON_".
+def sanitize(text):
+    text = _INVALID.sub('_', text)
+    stripped = text.rstrip('. ')
+    if stripped == '' and text != '':
+        stripped = '_'
+    return _RESERVED.sub(r'\1_', stripped)
+
+# The text of a parameter value in a filename, e.g. "2_5_mm" for "2.5 mm".
+def valueText(value):
+    return sanitize(re.sub(r"\s+", '_', str(value)).replace('.', '_'))
+
+def shortHash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:HASH_DIGITS]
+
+class FilenameTemplate:
+    # Compile the template for the parameter names.  Raises FilenameError
+    # if a field is unknown, if the names would not tell the variants apart
+    # or, for a template of STL files per body, the bodies.
+    def __init__(self, template, names, perBody=False):
+        self.template = template
+        if '{' + FIELD_EXT + '}' not in template:
+            template += '.{' + FIELD_EXT + '}'
+
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as error:
+            raise FilenameError("Invalid filename template '" + self.template + "' - " + str(error))
+
+        # The literal text and field of each part, the invalid characters of
+        # the literal text are replaced once here.  The literal text is
+        # only part of a name, e.g. the dot before the extension, so it
+        # keeps its dots and spaces.
+        self.parts = []
+        fields = set()
+        for literal, field, spec, conversion in parsed:
+            if field is not None and field not in FIELDS and field not in names:
+                raise FilenameError("Unknown field '{" + field + "}' in the filename template '" + self.template + "' - Expected one of: " + ', '.join('{' + name + '}' for name in FIELDS + list(names)))
+            if field is not None:
+                fields.add(field)
+            self.parts.append((_INVALID.sub('_', literal), field, spec or ''))
+
+        if FIELD_PARAMS not in fields and FIELD_INDEX not in fields and not all(name in fields for name in names):
+            raise FilenameError("The filename template '" + self.template + "' needs {params}, {index} or every parameter so that each variant has its own files")
+        if perBody and FIELD_BODY not in fields:
+            raise FilenameError("The filename template '" + self.template + "' of the STL files per body needs {body}")
+
+    # Return the filename for the values of the fields.
+    def render(self, fields):
+        return ''.join(literal + (format(fields[field], spec) if field is not None else '') for literal, field, spec in self.parts)
+
+# The export filenames of the variants of a sweep.  begin() is called with
+# every variant in the order of the sweep, including the variants that are
+# skipped, so that the names are the same when a sweep is resumed.
+class ExportNames:
+    def __init__(self, folder, documentName, names, template=DEFAULT_TEMPLATE, bodyTemplate=DEFAULT_BODY_TEMPLATE, perBody=False, maxPath=MAX_PATH, log=None):
+        self.folder = folder
+        self.names = list(names)
+        self.template = FilenameTemplate(template, self.names)
+        self.bodyTemplate = FilenameTemplate(bodyTemplate, self.names, True) if perBody else None
+        self.log = log
+
+        # The longest filename that fits in the path limit
+        self.maxName = min(MAX_NAME, maxPath - len(folder) - 1)
+
+        self.fields = { FIELD_DOC: sanitize(documentName) }
+
+        # The text of each value of each parameter, and the value that owns
+        # each text.
+        self.valueTexts = [{} for name in self.names]
+        self.textValues = [{} for name in self.names]
+        self.bodyTexts = {}
+        self.textBodies = {}
+
+        self.shortenedCount = 0
+        self.collisionCount = 0
+
+    # Set the fields of the variant.
+    def begin(self, variant):
+        texts = [self.valueText(i, value) for i, value in enumerate(variant.values)]
+        fields = self.fields
+        fields[FIELD_INDEX] = variant.index + 1
+        fields[FIELD_PARAMS] = '_'.join(name + '_' + text for name, text in zip(self.names, texts))
+        for name, text in zip(self.names, texts):
+            fields[name] = text
+
+    def valueText(self, i, value):
+        text = self.valueTexts[i].get(value)
+        if text is not None:
+            return text
+
+        text = valueText(value)
+        owner = self.textValues[i].get(text, value)
+        if owner != value:
+            collision = text + '~' + shortHash(str(value))
+            self.collided("the values '{}' and '{}' of '{}' are both '{}' in filenames, '{}' is written as '{}'".format(owner, value, self.names[i], text, value, collision))
+            text = collision
+
+        if len(self.valueTexts[i]) < VALUE_LIMIT:
+            self.valueTexts[i][value] = text
+            self.textValues[i].setdefault(text, value)
+        return text
+
+    def bodyText(self, name):
+        text = self.bodyTexts.get(name)
+        if text is not None:
+            return text
+
+        text = sanitize(name)
+        owner = self.textBodies.setdefault(text, name)
+        if owner != name:
+            collision = text + '~' + shortHash(name)
+            self.collided("the bodies '{}' and '{}' are both '{}' in filenames, '{}' is written as '{}'".format(owner, name, text, name, collision))
+            text = collision
+
+        self.bodyTexts[name] = text
+        return text
+
+    def collided(self, message):
+        self.collisionCount += 1
+        if self.log:
+            self.log('ParaParam: ' + message)
+
+    # Return the path of the file of the variant with the extension, or of
+    # the file of a body.
+    def path(self, ext, body=None):
+        fields = self.fields
+        fields[FIELD_EXT] = ext
+        if body is None:
+            filename = self.template.render(fields)
+        else:
+            fields[FIELD_BODY] = self.bodyText(body)
+            filename = self.bodyTemplate.render(fields)
+
+        if len(filename) > self.maxName:
+            filename = self.shorten(filename, ext)
+        return self.folder + '/' + filename
+
+    # Cut the name to the limit, keeping the extension, and add the hash of
+    # the full name.
+    def shorten(self, filename, ext):
+        suffix = '.' + ext if filename.endswith('.' + ext) else ''
+        stem = filename[:len(filename) - len(suffix)]
+        keep = self.maxName - len(suffix) - 1 - HASH_DIGITS
+        if keep < 1:
+            raise FilenameError("The export folder '" + self.folder + "' is too long for the path limit")
+        self.shortenedCount += 1
+        return stem[:keep] + '~' + shortHash(stem) + suffix
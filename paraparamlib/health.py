@@ -0,0 +1,124 @@
+#Author-Hans Kellner
+#Description-Failed variants and pruning of infeasible regions for ParaParam
+#
+# Some combinations of parameters make the timeline fail, e.g. too few teeth
+# for the diameter of a gear.  The health of the timeline is checked after
+# each compute and a variant with failing features is not exported but
+# written to a failures file with the failing features.
+#
+# When a parameter is declared monotone ("@prune,Teeth") a failure is taken
+# to mean that the parameter has left the feasible range: once a variant
+# fails and the variant visited before it with the same values of the other
+# parameters did not fail, every variant further along the same direction,
+# with the same values of the other parameters, is skipped as infeasible.
+# The variants need not follow each other, so an outer parameter of a
+# nested sweep is pruned too.
+
+import csv, os
+
+FAILURES_FILENAME = 'ParaParamFailures'
+
+# The outcome of a variant in the failures file.
+#   failed - the timeline failed, the variant was not exported
+#   pruned - the variant was skipped as infeasible
+STATUS_FAILED = 'failed'
+STATUS_PRUNED = 'pruned'
+
+# The name of the failures file without the extension, e.g.
+# "ParaParamFailures.shard-2-of-4"
+def failuresFilename(shardIndex, shardCount):
+    if shardCount <= 1:
+        return FAILURES_FILENAME
+    return '{}.shard-{}-of-{}'.format(FAILURES_FILENAME, shardIndex, shardCount)
+
+# Parse the names of the monotone parameters of the @prune setting, e.g.
+# "Teeth;Module".
+def pruneNames(text):
+    return [name.strip() for name in text.split(';') if name.strip() != '']
+
+# The failed and pruned variants of a sweep, written to a CSV file as the
+# sweep goes.  The file is only created when the first variant fails.
+class FailureLog:
+    def __init__(self, folder, filename, names):
+        self.path = os.path.join(folder, filename + '.csv')
+        self.names = list(names)
+        self.file = None
+        self.failedCount = 0
+        self.prunedCount = 0
+
+    # errors is a list of (feature name, message).
+    def failed(self, index, values, errors):
+        self.failedCount += 1
+        for feature, message in errors:
+            self.write(index, values, STATUS_FAILED, feature, message)
+
+    # The variant was skipped because failedIndex failed before it.
+    def pruned(self, index, values, failedIndex):
+        self.prunedCount += 1
+        self.write(index, values, STATUS_PRUNED, '', 'Infeasible after variant {}'.format(failedIndex + 1))
+
+    def write(self, index, values, status, feature, message):
+        if self.file is None:
+            self.file = open(self.path, 'w', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(['index'] + self.names + ['status', 'feature', 'message'])
+        self.writer.writerow([index + 1] + [str(value) for value in values] + [status, feature, message])
+        self.file.flush()
+
+    def close(self):
+        if self.file and not self.file.closed:
+            self.file.close()
+
+# Tracks the feasible range of the monotone parameters of a plan.  Only
+# plans with axes, where variant.indices are the positions of the values,
+# can be pruned.
+class PruningFrontier:
+    def __init__(self, names, pruneNames):
+        for name in pruneNames:
+            if name not in names:
+                raise ValueError("The parameter '" + name + "' of @prune is not swept")
+        self.axes = [names.index(name) for name in pruneNames]
+
+        # The frontier of each line of a monotone axis, by the axis and the
+        # indices of the other axes: (index of the first infeasible value,
+        # direction, index of the variant that failed there).
+        self.frontiers = {}
+
+        # The last variant visited on each line without a frontier:
+        # (index of its value on the axis, failed).
+        self.lastVisited = {}
+
+    @staticmethod
+    def lineKey(axis, indices):
+        return (axis,) + indices[:axis] + indices[axis + 1:]
+
+    # Return the index of the failed variant that makes the variant
+    # infeasible, or None if it may be feasible.
+    def prunedBy(self, variant):
+        if variant.indices is None:
+            return None
+        for axis in self.axes:
+            frontier = self.frontiers.get(self.lineKey(axis, variant.indices))
+            if frontier is not None:
+                start, direction, failedIndex = frontier
+                if (variant.indices[axis] - start) * direction >= 0:
+                    return failedIndex
+        return None
+
+    # Record the outcome of a variant that was computed.
+    def visited(self, variant, failed):
+        if variant.indices is None:
+            return
+
+        # A failure after a feasible variant on the line of a monotone axis
+        # sets the frontier of that line.
+        for axis in self.axes:
+            key = self.lineKey(axis, variant.indices)
+            previous = self.lastVisited.get(key)
+            position = variant.indices[axis]
+            if failed and previous is not None and not previous[1] and previous[0] != position:
+                direction = 1 if position > previous[0] else -1
+                self.frontiers[key] = (position, direction, variant.index)
+                del self.lastVisited[key]
+            else:
+                self.lastVisited[key] = (position, failed)
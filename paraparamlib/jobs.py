@@ -0,0 +1,205 @@
+#Author-Hans Kellner
+#Description-Job queue for ParaParam sweeps
+#
+# In job queue mode the script watches a spool folder instead of showing its
+# dialog, so that sweeps can be submitted by a scheduler or any other
+# program.  A job is a JSON file named "<name>.job.json" describing the
+# document, the parameter file, the operations and the export folder:
+#
+#   {
+#     "document": "SpurGear",
+#     "params": "C:/Jobs/gear.csv",
+#     "operations": ["ExportSTL", "ExportSTEP"],
+#     "exportFolder": "C:/Jobs/gear",
+#     "settings": { "order": "Serpentine", "archive": "Zip" }
+#   }
+#
+# The jobs are run one after the other in the order of their names.  A job
+# is claimed by renaming it to "<name>.job.running" and once it has ended it
+# is renamed to "<name>.job.done", "<name>.job.cancelled" or
+# "<name>.job.failed".  Its progress and result are written to
+# "<name>.status.json", which is replaced as a whole so that it can be read
+# at any time, and an empty "<name>.cancel" file cancels it.
+
+import datetime, json, os, time
+
+from .runner import OPERATIONS, OP_LOOP_ONLY
+
+JOB_SUFFIX = '.job.json'
+RUNNING_SUFFIX = '.job.running'
+STATUS_SUFFIX = '.status.json'
+CANCEL_SUFFIX = '.cancel'
+
+# The states of a job in its status file, the last three are also the
+# suffixes of the job file once it has ended.
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_CANCELLED = 'cancelled'
+JOB_FAILED = 'failed'
+
+# Seconds between two looks at the spool folder
+POLL_INTERVAL = 2.0
+
+# Seconds between two writes of the progress of a job to its status file
+STATUS_INTERVAL = 5.0
+
+# Raised for a job file that can not be run.
+class JobError(ValueError):
+    pass
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+# Write a JSON file by replacing it, a reader never sees half a file.
+def _writeJSON(path, data):
+    tempPath = path + '.tmp'
+    with open(tempPath, 'w') as file:
+        json.dump(data, file, indent=2)
+    os.replace(tempPath, path)
+
+class Job:
+    def __init__(self, folder, name):
+        self.folder = folder
+        self.name = name
+        self.path = os.path.join(folder, name + RUNNING_SUFFIX)
+        self.statusPath = os.path.join(folder, name + STATUS_SUFFIX)
+        self.cancelPath = os.path.join(folder, name + CANCEL_SUFFIX)
+
+        self.document = None
+        self.documentId = None
+        self.params = None
+        self.operations = []
+        self.exportFolder = ''
+        self.exportSTLPerBody = False
+        self.restoreValues = True
+        self.resume = False
+        self.settings = {}
+
+        self.status = { 'job': name, 'state': JOB_RUNNING, 'started': _now() }
+        self.startTime = time.time()
+        self.statusTime = 0
+
+    # Read the job file.  Relative paths are relative to the spool folder.
+    # Raises JobError if the job is not valid.
+    def load(self):
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except (OSError, ValueError) as error:
+            raise JobError('Invalid job file - ' + str(error))
+        if not isinstance(data, dict):
+            raise JobError('Invalid job file - expected a JSON object')
+
+        known = ['document', 'documentId', 'params', 'operations', 'exportFolder', 'exportSTLPerBody', 'restoreValues', 'resume', 'settings']
+        for key in data:
+            if key not in known:
+                raise JobError("Unknown job field '" + key + "' - Expected one of: " + ', '.join(known))
+
+        self.document = self.text(data, 'document')
+        self.documentId = self.text(data, 'documentId')
+
+        params = self.text(data, 'params')
+        if params is None:
+            raise JobError("The job has no 'params' file")
+        self.params = os.path.join(self.folder, params)
+        if not os.path.isfile(self.params):
+            raise JobError("The parameter file '" + self.params + "' does not exist")
+
+        operations = data.get('operations', [])
+        if isinstance(operations, str):
+            operations = [operations]
+        if not isinstance(operations, list) or not all(isinstance(operation, str) for operation in operations):
+            raise JobError("'operations' must be a list of operation names")
+        for operation in operations:
+            if operation not in OPERATIONS:
+                raise JobError("Unknown operation '" + operation + "' - Expected one of: " + ', '.join(OPERATIONS))
+        self.operations = [operation for operation in operations if operation != OPERATIONS[OP_LOOP_ONLY]]
+
+        exportFolder = self.text(data, 'exportFolder')
+        if len(self.operations) > 0:
+            if exportFolder is None:
+                raise JobError("The job has operations but no 'exportFolder'")
+            self.exportFolder = os.path.join(self.folder, exportFolder)
+
+        self.exportSTLPerBody = self.flag(data, 'exportSTLPerBody', False)
+        self.restoreValues = self.flag(data, 'restoreValues', True)
+        self.resume = self.flag(data, 'resume', False)
+
+        # The settings of the "@" rows of a CSV file, by name with or
+        # without the "@".
+        settings = data.get('settings', {})
+        if not isinstance(settings, dict):
+            raise JobError("'settings' must be an object of setting names and values")
+        self.settings = {}
+        for name, value in settings.items():
+            if isinstance(value, (dict, list)) or value is None:
+                raise JobError("Invalid value of the setting '" + name + "'")
+            self.settings[name.lstrip('@').strip().lower()] = str(value)
+
+    def text(self, data, key):
+        value = data.get(key)
+        if value is not None and not isinstance(value, str):
+            raise JobError("'" + key + "' must be a string")
+        return value
+
+    def flag(self, data, key, default):
+        value = data.get(key, default)
+        if not isinstance(value, bool):
+            raise JobError("'" + key + "' must be true or false")
+        return value
+
+    def cancelRequested(self):
+        return os.path.exists(self.cancelPath)
+
+    def writeStatus(self, **fields):
+        self.status.update(fields)
+        self.status['updated'] = _now()
+        self.status['elapsedSeconds'] = round(time.time() - self.startTime, 1)
+        _writeJSON(self.statusPath, self.status)
+        self.statusTime = time.time()
+
+    # Write the progress of the job, at most every STATUS_INTERVAL seconds.
+    def progress(self, done, total):
+        if time.time() - self.statusTime >= STATUS_INTERVAL or done == total:
+            self.writeStatus(variantsDone=done, variants=total)
+
+    # Write the final status and rename the job file for its state.
+    def finish(self, state, message='', **fields):
+        self.writeStatus(state=state, message=message, finished=_now(), **fields)
+        try:
+            os.replace(self.path, os.path.join(self.folder, self.name + '.job.' + state))
+        except OSError:
+            pass
+        try:
+            os.remove(self.cancelPath)
+        except OSError:
+            pass
+
+class JobQueue:
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    # The jobs left running by a session that crashed or was closed, each
+    # session watches a folder of its own.
+    def interruptedJobs(self):
+        return [Job(self.folder, name[:-len(RUNNING_SUFFIX)]) for name in sorted(os.listdir(self.folder)) if name.endswith(RUNNING_SUFFIX)]
+
+    # Claim and return the next job, or None if there are none.  A job that
+    # can not be read is failed and the next one is tried.
+    def nextJob(self):
+        for filename in sorted(os.listdir(self.folder)):
+            if not filename.endswith(JOB_SUFFIX):
+                continue
+            job = Job(self.folder, filename[:-len(JOB_SUFFIX)])
+            try:
+                os.rename(os.path.join(self.folder, filename), job.path)
+            except OSError:
+                continue
+            try:
+                job.load()
+            except JobError as error:
+                job.finish(JOB_FAILED, str(error))
+                continue
+            return job
+        return None
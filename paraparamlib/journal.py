@@ -0,0 +1,104 @@
+#Author-Hans Kellner
+#Description-Checkpoint journal for ParaParam sweeps
+#
+# The journal is an append-only file with one JSON object per line.  The
+# first line describes the sweep (parameters, settings, original values) and
+# every following line records a completed variant.  Lines are flushed as
+# they are written so that after a crash the sweep can be resumed from the
+# last completed variant.
+
+import json, os
+
+JOURNAL_FILENAME = 'ParaParamJournal.jsonl'
+
+# The journal of one shard of a sweep, e.g. "ParaParamJournal.shard-2-of-4.jsonl"
+def shardJournalFilename(shardIndex, shardCount):
+    if shardCount <= 1:
+        return JOURNAL_FILENAME
+    return 'ParaParamJournal.shard-{}-of-{}.jsonl'.format(shardIndex, shardCount)
+
+# Raised when a journal can not be resumed.
+class JournalError(Exception):
+    pass
+
+class SweepJournal:
+    def __init__(self, path, file):
+        self.path = path
+        self.file = file
+
+    # Start a new journal, replacing any previous one at path.
+    @staticmethod
+    def create(path, sweep):
+        file = open(path, 'w')
+        journal = SweepJournal(path, file)
+        journal.write({ 'sweep': sweep })
+        return journal
+
+    # Continue writing to an existing journal.  A line cut short by a crash
+    # is ended first, so that the next entry starts on a line of its own.
+    @staticmethod
+    def reopen(path):
+        file = open(path, 'a')
+        if os.path.getsize(path) > 0:
+            with open(path, 'rb') as journalFile:
+                journalFile.seek(-1, os.SEEK_END)
+                if journalFile.read(1) != b'\n':
+                    file.write('\n')
+                    file.flush()
+        return SweepJournal(path, file)
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+
+    # Record a completed variant.  outputs maps the manifest key of each
+    # export operation to the files exported for it.
+    def completed(self, index, outputs):
+        self.write({ 'index': index, 'outputs': outputs })
+
+    # Record that the sweep ran to the end, it can no longer be resumed.
+    def finish(self):
+        self.write({ 'finished': True })
+        self.close()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+# Read a journal.  Returns the sweep description, a dict of the completed
+# variant indices to their exported outputs, and whether the sweep finished.
+def loadJournal(path):
+    if not os.path.isfile(path):
+        raise JournalError("No sweep journal found at '" + path + "'")
+
+    sweep = None
+    completed = {}
+    finished = False
+    with open(path) as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line may be truncated if Fusion crashed while
+                # writing it, the variant is simply done again.
+                continue
+
+            if 'sweep' in entry:
+                sweep = entry['sweep']
+            elif 'index' in entry:
+                completed[entry['index']] = entry['outputs']
+            elif entry.get('finished'):
+                finished = True
+
+    if sweep is None:
+        raise JournalError("The sweep journal '" + path + "' has no sweep description")
+
+    return sweep, completed, finished
+
+# Returns True if the journal at path describes a sweep that can be resumed.
+def isResumable(path):
+    try:
+        sweep, completed, finished = loadJournal(path)
+        return not finished
+    except (JournalError, OSError):
+        return False
@@ -0,0 +1,119 @@
+#Author-Hans Kellner
+#Description-Export manifest for ParaParam
+#
+# The manifest is a JSON file kept in the export folder which records the
+# files produced for each variant.  A variant is identified by its operation,
+# the version of the design and the full set of parameter values, so that a
+# rerun of a sweep can skip the variants whose files are already there and
+# unchanged.  Files streamed into archives are recorded by their member path,
+# see archive.py.
+
+import glob, hashlib, json, os
+
+from .archive import splitMemberPath, outputSize, memberChecksum
+
+MANIFEST_FILENAME = 'ParaParamManifest.json'
+MANIFEST_FORMAT = 1
+
+# The manifest of one shard of a sweep, e.g. "ParaParamManifest.shard-2-of-4.json"
+def shardManifestFilename(shardIndex, shardCount):
+    if shardCount <= 1:
+        return MANIFEST_FILENAME
+    return 'ParaParamManifest.shard-{}-of-{}.json'.format(shardIndex, shardCount)
+
+# Build the key identifying a variant in the manifest.
+def variantKey(operation, designVersion, names, values):
+    params = ';'.join(name + '=' + str(value) for name, value in zip(names, values))
+    return operation + '|' + str(designVersion) + '|' + params
+
+# Return the operation part of a variant key.
+def keyOperation(key):
+    return key.split('|', 1)[0]
+
+# Return the SHA-256 checksum of a file.
+def fileChecksum(path, blockSize=1024 * 1024):
+    checksum = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(blockSize), b''):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+# Return the SHA-256 checksum of an exported file or archive member.
+def outputChecksum(path):
+    member = splitMemberPath(path)
+    if member is None:
+        return fileChecksum(path)
+    return memberChecksum(*member)
+
+class ExportManifest:
+    def __init__(self, folder, filename=MANIFEST_FILENAME):
+        self.folder = folder
+        self.path = os.path.join(folder, filename)
+        self.entries = {}
+        self.unsaved = 0
+
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                data = json.load(file)
+            if data.get('format') == MANIFEST_FORMAT:
+                self.entries = data.get('variants', {})
+
+    # Returns True if the files recorded for the variant all exist with the
+    # size they had when they were exported.
+    def isCurrent(self, key):
+        entry = self.entries.get(key)
+        if entry is None or len(entry['outputs']) == 0:
+            return False
+
+        for output in entry['outputs']:
+            if outputSize(os.path.join(self.folder, output['path'])) != output['size']:
+                return False
+        return True
+
+    # Record the files exported for a variant.  The checksums and sizes are
+    # computed unless they are given.
+    def record(self, key, operation, designVersion, names, values, paths, checksums=None, sizes=None):
+        if checksums is None:
+            checksums = [outputChecksum(path) for path in paths]
+        if sizes is None:
+            sizes = [outputSize(path) for path in paths]
+
+        outputs = []
+        for path, checksum, size in zip(paths, checksums, sizes):
+            outputs.append({
+                'path': os.path.relpath(path, self.folder),
+                'size': size,
+                'sha256': checksum,
+            })
+
+        self.entries[key] = {
+            'operation': operation,
+            'designVersion': designVersion,
+            'params': dict(zip(names, (str(value) for value in values))),
+            'outputs': outputs,
+        }
+        self.unsaved += 1
+
+    # Write the manifest.  The file is replaced atomically so that a crash
+    # never leaves a truncated manifest behind.  It is written without
+    # indentation, which lets json use its C encoder, since the whole
+    # manifest is rewritten every few variants.
+    def save(self):
+        data = { 'format': MANIFEST_FORMAT, 'variants': self.entries }
+        tempPath = self.path + '.tmp'
+        with open(tempPath, 'w') as file:
+            file.write(json.dumps(data, sort_keys=True))
+        os.replace(tempPath, self.path)
+        self.unsaved = 0
+
+# Combine the manifests of all the shards in the folder into the main
+# manifest of the folder.  Returns the merged manifest and the paths of the
+# shard manifests that were merged.
+def mergeManifests(folder):
+    merged = ExportManifest(folder)
+    shardPaths = sorted(glob.glob(os.path.join(glob.escape(folder), 'ParaParamManifest.shard-*-of-*.json')))
+    for shardPath in shardPaths:
+        shard = ExportManifest(folder, os.path.basename(shardPath))
+        merged.entries.update(shard.entries)
+    merged.save()
+    return merged, shardPaths
@@ -0,0 +1,153 @@
+#Author-Hans Kellner
+#Description-Physical properties of each variant for ParaParam
+#
+# The Measure operation writes the physical properties of the design, or of
+# each body, to a single results file instead of exporting files: mass,
+# volume, area, density, centre of mass and bounding box, in the internal
+# units of Fusion (kg and cm).  The rows are buffered and written in blocks
+# of BLOCK_ROWS.  The CSV file may also be converted to a NumPy .npy file at
+# the end of the sweep, without needing NumPy.
+
+import csv, math, os, struct
+
+MEASURE_FILENAME = 'ParaParamMeasure'
+
+# The measured columns, in the order of the results file
+MEASURES = [
+    'mass_kg', 'volume_cm3', 'area_cm2', 'density_kg_cm3',
+    'com_x_cm', 'com_y_cm', 'com_z_cm',
+    'min_x_cm', 'min_y_cm', 'min_z_cm',
+    'max_x_cm', 'max_y_cm', 'max_z_cm',
+]
+
+# Number of rows buffered before they are written
+BLOCK_ROWS = 100
+
+# The name of the results file without the extension, e.g.
+# "ParaParamMeasure.shard-2-of-4"
+def measureFilename(shardIndex, shardCount):
+    if shardCount <= 1:
+        return MEASURE_FILENAME
+    return '{}.shard-{}-of-{}'.format(MEASURE_FILENAME, shardIndex, shardCount)
+
+# Return the MEASURES of a component or body, computed with the given
+# calculation accuracy.
+def measureGeometry(geometry, accuracy):
+    properties = geometry.getPhysicalProperties(accuracy)
+    box = geometry.boundingBox
+    return ([properties.mass, properties.volume, properties.area, properties.density]
+            + list(properties.centerOfMass.asArray())
+            + list(box.minPoint.asArray())
+            + list(box.maxPoint.asArray()))
+
+# Return the indices of the variants in a results file, used to measure
+# again the variants whose rows were lost when a sweep was interrupted.  A
+# row cut short by a crash is ignored.
+def measuredIndices(path):
+    indices = set()
+    if not os.path.isfile(path):
+        return indices
+    with open(path, newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        for row in reader:
+            if len(row) == len(header):
+                indices.add(int(row[0]) - 1)
+    return indices
+
+# Return the number in a value of the results file, the leading number of
+# an expression such as "10 mm", or NaN.
+def numericValue(text):
+    try:
+        return float(text.split()[0])
+    except (ValueError, IndexError):
+        return math.nan
+
+# Convert a results file to a .npy file holding a 2D array of doubles with
+# the same columns.  Parameter expressions become their leading number and
+# body names the order in which the bodies first appear, from 0.
+def writeNpy(csvPath, npyPath):
+    with open(csvPath, newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        rowCount = sum(1 for row in reader if len(row) == len(header))
+
+    columnCount = len(header)
+    bodyColumn = header.index('body') if 'body' in header else None
+    bodies = {}
+
+    # The .npy header, padded so that the data starts at a multiple of 64
+    description = "{{'descr': '<f8', 'fortran_order': False, 'shape': ({}, {}), }}".format(rowCount, columnCount)
+    padding = 64 - (10 + len(description) + 1) % 64
+    description += ' ' * (padding % 64) + '\n'
+
+    rowFormat = struct.Struct('<{}d'.format(columnCount))
+    with open(csvPath, newline='') as file, open(npyPath, 'wb') as npyFile:
+        npyFile.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(description)) + description.encode('latin1'))
+        reader = csv.reader(file)
+        next(reader)
+        for row in reader:
+            if len(row) != columnCount:
+                continue
+            values = [numericValue(value) for value in row]
+            if bodyColumn is not None:
+                values[bodyColumn] = bodies.setdefault(row[bodyColumn], len(bodies))
+            npyFile.write(rowFormat.pack(*values))
+
+class MeasureTable:
+    # Start the results file in folder, filename is without the extension.
+    # With append the rows are added to an existing file, when a sweep is
+    # resumed.
+    def __init__(self, folder, filename, names, perBody=False, append=False):
+        self.path = os.path.join(folder, filename + '.csv')
+        self.npyPath = os.path.join(folder, filename + '.npy')
+        self.perBody = perBody
+        self.rows = []
+        self.rowCount = 0
+
+        append = append and os.path.isfile(self.path)
+        self.file = open(self.path, 'a' if append else 'w', newline='')
+        self.writer = csv.writer(self.file)
+        if append:
+            # Start on a new line after a row cut short by a crash.
+            with open(self.path, 'rb') as file:
+                file.seek(0, os.SEEK_END)
+                if file.tell() > 0:
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) not in b'\r\n':
+                        self.file.write('\r\n')
+        else:
+            self.writer.writerow(['index'] + list(names) + (['body'] if perBody else []) + MEASURES)
+
+    # Measure the design, or each of its bodies, for the variant.  The rows
+    # of a variant are always written in the same block.
+    def measure(self, des, index, values, accuracy):
+        prefix = [index + 1] + [str(value) for value in values]
+        rowCount = len(self.rows)
+        if self.perBody:
+            bodies = des.rootComponent.bRepBodies
+            for i in range(bodies.count):
+                body = bodies.item(i)
+                self.rows.append(prefix + [body.name] + measureGeometry(body, accuracy))
+        else:
+            self.rows.append(prefix + measureGeometry(des.rootComponent, accuracy))
+
+        self.rowCount += len(self.rows) - rowCount
+        if len(self.rows) >= BLOCK_ROWS:
+            self.flush()
+
+    def flush(self):
+        if len(self.rows) > 0:
+            self.writer.writerows(self.rows)
+            self.rows = []
+        self.file.flush()
+
+    # Write the buffered rows and close the file, then convert it to .npy
+    # if asked to.
+    def close(self, npy=False):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+        if npy:
+            writeNpy(self.path, self.npyPath)
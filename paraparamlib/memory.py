@@ -0,0 +1,90 @@
+#Author-Hans Kellner
+#Description-Memory guard for long ParaParam sweeps
+#
+# The memory used by Fusion grows with every parameter change of a sweep,
+# mostly with the undo history, until a long sweep slows to a crawl.  The
+# guard samples the resident memory of the process every few variants and
+# once it is above the limit the sweep saves its progress and the document
+# is closed and opened again, which drops its history, or the sweep stops so
+# that it can be resumed after restarting Fusion.
+
+import ctypes, os, sys
+
+# Variants between two samples of the memory
+CHECK_INTERVAL = 10
+
+# Return the resident memory of this process in bytes, or None if it can
+# not be read on this platform.
+def processMemory():
+    try:
+        if sys.platform == 'win32':
+            return _windowsMemory()
+        if sys.platform == 'darwin':
+            return _macMemory()
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, AttributeError, ValueError):
+        return None
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    _fields_ = [
+        ('cb', ctypes.c_uint32),
+        ('PageFaultCount', ctypes.c_uint32),
+        ('PeakWorkingSetSize', ctypes.c_size_t),
+        ('WorkingSetSize', ctypes.c_size_t),
+        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+        ('PagefileUsage', ctypes.c_size_t),
+        ('PeakPagefileUsage', ctypes.c_size_t),
+    ]
+
+def _windowsMemory():
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+# rusage_info_v0: a 16 byte uuid followed by 64 bit counters, the resident
+# size is the 7th counter.
+_RUSAGE_INFO_V0 = 0
+_RESIDENT_SIZE = 2 + 6
+
+def _macMemory():
+    libproc = ctypes.CDLL('/usr/lib/libproc.dylib')
+    info = (ctypes.c_uint64 * 32)()
+    if libproc.proc_pid_rusage(os.getpid(), _RUSAGE_INFO_V0, ctypes.byref(info)) != 0:
+        return None
+    return info[_RESIDENT_SIZE]
+
+def formatMegabytes(size):
+    return '{:.0f} MB'.format(size / (1024 * 1024))
+
+# Samples the memory of the process every interval variants.
+class MemoryGuard:
+    def __init__(self, limitBytes, interval=CHECK_INTERVAL):
+        self.limitBytes = limitBytes
+        self.interval = interval
+        self.countdown = interval
+        self.memory = processMemory()
+        self.peak = self.memory or 0
+        self.available = self.memory is not None
+
+    # Returns True when a sample of the memory is above the limit, checked
+    # once every interval calls.
+    def exceeded(self):
+        if not self.available:
+            return False
+        self.countdown -= 1
+        if self.countdown > 0:
+            return False
+        self.countdown = self.interval
+        return self.sample() > self.limitBytes
+
+    def sample(self):
+        self.memory = processMemory() or 0
+        self.peak = max(self.peak, self.memory)
+        return self.memory
@@ -0,0 +1,208 @@
+#Author-Hans Kellner
+#Description-Parameters CSV file for ParaParam
+#
+# Each row of the file is "name,start,end,step" for one swept parameter, or
+# one of the other kinds of rows in sweep.AXIS_KINDS such as
+# "name,list,1,2,5".  Rows starting with '@' hold settings, e.g.
+# "@order,Serpentine".
+#
+# A file may instead be a design table: a header row with the names of the
+# parameters followed by one row of expressions per variant, e.g.
+#
+#   Diameter,Height
+#   10 mm,20 mm
+#   12 mm,25 mm
+#
+# Design tables are read as the sweep goes rather than loaded up front.
+
+import array, csv, itertools
+
+from .settings import SweepSettings, SettingsError
+from .sweep import Variant, SweepAxis, AXIS_KINDS
+
+# Raised when the parameters file can not be used.
+class ParamFileError(Exception):
+    pass
+
+def is_number(s):
+    try:
+        float(s)
+        return True
+    except ValueError:
+        return False
+
+# Read a parameters file.  Returns the parameter rows, with the values kept
+# as text so that they are exact, and the settings by their lower case name.
+def readParamFile(filename):
+    params = []
+    options = {}
+    with open(filename, newline='', encoding='utf-8-sig') as csv_file:
+
+        reader = csv.reader(csv_file)
+
+        # Skip the header row.
+        #next(reader)
+
+        for csv_row in reader:
+            # Rows starting with '@' hold settings, e.g. "@order,Serpentine"
+            if len(csv_row) > 0 and csv_row[0].startswith('@'):
+                if len(csv_row) != 2:
+                    raise ParamFileError("Invalid setting - File: " + filename + " - Line: '" + str(csv_row) + "'")
+                options[csv_row[0][1:].strip().lower()] = csv_row[1].strip()
+                continue
+
+            # Validate the row.
+            csv_row = [cell.strip() for cell in csv_row]
+            if len(csv_row) < 2 or csv_row[1].lower() not in AXIS_KINDS:
+                if len(csv_row) != 4:
+                    raise ParamFileError("Values missing in line - File: '" + filename + "' - Line '" + str(csv_row) + "'")
+
+                for i in range(3):
+                    if is_number(csv_row[i+1]) == False:
+                        raise ParamFileError("Invalid value - File: " + filename + " - Line: '" + str(csv_row) + "'")
+
+            try:
+                SweepAxis.fromRow(csv_row)
+            except ValueError as error:
+                raise ParamFileError("Invalid line - File: " + filename + " - Line: '" + str(csv_row) + "' - " + str(error))
+
+            params.append(csv_row)
+
+    # Validate the settings.
+    try:
+        SweepSettings().update(options)
+    except SettingsError as error:
+        raise ParamFileError("Invalid setting - File: " + filename + " - " + str(error))
+
+    return params, options
+
+# Returns True if the rows of the file are a header and the values of each
+# variant rather than "name,start,end,step" rows, that is the first row that
+# is not a setting has no numbers after the first column.
+def isDesignTable(filename):
+    with open(filename, newline='', encoding='utf-8-sig') as csv_file:
+        for csv_row in csv.reader(csv_file):
+            if len(csv_row) == 0 or csv_row[0].startswith('@'):
+                continue
+            if len(csv_row) > 1 and csv_row[1].strip().lower() in AXIS_KINDS:
+                return False
+            return not any(is_number(cell) for cell in csv_row[1:])
+    return False
+
+# Yield the offset, line number and text of each line of a file opened in
+# binary mode that is not blank.  The offset of the first line skips a
+# UTF-8 byte order mark.
+def readLines(file):
+    offset = 0
+    for lineNumber, line in enumerate(file, 1):
+        start = offset
+        offset += len(line)
+        if lineNumber == 1 and line.startswith(b'\xef\xbb\xbf'):
+            start += 3
+            line = line[3:]
+
+        text = line.decode('utf-8').strip()
+        if text != '':
+            yield start, lineNumber, text
+
+# A design table read from a CSV file.  Opening the table reads the settings
+# and the header and counts the variant rows, so that the number of variants
+# is known.  The rows are read and checked as the sweep reaches them.  A
+# sweep in file order streams the rows and never holds more than one, the
+# position of each row in the file is only recorded the first time a row is
+# read by its index, e.g. by a sampled or sharded sweep or the checks before
+# a sweep, so that any variant can then be read again.
+class DesignTable:
+    def __init__(self, filename):
+        self.filename = filename
+        self.options = {}
+        self.names = None
+
+        # The file offset and line number of each variant row, recorded by
+        # indexRows when needed
+        self.offsets = None
+        self.lines = None
+
+        # The number of settings and header rows before the variant rows
+        self.headerCount = 0
+
+        with open(filename, 'rb') as file:
+            lines = readLines(file)
+            for start, lineNumber, text in lines:
+                self.headerCount += 1
+                csv_row = next(csv.reader([text]))
+
+                # Settings rows come before the header.
+                if csv_row[0].startswith('@'):
+                    if len(csv_row) != 2:
+                        raise ParamFileError("Invalid setting - File: " + filename + " - Line: '" + str(csv_row) + "'")
+                    self.options[csv_row[0][1:].strip().lower()] = csv_row[1].strip()
+                    continue
+
+                self.names = tuple(name.strip() for name in csv_row)
+                if '' in self.names or len(set(self.names)) != len(self.names):
+                    raise ParamFileError("Invalid header - File: " + filename + " - Line: '" + str(csv_row) + "'")
+                break
+
+            self.count = sum(1 for line in lines)
+
+        if self.names is None:
+            raise ParamFileError("No header row - File: " + filename)
+
+        # Validate the settings.
+        try:
+            SweepSettings().update(self.options)
+        except SettingsError as error:
+            raise ParamFileError("Invalid setting - File: " + filename + " - " + str(error))
+
+        self.total = self.count
+
+        # The values are expressions written by hand
+        self.checkExpressions = True
+
+    def __len__(self):
+        return self.count
+
+    # The expressions of a design table already have their units.
+    def setUnits(self, units):
+        pass
+
+    # The offset, line number and text of each variant row, up to the number
+    # of rows counted when the table was opened.
+    def variantLines(self, file):
+        return itertools.islice(readLines(file), self.headerCount, self.headerCount + self.count)
+
+    def __iter__(self):
+        with open(self.filename, 'rb') as file:
+            for index, (start, lineNumber, text) in enumerate(self.variantLines(file)):
+                yield self.parseRow(index, lineNumber, text)
+
+    # Record where each variant row starts.
+    def indexRows(self):
+        offsets = array.array('q')
+        lines = array.array('l')
+        with open(self.filename, 'rb') as file:
+            for start, lineNumber, text in self.variantLines(file):
+                offsets.append(start)
+                lines.append(lineNumber)
+        if len(offsets) != self.count:
+            raise ParamFileError("Rows removed since the file was opened - File: '" + self.filename + "'")
+        self.offsets = offsets
+        self.lines = lines
+
+    def variantAt(self, index):
+        if index < 0 or index >= self.count:
+            raise IndexError('Variant index out of range: ' + str(index))
+        if self.offsets is None:
+            self.indexRows()
+        with open(self.filename, 'rb') as file:
+            file.seek(self.offsets[index])
+            return self.parseRow(index, self.lines[index], file.readline().decode('utf-8').strip())
+
+    # The values of a variant are the expressions of its row.
+    def parseRow(self, index, lineNumber, text):
+        csv_row = next(csv.reader([text]))
+        values = tuple(value.strip() for value in csv_row)
+        if len(values) != len(self.names) or '' in values:
+            raise ParamFileError("Values missing in line {} - File: '{}' - Line '{}'".format(lineNumber, self.filename, str(csv_row)))
+        return Variant(index, None, values)
@@ -0,0 +1,152 @@
+#Author-Hans Kellner
+#Description-Background post-processing of exported files for ParaParam
+#
+# Exports have to run on Fusion's main thread but the work done on the files
+# afterwards does not.  The post-processor runs that work in a small thread
+# pool so that it overlaps with computing the next variant.  The number of
+# variants waiting to be processed is bounded, when the workers fall behind
+# the sweep waits for a slot instead of piling up work.
+
+import collections, concurrent.futures, gzip, os, shutil, struct, threading
+
+from .manifest import fileChecksum
+from .filenames import sanitize, valueText
+
+# Directory layouts for the processed files.
+#   Flat            - the files stay in the export folder
+#   By Extension    - one sub folder per file type, e.g. "stl/"
+#   By First Parameter - one sub folder per value of the outermost parameter,
+#                     e.g. "Teeth_12/"
+LAYOUT_FLAT = 'Flat'
+LAYOUT_EXTENSION = 'By Extension'
+LAYOUT_FIRST_PARAM = 'By First Parameter'
+LAYOUTS = [LAYOUT_FLAT, LAYOUT_EXTENSION, LAYOUT_FIRST_PARAM]
+
+# The outcome of post-processing the files of one variant.
+#   files     - the final paths of the files of each output
+#   checksums - the SHA-256 checksum of each final file of each output
+#   errors    - a message for each file that failed a step
+PostResult = collections.namedtuple('PostResult', ['variant', 'files', 'checksums', 'errors'])
+
+# Count the triangles of an STL file, binary or ASCII.  Raises ValueError if
+# the file is not a valid STL file.
+def stlTriangleCount(path):
+    size = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        header = file.read(84)
+
+        # Binary STL: 80 byte header, triangle count, 50 bytes per triangle
+        if len(header) == 84:
+            count = struct.unpack('<I', header[80:84])[0]
+            if size == 84 + count * 50:
+                return count
+
+        if not header.lstrip().startswith(b'solid'):
+            raise ValueError('Not an STL file')
+
+        file.seek(0)
+        count = 0
+        for line in file:
+            if line.lstrip().startswith(b'facet'):
+                count += 1
+        if not line.strip().startswith(b'endsolid'):
+            raise ValueError('Truncated ASCII STL file')
+        return count
+
+def compressFile(path):
+    compressedPath = path + '.gz'
+    with open(path, 'rb') as source, gzip.open(compressedPath, 'wb') as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    os.remove(path)
+    return compressedPath
+
+# Return the sub folder a file is moved to by the layout.  The value of the
+# first parameter is written as in filenames, e.g. "Height_10_mm" for "10 mm".
+def layoutFolder(layout, path, names, values):
+    if layout == LAYOUT_EXTENSION:
+        if path.endswith('.gz'):
+            path = path[:-3]
+        return os.path.splitext(path)[1].lstrip('.').lower()
+    elif layout == LAYOUT_FIRST_PARAM and len(names) > 0:
+        return sanitize(names[0]) + '_' + valueText(values[0])
+    return ''
+
+class PostProcessor:
+    def __init__(self, compress=False, validateSTL=False, layout=LAYOUT_FLAT, workers=2, maxPending=16):
+        if layout not in LAYOUTS:
+            raise ValueError('Unknown layout: ' + str(layout))
+
+        self.compress = compress
+        self.validateSTL = validateSTL
+        self.layout = layout
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ParaParamPost')
+        self.slots = threading.BoundedSemaphore(maxPending)
+        self.pending = collections.deque()
+
+    # Queue the files exported for a variant.  outputs maps a key, like the
+    # export operation, to its list of files.  Blocks while maxPending
+    # variants are still waiting to be processed.
+    def submit(self, variant, names, values, outputs):
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self.process, variant, names, values, dict(outputs))
+        except:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda f: self.slots.release())
+        self.pending.append(future)
+
+    # Return the results of the variants processed so far, in the order they
+    # were submitted, without waiting.
+    def completed(self):
+        results = []
+        while len(self.pending) > 0 and self.pending[0].done():
+            results.append(self.pending.popleft().result())
+        return results
+
+    # Wait for all the queued variants and return their results.
+    def close(self):
+        results = []
+        while len(self.pending) > 0:
+            results.append(self.pending.popleft().result())
+        self.executor.shutdown(wait=True)
+        return results
+
+    # Runs on a worker thread.
+    def process(self, variant, names, values, outputs):
+        finalFiles = {}
+        checksums = {}
+        errors = []
+        for key, files in outputs.items():
+            finalFiles[key] = []
+            checksums[key] = []
+            for path in files:
+                try:
+                    checksum, path = self.processFile(path, names, values)
+                    checksums[key].append(checksum)
+                    finalFiles[key].append(path)
+                except Exception as error:
+                    errors.append("'" + path + "' " + str(error))
+
+        return PostResult(variant, finalFiles, checksums, errors)
+
+    # Returns the checksum and the final path of the file.
+    def processFile(self, path, names, values):
+        # An invalid file is left as it is and not recorded, so that it is
+        # exported again by the next run.
+        if self.validateSTL and path.lower().endswith('.stl'):
+            if stlTriangleCount(path) == 0:
+                raise ValueError('has no triangles')
+
+        if self.compress:
+            path = compressFile(path)
+
+        subfolder = layoutFolder(self.layout, path, names, values)
+        if subfolder != '':
+            folder = os.path.join(os.path.dirname(path), subfolder)
+            os.makedirs(folder, exist_ok=True)
+            target = os.path.join(folder, os.path.basename(path))
+            os.replace(path, target)
+            path = target
+
+        return fileChecksum(path), path
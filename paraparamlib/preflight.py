@@ -0,0 +1,162 @@
+#Author-Hans Kellner
+#Description-Pre-flight check of a ParaParam sweep
+#
+# Before a long sweep is started the pre-flight check makes sure that every
+# parameter exists and that the expressions are valid, then runs a few
+# sample variants into a temporary folder to measure the time and disk space
+# each variant takes.  The projection of the whole sweep is shown to the
+# user who decides whether to start it.
+
+import shutil, tempfile
+
+from .sweep import SubsetPlan, sampleIndices
+from .progress import formatDuration
+from .settings import SweepSettings
+from .runner import SweepRunner, applyVariant, variantExpressions
+from .archive import ARCHIVE_FOLDER
+
+# The number of variants whose expressions are checked
+EXPRESSION_SAMPLES = 1000
+
+# Format a number of bytes, e.g. "1.5 GB"
+def formatSize(size):
+    for unit in ['bytes', 'KB', 'MB', 'GB']:
+        if size < 1024 or unit == 'GB':
+            break
+        size /= 1024.0
+    if unit == 'bytes':
+        return '{:.0f} {}'.format(size, unit)
+    return '{:.1f} {}'.format(size, unit)
+
+class PreflightReport:
+    def __init__(self, count):
+        self.count = count
+        self.errors = []
+        self.warnings = []
+        self.cancelled = False
+        self.sampleCount = 0
+        self.secondsPerVariant = 0.0
+        self.filesPerVariant = 0.0
+        self.bytesPerVariant = 0.0
+        self.freeBytes = None
+
+    def projectedSeconds(self):
+        return self.count * self.secondsPerVariant
+
+    def projectedBytes(self):
+        return self.count * self.bytesPerVariant
+
+    # The text shown to the user.
+    def message(self):
+        if len(self.errors) > 0:
+            return 'The sweep can not be run:\n\n' + '\n'.join(self.errors)
+
+        lines = ['Variants: {:,}'.format(self.count)]
+        if self.sampleCount > 0:
+            lines.append('Time per variant: {:.2f}s ({} sampled)'.format(self.secondsPerVariant, self.sampleCount))
+            lines.append('Projected duration: ' + formatDuration(self.projectedSeconds()))
+            if self.filesPerVariant > 0:
+                lines.append('Export files: about {:,.0f} ({:.1f} per variant)'.format(self.count * self.filesPerVariant, self.filesPerVariant))
+                disk = 'Projected disk usage: ' + formatSize(self.projectedBytes())
+                if self.freeBytes is not None:
+                    disk += ' of ' + formatSize(self.freeBytes) + ' free'
+                lines.append(disk)
+        lines.extend(self.warnings)
+        lines.append('')
+        lines.append('Start the sweep?')
+        return '\n'.join(lines)
+
+# Check the parameters and expressions of a plan.  Returns the list of
+# errors.
+def checkPlan(des, plan):
+    errors = []
+    userParams = {}
+    for name in plan.names:
+        userParam = des.userParameters.itemByName(name)
+        if userParam is None:
+            errors.append("The user parameter '" + name + "' does not exist.")
+        else:
+            userParams[name] = userParam
+    if len(errors) > 0:
+        return errors
+
+    # Check each distinct expression of the sampled variants once.
+    plan.setUnits({ name: userParam.unit for name, userParam in userParams.items() })
+    planIndices = getattr(plan, 'indices', range(plan.count))
+    sample = SubsetPlan(plan, [planIndices[i] for i in sampleIndices(plan.count, EXPRESSION_SAMPLES)])
+    checked = set()
+    try:
+        for variant in sample:
+            expressions = variantExpressions(plan.names, variant)
+            for name, expression in expressions.items():
+                if (name, expression) in checked:
+                    continue
+                checked.add((name, expression))
+                if not des.unitsManager.isValidExpression(expression, userParams[name].unit):
+                    errors.append("Invalid expression '{}' for parameter '{}' in variant {}".format(expression, name, variant.index + 1))
+    except Exception as error:
+        # e.g. a row with missing values in a design table
+        errors.append(str(error))
+
+    return errors
+
+# Check the plan and run up to samples variants of it to project the time
+# and disk space of the sweep.  The parameter values of the design are
+# restored afterwards.
+def runPreflight(host, des, plan, operations, exportFolder, exportSTLPerBody, settings, samples=3):
+    report = PreflightReport(plan.count)
+    report.errors = checkPlan(des, plan)
+    if len(report.errors) > 0 or samples <= 0 or plan.count == 0:
+        return report
+
+    # Run the samples with the same settings, without sharding, profiling,
+    # archives or any files left behind.  Archived files are stored without
+    # compression, so the loose files have the same size.
+    sampleSettings = SweepSettings.fromDict(settings.asDict())
+    sampleSettings.report = True
+    sampleSettings.profile = False
+    sampleSettings.shardIndex = 1
+    sampleSettings.shardCount = 1
+    sampleSettings.archive = ARCHIVE_FOLDER
+
+    userParams = { name: des.userParameters.itemByName(name) for name in plan.names }
+    originalValues = { name: userParams[name].expression for name in plan.names }
+    paramValues = dict(originalValues)
+
+    planIndices = getattr(plan, 'indices', range(plan.count))
+    samplePlan = SubsetPlan(plan, [planIndices[i] for i in sampleIndices(plan.count, samples)])
+
+    sampleFolder = tempfile.mkdtemp(prefix='ParaParamPreflight')
+    try:
+        runner = SweepRunner(host, des, samplePlan, paramValues, operations, sampleFolder, exportSTLPerBody, sampleSettings, reportFolder=sampleFolder)
+        try:
+            report.cancelled = not runner.run()
+        finally:
+            applyVariant(des, userParams, paramValues, originalValues, host.valueInput)
+
+        total = runner.report.summary()['total']
+        report.sampleCount = total['count']
+        if report.sampleCount > 0:
+            report.secondsPerVariant = total['mean']
+
+            # The exported files, as recorded in the manifest of the run,
+            # rather than every file of the folder, which also holds the
+            # manifest, report and results of the run.
+            fileCount = 0
+            byteCount = 0
+            if runner.manifest:
+                for entry in runner.manifest.entries.values():
+                    for output in entry['outputs']:
+                        fileCount += 1
+                        byteCount += output['size'] or 0
+            report.filesPerVariant = fileCount / report.sampleCount
+            report.bytesPerVariant = byteCount / report.sampleCount
+    finally:
+        shutil.rmtree(sampleFolder, ignore_errors=True)
+
+    if exportFolder and len(operations) > 0:
+        report.freeBytes = shutil.disk_usage(exportFolder).free
+        if report.projectedBytes() > report.freeBytes:
+            report.warnings.append('WARNING: the exports may not fit in the free disk space.')
+
+    return report
@@ -0,0 +1,74 @@
+#Author-Hans Kellner
+#Description-Viewport refresh throttling and progress reporting for ParaParam
+
+import time
+
+# How often the viewport is refreshed during a sweep.
+#   Every Iteration   - after every variant (the original behaviour)
+#   Every N Iterations - after every N-th variant
+#   Every T Seconds   - at most once every T seconds
+#   Never             - the viewport is only refreshed when the sweep ends
+REFRESH_ALWAYS = 'Every Iteration'
+REFRESH_ITERATIONS = 'Every N Iterations'
+REFRESH_SECONDS = 'Every T Seconds'
+REFRESH_NEVER = 'Never'
+REFRESH_MODES = [REFRESH_ALWAYS, REFRESH_ITERATIONS, REFRESH_SECONDS, REFRESH_NEVER]
+
+# Decides when the viewport should be refreshed.
+class RefreshThrottle:
+    def __init__(self, mode=REFRESH_ALWAYS, interval=1, clock=time.monotonic):
+        if mode not in REFRESH_MODES:
+            raise ValueError('Unknown refresh mode: ' + str(mode))
+
+        self.mode = mode
+        self.interval = max(interval, 1)
+        self.clock = clock
+        self.count = 0
+        self.lastRefresh = clock()
+
+    # Called once per variant, returns True when the viewport should be
+    # refreshed.
+    def due(self):
+        self.count += 1
+
+        if self.mode == REFRESH_ALWAYS:
+            return True
+        elif self.mode == REFRESH_ITERATIONS:
+            return self.count % self.interval == 0
+        elif self.mode == REFRESH_SECONDS:
+            now = self.clock()
+            if now - self.lastRefresh >= self.interval:
+                self.lastRefresh = now
+                return True
+        return False
+
+# Tracks the elapsed time of a sweep and estimates the remaining time.
+class ProgressClock:
+    def __init__(self, total, clock=time.monotonic):
+        self.total = total
+        self.clock = clock
+        self.startTime = clock()
+
+    def elapsed(self):
+        return self.clock() - self.startTime
+
+    # Estimated seconds remaining after done of total variants, or None if
+    # nothing has been done yet.
+    def remaining(self, done):
+        if done <= 0:
+            return None
+        return self.elapsed() / done * max(self.total - done, 0)
+
+    # A progress message like "Variant 10 of 45 - Elapsed 0:01:05 - ETA 0:03:40"
+    def message(self, done):
+        text = 'Variant {} of {} - Elapsed {}'.format(done, self.total, formatDuration(self.elapsed()))
+        remaining = self.remaining(done)
+        if remaining is not None:
+            text += ' - ETA ' + formatDuration(remaining)
+        return text
+
+# Format a number of seconds as h:mm:ss.
+def formatDuration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '{}:{:02d}:{:02d}'.format(hours, minutes, seconds)
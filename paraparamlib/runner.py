@@ -0,0 +1,732 @@
+#Author-Hans Kellner
+#Description-Sweep execution for ParaParam
+#
+# The runner drives a design through a sweep plan: it applies the parameter
+# values of each variant, exports the requested formats and keeps the
+# manifest and journal up to date.  It does not import adsk, everything it
+# needs from Fusion is either the design object passed in or a SweepHost,
+# so the same code runs inside Fusion and against the stand-in used by the
+# benchmarks.
+
+import cProfile, io, math, os, pstats, time
+
+from .progress import RefreshThrottle, ProgressClock, formatDuration, REFRESH_ALWAYS
+from .settings import STL_BINARY, MESH_CUSTOM
+from .manifest import ExportManifest, variantKey, keyOperation, shardManifestFilename
+from .postprocess import PostProcessor
+from .timing import RunReport, reportFilename, PROFILE_FILENAME
+from .bodies import BodyExportCache, bodyFingerprint, linkFile
+from .health import FailureLog, PruningFrontier, failuresFilename, pruneNames
+from .measure import MeasureTable, measureFilename, measuredIndices
+from .archive import ArchiveSink, outputsFilename, outputSize, outputsExist, ARCHIVE_FOLDER
+from .filenames import ExportNames
+from .memory import MemoryGuard, formatMegabytes
+
+OP_LOOP_ONLY = 0
+OP_EXPORT_FUSION = 1
+OP_EXPORT_IGES = 2
+OP_EXPORT_SAT = 3
+OP_EXPORT_SMT = 4
+OP_EXPORT_STEP = 5
+OP_EXPORT_STL = 6
+OP_MEASURE = 7
+
+OPERATIONS = [ "LoopOnly", "ExportFusion", "ExportIGES", "ExportSAT", "ExportSMT", "ExportSTEP", "ExportSTL", "Measure" ]
+
+# The operations that export files, which are recorded in the export
+# manifest.
+def exportOperations(operations):
+    return [operation for operation in operations if operation != OPERATIONS[OP_MEASURE]]
+
+# Minimum seconds between progress updates
+PROGRESS_INTERVAL = 0.5
+
+# Minimum number of exported variants between saves of the export manifest.
+# Since the whole manifest is rewritten the interval grows with it, by
+# MANIFEST_SAVE_FRACTION of its entries, which keeps the total cost of the
+# saves linear.  The entries not saved before a crash are recovered from the
+# journal when the sweep is resumed.
+MANIFEST_SAVE_INTERVAL = 10
+MANIFEST_SAVE_FRACTION = 0.1
+
+# Progress reporting that shows nothing and is never cancelled.
+class NullProgress:
+    def __init__(self):
+        self.progressValue = 0
+        self.message = ''
+        self.wasCancelled = False
+
+    def hide(self):
+        pass
+
+# The services of the application used while running a sweep.  This base
+# class does nothing, ParaParam provides one backed by the Fusion API.
+class SweepHost:
+    # The name of the document, used as the prefix of the export filenames.
+    def documentName(self):
+        return 'Untitled'
+
+    # The version of the design, used to tell exports of different versions
+    # of the design apart in the export manifest.
+    def designVersion(self):
+        return 'unsaved'
+
+    def log(self, message):
+        pass
+
+    # Show a message that needs the attention of the user.
+    def showMessage(self, message):
+        pass
+
+    # Let the application process its UI events.
+    def doEvents(self):
+        pass
+
+    def refreshViewport(self):
+        pass
+
+    # Show the progress of a sweep of total variants.  Returns an object
+    # with progressValue, message and wasCancelled properties and a hide()
+    # method.
+    def showProgress(self, message, total):
+        return NullProgress()
+
+    # Return the API value of a mesh refinement setting name.
+    def meshRefinement(self, name):
+        return name
+
+    # Return the ValueInput of an expression, used to set several
+    # parameters at once, or None to set them one at a time.
+    def valueInput(self, expression):
+        return None
+
+    # Return the API value of a calculation accuracy setting name.
+    def calculationAccuracy(self, name):
+        return name
+
+    # Return the features of the timeline of the design that failed to
+    # compute, as a list of (feature name, message).
+    def timelineErrors(self, des):
+        return []
+
+    # Close the document of the design without saving it and open its saved
+    # version again, which drops its undo history.  Returns the design of
+    # the reopened document, or None if it can not be reopened.
+    def reopenDocument(self, des):
+        return None
+
+# The operation as recorded in the export manifest, including the options
+# that change the exported files.
+def getOperationKey(operation, exportSTLPerBody, settings):
+    operationKey = operation
+    if operation == OPERATIONS[OP_EXPORT_STL]:
+        if exportSTLPerBody:
+            operationKey += '/PerBody'
+        operationKey += '/' + settings.stlOptionsKey()
+    return operationKey
+
+# The expressions written to the user parameters for a variant, by name.
+# The expressions of a sweep plan are built once with the units of the
+# parameters, see SweepPlan.setUnits.
+def variantExpressions(names, variant):
+    # NOTE: setting the 'value' property does not change the value.  Must set expression.
+    expressions = {}
+    for name, val in zip(names, variant.expressions or variant.values):
+        expressions[name] = str(val)
+    return expressions
+
+# Write the expressions of a variant to the user parameters.  Several
+# changes are made with a single call to Design.modifyParameters, which
+# computes the design once, so that the design never goes through the
+# intermediate (and possibly failing) states of a partial update.  valueInput
+# makes the ValueInput of an expression, without it or without
+# modifyParameters the parameters are set one at a time and each one
+# computes the design.  Returns the number of parameters changed and the
+# time taken to write them, which is the time of the compute.
+def applyVariant(des, userParams, paramValues, expressions, valueInput=None):
+    changes = [(name, expression) for name, expression in expressions.items() if paramValues[name] != expression]
+    if len(changes) == 0:
+        return 0, 0.0
+
+    startTime = time.perf_counter()
+
+    if len(changes) > 1 and valueInput is not None and hasattr(des, 'modifyParameters'):
+        parameters = [userParams[name] for name, expression in changes]
+        values = [valueInput(expression) for name, expression in changes]
+        if not des.modifyParameters(parameters, values):
+            raise RuntimeError('Failed to set the parameters ' + ', '.join(name + ' = ' + expression for name, expression in changes))
+        for name, expression in changes:
+            paramValues[name] = expression
+    else:
+        for name, expression in changes:
+            userParams[name].expression = expression
+
+            # Track in running values
+            paramValues[name] = expression
+
+    return len(changes), time.perf_counter() - startTime
+
+class SweepRunner:
+    # paramValues holds the current expression of each swept parameter and
+    # is kept up to date as the variants are applied.  completed maps the
+    # indices of the variants done by a previous run to their outputs.  The
+    # run report and profile are written to reportFolder, the export folder
+    # by default.
+    def __init__(self, host, des, plan, paramValues, operations, exportFolder, exportSTLPerBody, settings, journal=None, completed=None, reportFolder=None):
+        self.host = host
+        self.des = des
+        self.plan = plan
+        self.paramValues = paramValues
+        self.operations = list(operations)
+        self.exportFolder = exportFolder
+        self.exportSTLPerBody = exportSTLPerBody
+        self.settings = settings
+        self.journal = journal
+        self.completed = completed if completed is not None else {}
+        self.reportFolder = reportFolder if reportFolder else exportFolder
+
+        self.applyCount = 0
+        self.applyTime = 0.0
+        self.applyTimeMax = 0.0
+        self.skipCount = 0
+        self.postErrors = []
+
+        # The position of the variant within this sweep, variant.index is
+        # the position in the full plan when the sweep is sharded.
+        self.position = 0
+        self.cancelled = False
+        self.started = False
+        self.finished = False
+
+        self.reopenCount = 0
+        self.memoryStopped = False
+
+    # Run the whole sweep.  Returns True if every variant was visited, False
+    # if the sweep was cancelled.
+    def run(self):
+        profile = None
+        if self.settings.profile:
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            self.start()
+            try:
+                while self.step():
+                    pass
+            finally:
+                self.finish()
+        finally:
+            if profile:
+                profile.disable()
+                self.saveProfile(profile)
+        return not self.cancelled
+
+    # Write the profile of the run and log the functions that took the most
+    # time.  The profile file can be opened with pstats or snakeviz.
+    def saveProfile(self, profile):
+        profilePath = os.path.join(self.reportFolder, PROFILE_FILENAME)
+        profile.dump_stats(profilePath)
+
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(20)
+        self.host.log('ParaParam: profile written to ' + profilePath + '\n' + text.getvalue())
+
+    def start(self):
+        # Get the actual parameters to modify
+        self.userParams = {}
+        for name in self.plan.names:
+            userParam = self.des.userParameters.itemByName(name)
+            if userParam is None:
+                raise ValueError("The user parameter '" + name + "' does not exist.")
+            self.userParams[name] = userParam
+        self.plan.setUnits({ name: userParam.unit for name, userParam in self.userParams.items() })
+
+        self.refreshThrottle = RefreshThrottle(self.settings.refreshMode, self.settings.refreshInterval)
+        self.progressClock = ProgressClock(self.plan.count)
+        self.lastProgressTime = None
+        self.progress = self.host.showProgress(self.progressClock.message(0), self.plan.count)
+
+        # The manifest of the files already in the export folder, used to
+        # skip the variants exported by a previous run.  Each export
+        # operation of a variant has its own entry.
+        self.manifest = None
+        self.operationKeys = {}
+        self.exportOperations = exportOperations(self.operations)
+        if len(self.exportOperations) > 0:
+            self.manifest = ExportManifest(self.exportFolder, shardManifestFilename(self.settings.shardIndex, self.settings.shardCount))
+            self.designVersion = self.host.designVersion()
+            for operation in self.exportOperations:
+                self.operationKeys[operation] = getOperationKey(operation, self.exportSTLPerBody, self.settings)
+
+            # The filename templates are compiled once for the sweep.
+            perBody = self.exportSTLPerBody and OPERATIONS[OP_EXPORT_STL] in self.operations
+            self.exportNames = ExportNames(self.exportFolder, self.host.documentName(), self.plan.names, self.settings.filenameTemplate, self.settings.bodyFilenameTemplate, perBody, self.settings.maxPath, self.host.log)
+
+        # Post-process the exported files in the background.  The manifest
+        # and journal are only updated once the files of a variant are
+        # processed.
+        self.postProcessor = None
+        if self.manifest and self.settings.postProcess:
+            self.postProcessor = PostProcessor(self.settings.compress, self.settings.validateSTL, self.settings.layout)
+
+        # Stream the exported files into archives.  The variants of a
+        # resumed sweep whose files were lost with an archive that was never
+        # closed are exported again.
+        self.archive = None
+        if self.manifest and self.settings.archive != ARCHIVE_FOLDER:
+            self.completed = { index: outputs for index, outputs in self.completed.items() if outputsExist(outputs) }
+            filename = outputsFilename(self.settings.shardIndex, self.settings.shardCount)
+            self.archive = ArchiveSink(self.exportFolder, filename, self.settings.archive, self.settings.archiveSize * 1024 * 1024, self.plan.names)
+
+        # The last export of each body, so that unchanged bodies are not
+        # exported again.  The previous files are no longer in the folder
+        # once they are archived.
+        self.bodyCache = None
+        if self.exportSTLPerBody and self.settings.reuseBodies and not self.archive and OPERATIONS[OP_EXPORT_STL] in self.operations:
+            self.bodyCache = BodyExportCache()
+            self.pendingFingerprints = {}
+
+        # The physical properties of each variant.  When a sweep is resumed
+        # the variants whose rows were lost are measured again.
+        self.measurements = None
+        if OPERATIONS[OP_MEASURE] in self.operations:
+            filename = measureFilename(self.settings.shardIndex, self.settings.shardCount)
+            resumed = len(self.completed) > 0
+            if resumed:
+                measured = measuredIndices(os.path.join(self.exportFolder, filename + '.csv'))
+                self.completed = { index: outputs for index, outputs in self.completed.items() if index in measured }
+            self.measurements = MeasureTable(self.exportFolder, filename, self.plan.names, self.settings.measureBodies, resumed)
+            self.measureAccuracy = self.host.calculationAccuracy(self.settings.measureAccuracy)
+
+        # The variants whose timeline failed, and the feasible range of the
+        # monotone parameters.
+        self.failures = None
+        self.frontier = None
+        if self.settings.checkHealth:
+            self.failures = FailureLog(self.reportFolder, failuresFilename(self.settings.shardIndex, self.settings.shardCount), self.plan.names)
+            if self.settings.prune:
+                self.frontier = PruningFrontier(self.plan.names, pruneNames(self.settings.prune))
+
+        # The memory of Fusion, sampled every few variants.
+        self.memoryGuard = None
+        if self.settings.memoryLimit > 0:
+            self.memoryGuard = MemoryGuard(self.settings.memoryLimit * 1024 * 1024)
+            if not self.memoryGuard.available:
+                self.host.log('ParaParam: the memory of Fusion can not be read on this platform, @memorylimit is ignored')
+
+        # The time spent in each phase of each variant.
+        self.report = None
+        if self.settings.report:
+            self.report = RunReport(self.reportFolder, reportFilename(self.settings.shardIndex, self.settings.shardCount), self.plan.names)
+
+        self.variants = iter(self.plan)
+        self.started = True
+
+    # Process the next variant.  Returns False when there are no more
+    # variants or the sweep was cancelled.
+    def step(self):
+        if self.cancelled:
+            return False
+
+        # Free the memory of the document when Fusion uses too much.
+        if self.memoryGuard and self.memoryGuard.exceeded() and not self.reclaimMemory():
+            return False
+
+        variant = next(self.variants, None)
+        if variant is None:
+            return False
+        self.position += 1
+
+        if self.manifest:
+            self.exportNames.begin(variant)
+
+        keys = {}
+        for operation, operationKey in self.operationKeys.items():
+            keys[operation] = variantKey(operationKey, self.designVersion, self.plan.names, variant.values)
+
+        # Skip the variants completed before the sweep was interrupted.
+        if variant.index in self.completed:
+            self.recoverCompleted(variant)
+            return True
+
+        # Only export the formats that are missing or stale, and skip the
+        # variant when there are none and it is not measured.
+        pendingOperations = [operation for operation in self.exportOperations if not self.manifest.isCurrent(keys[operation])]
+        if self.manifest and len(pendingOperations) == 0 and not self.measurements:
+            self.skipCount += 1
+            return True
+
+        # Skip the variants beyond the feasible range of a monotone
+        # parameter.
+        if self.frontier:
+            failedIndex = self.frontier.prunedBy(variant)
+            if failedIndex is not None:
+                self.failures.pruned(variant.index, variant.values, failedIndex)
+                self.completeVariant(variant, {})
+                return True
+
+        if self.report:
+            self.report.begin(variant.index, variant.values)
+
+        expressions = variantExpressions(self.plan.names, variant)
+        self.checkExpressions(variant, expressions)
+
+        changeCount, elapsed = applyVariant(self.des, self.userParams, self.paramValues, expressions, self.host.valueInput)
+        self.addPhaseTime('compute', elapsed)
+        if changeCount > 0:
+            self.applyCount += 1
+            self.applyTime += elapsed
+            self.applyTimeMax = max(self.applyTimeMax, elapsed)
+            self.host.log('ParaParam: variant {} of {} - {} parameter(s) changed, computed in {:.3f}s'.format(self.position, self.plan.count, changeCount, elapsed))
+
+        if self.updateProgress():
+            if self.report:
+                self.report.discard()
+            self.position -= 1
+            self.cancel()
+            return False
+
+        # Do not export a variant whose timeline failed.
+        if self.failures and self.checkHealth(variant):
+            if self.report:
+                self.report.end()
+            self.completeVariant(variant, {})
+            return True
+
+        if self.measurements:
+            startTime = time.perf_counter()
+            self.measurements.measure(self.des, variant.index, variant.values, self.measureAccuracy)
+            self.addPhaseTime('measure', time.perf_counter() - startTime)
+
+        # Export all the formats from this single compute of the variant.
+        outputs = {}
+        for operation in pendingOperations:
+            outputs[keys[operation]] = self.exportVariant(operation)
+
+        if self.postProcessor and len(outputs) > 0:
+            self.postProcessor.submit(variant, self.plan.names, variant.values, outputs)
+        else:
+            self.completeVariant(variant, outputs)
+
+        # The files of the variants post-processed in the meantime are
+        # archived within the time of this variant.
+        if self.postProcessor:
+            self.completePostProcessed(self.postProcessor.completed())
+
+        if self.report:
+            self.report.end()
+
+        return True
+
+    # Stop the sweep before its next variant.
+    def cancel(self):
+        self.cancelled = True
+        self.host.log('ParaParam: cancelled before variant {} of {}'.format(self.position + 1, self.plan.count))
+
+    # Save the progress and reopen the document to drop its history.  Returns
+    # False if the sweep has to stop instead, so that it can be resumed after
+    # restarting Fusion.
+    def reclaimMemory(self):
+        limit = self.memoryGuard.limitBytes
+        self.host.log('ParaParam: Fusion uses {} before variant {} of {}, above the memory limit of {}'.format(formatMegabytes(self.memoryGuard.memory), self.position + 1, self.plan.count, formatMegabytes(limit)))
+
+        # The journal is already up to date.
+        if self.manifest:
+            self.manifest.save()
+        if self.measurements:
+            self.measurements.flush()
+
+        startTime = time.perf_counter()
+        des = self.host.reopenDocument(self.des)
+        if des is not None:
+            self.des = des
+            for name in self.plan.names:
+                self.userParams[name] = des.userParameters.itemByName(name)
+                self.paramValues[name] = self.userParams[name].expression
+            self.reopenCount += 1
+
+            memory = self.memoryGuard.sample()
+            self.host.log('ParaParam: reopened the document in {:.1f}s, Fusion now uses {}'.format(time.perf_counter() - startTime, formatMegabytes(memory)))
+            if memory <= limit:
+                return True
+
+        self.host.log('ParaParam: stopped before variant {} of {} to free memory'.format(self.position + 1, self.plan.count))
+        self.memoryStopped = True
+        self.cancelled = True
+        return False
+
+    # The values of a design table or a list axis may be expressions written
+    # by hand, check the ones that are about to be assigned before touching
+    # the design.  Raises ValueError for an invalid expression, the sweep can
+    # be resumed once the file is fixed.
+    def checkExpressions(self, variant, expressions):
+        if not self.plan.checkExpressions:
+            return
+        for name in self.plan.names:
+            if self.paramValues[name] == expressions[name]:
+                continue
+            if not self.des.unitsManager.isValidExpression(expressions[name], self.userParams[name].unit):
+                raise ValueError("Invalid expression '{}' for parameter '{}' in variant {}".format(expressions[name], name, variant.index + 1))
+
+    # Check the timeline after the compute of a variant and log its failing
+    # features.  Returns True if the variant failed.
+    def checkHealth(self, variant):
+        startTime = time.perf_counter()
+        errors = self.host.timelineErrors(self.des)
+        self.addPhaseTime('compute', time.perf_counter() - startTime)
+
+        if self.frontier:
+            self.frontier.visited(variant, len(errors) > 0)
+        if len(errors) == 0:
+            return False
+
+        self.failures.failed(variant.index, variant.values, errors)
+        self.host.log('ParaParam: variant {} failed - {}'.format(variant.index + 1, '; '.join(feature + ': ' + message for feature, message in errors)))
+        return True
+
+    # Refresh the viewport and the progress when they are due.  Returns True
+    # if the sweep was cancelled.
+    def updateProgress(self):
+        refresh = self.refreshThrottle.due()
+
+        # Update the progress at most every PROGRESS_INTERVAL seconds since
+        # processing the UI events is not free either.
+        now = self.progressClock.elapsed()
+        updateProgress = self.lastProgressTime is None or now - self.lastProgressTime >= PROGRESS_INTERVAL
+        if updateProgress:
+            self.lastProgressTime = now
+            self.progress.progressValue = self.position - 1
+            self.progress.message = self.progressClock.message(self.position - 1)
+
+        if refresh or updateProgress:
+            startTime = time.perf_counter()
+            self.host.doEvents() # Allow UI to update
+            self.addPhaseTime('doEvents', time.perf_counter() - startTime)
+
+        if refresh:
+            startTime = time.perf_counter()
+            self.host.refreshViewport() # Force viewport to update
+            self.addPhaseTime('refresh', time.perf_counter() - startTime)
+
+        return self.progress.wasCancelled
+
+    def addPhaseTime(self, phase, seconds):
+        if self.report:
+            self.report.add(phase, seconds)
+
+    # Record the outputs of a variant done by a previous run in the manifest
+    # if they are missing from it.
+    def recoverCompleted(self, variant):
+        if not self.manifest:
+            return
+        for key, files in self.completed[variant.index].items():
+            if key not in self.manifest.entries:
+                files = [f for f in files if outputSize(f) is not None]
+                if len(files) > 0:
+                    self.manifest.record(key, keyOperation(key), self.designVersion, self.plan.names, variant.values, files)
+
+    # outputs maps the manifest key of each operation to its files.
+    def completeVariant(self, variant, outputs, checksums=None):
+        sizes = None
+        if self.archive and len(outputs) > 0:
+            startTime = time.perf_counter()
+            outputs, checksums, sizes = self.archive.add(variant.index, variant.values, outputs)
+            self.addPhaseTime('archive', time.perf_counter() - startTime)
+
+        for key, files in outputs.items():
+            if len(files) > 0:
+                self.manifest.record(key, keyOperation(key), self.designVersion, self.plan.names, variant.values, files, checksums[key] if checksums else None, sizes[key] if sizes else None)
+        if self.manifest and self.manifest.unsaved >= max(MANIFEST_SAVE_INTERVAL, MANIFEST_SAVE_FRACTION * len(self.manifest.entries)):
+            self.manifest.save()
+
+        if self.journal:
+            self.journal.completed(variant.index, outputs)
+
+    def completePostProcessed(self, results):
+        for result in results:
+            for error in result.errors:
+                self.host.log('ParaParam: post-processing failed - ' + error)
+            self.postErrors.extend(result.errors)
+            self.completeVariant(result.variant, result.files, result.checksums)
+
+    # Wait for the background work, save the manifest and report.
+    def finish(self):
+        if not self.started or self.finished:
+            return
+        self.finished = True
+
+        try:
+            self.progress.hide()
+
+            # Wait for the post-processing of the last variants.
+            if self.postProcessor:
+                self.completePostProcessed(self.postProcessor.close())
+        finally:
+            if self.manifest:
+                self.manifest.save()
+            if self.failures:
+                self.failures.close()
+            if self.measurements:
+                self.measurements.close(self.settings.measureNPY)
+            if self.archive:
+                self.archive.close()
+            if self.report:
+                self.report.close({ 'order': self.settings.order, 'operations': self.operations, 'cancelled': self.cancelled })
+
+        if self.memoryStopped:
+            self.host.showMessage('ParaParam: the sweep stopped before variant {} of {} since Fusion used {}, above the memory limit.  Restart Fusion, open the design and resume the sweep with Resume Previous Sweep.'.format(self.position + 1, self.plan.count, formatMegabytes(self.memoryGuard.memory)))
+
+        if len(self.postErrors) > 0:
+            self.host.showMessage('ParaParam: post-processing failed for {} file(s), see the Text Commands window for details.'.format(len(self.postErrors)))
+
+        if self.manifest and self.skipCount > 0:
+            self.host.log('ParaParam: skipped {} variants already in the export manifest'.format(self.skipCount))
+
+        if self.failures and self.failures.failedCount + self.failures.prunedCount > 0:
+            self.host.log('ParaParam: {} variants failed and {} were pruned, see {}'.format(self.failures.failedCount, self.failures.prunedCount, self.failures.path))
+
+        if self.memoryGuard and self.memoryGuard.available:
+            self.host.log('ParaParam: peak memory {}, document reopened {} times'.format(formatMegabytes(self.memoryGuard.peak), self.reopenCount))
+
+        if self.manifest and self.exportNames.shortenedCount > 0:
+            self.host.log('ParaParam: shortened {} filenames over the path limit'.format(self.exportNames.shortenedCount))
+
+        if self.bodyCache and self.bodyCache.reuseCount > 0:
+            self.host.log('ParaParam: reused the STL files of {} unchanged bodies'.format(self.bodyCache.reuseCount))
+
+        # Show the final state if the refreshes were throttled.
+        if self.settings.refreshMode != REFRESH_ALWAYS:
+            self.host.refreshViewport()
+
+        self.host.log('ParaParam: {} of {} variants in {}'.format(self.position, self.plan.count, formatDuration(self.progressClock.elapsed())))
+
+        if self.applyCount > 0:
+            self.host.log('ParaParam: {} computes, total {:.3f}s, average {:.3f}s, max {:.3f}s'.format(self.applyCount, self.applyTime, self.applyTime / self.applyCount, self.applyTimeMax))
+
+        if self.archive and self.archive.archiveCount > 0:
+            self.host.log('ParaParam: exported files written to {} archive(s), see the index {}'.format(self.archive.archiveCount, self.archive.indexPath))
+
+        if self.measurements:
+            self.host.log('ParaParam: {} measurements written to {}'.format(self.measurements.rowCount, self.measurements.path))
+
+        if self.report:
+            self.host.log('ParaParam: run report written to ' + self.report.jsonPath)
+
+    # Perform the export operation on the current state of the design.
+    # Returns the list of files that were exported.
+    def exportVariant(self, operation):
+        exportNames = self.exportNames
+        des = self.des
+        exportMgr = des.exportManager
+
+        # The export options and filename of each file to export
+        exports = []
+
+        # The files of unchanged bodies linked to their previous export
+        exportedFiles = []
+
+        if operation == OPERATIONS[OP_LOOP_ONLY]:
+            # Do nothing
+            pass
+        elif operation == OPERATIONS[OP_EXPORT_FUSION]:
+            exportFilename = exportNames.path('f3d')
+            fusionArchiveOptions = exportMgr.createFusionArchiveExportOptions(exportFilename)
+            exports.append((fusionArchiveOptions, exportFilename))
+        elif operation == OPERATIONS[OP_EXPORT_IGES]:
+            exportFilename = exportNames.path('igs')
+            igesOptions = exportMgr.createIGESExportOptions(exportFilename)
+            exports.append((igesOptions, exportFilename))
+        elif operation == OPERATIONS[OP_EXPORT_SAT]:
+            exportFilename = exportNames.path('sat')
+            satOptions = exportMgr.createSATExportOptions(exportFilename)
+            exports.append((satOptions, exportFilename))
+        elif operation == OPERATIONS[OP_EXPORT_SMT]:
+            exportFilename = exportNames.path('smt')
+            smtOptions = exportMgr.createSMTExportOptions(exportFilename)
+            exports.append((smtOptions, exportFilename))
+        elif operation == OPERATIONS[OP_EXPORT_STEP]:
+            exportFilename = exportNames.path('step')
+            stepOptions = exportMgr.createSTEPExportOptions(exportFilename);
+            exports.append((stepOptions, exportFilename))
+        elif operation == OPERATIONS[OP_EXPORT_STL]:
+            # If exporting per body selected but not bodies, fall back to normal stl export
+            if self.exportSTLPerBody and des.rootComponent.bRepBodies.count > 0:
+                bodies = des.rootComponent.bRepBodies
+                for iBodies in range(bodies.count):
+                    body = bodies.item(iBodies)
+                    bodyFilename = exportNames.path('stl', body.name)
+
+                    if self.bodyCache and self.reuseBodyExport(body, bodyFilename):
+                        exportedFiles.append(bodyFilename)
+                        continue
+
+                    stlOptions = exportMgr.createSTLExportOptions(body, bodyFilename)
+                    self.setSTLOptions(stlOptions)
+                    exports.append((stlOptions, bodyFilename))
+            else:
+                exportFilename = exportNames.path('stl')
+                stlOptions = exportMgr.createSTLExportOptions(des.rootComponent, exportFilename)
+                self.setSTLOptions(stlOptions)
+                exports.append((stlOptions, exportFilename))
+
+        for exportOptions, filename in exports:
+            # A file left by an earlier run may be a hard link to the file of
+            # another variant, see linkFile, which an export that writes
+            # over the file in place would change as well.
+            if os.path.lexists(filename):
+                os.remove(filename)
+
+            startTime = time.perf_counter()
+            exported = exportMgr.execute(exportOptions)
+            elapsed = time.perf_counter() - startTime
+            self.addPhaseTime('export', elapsed)
+            if exported:
+                exportedFiles.append(filename)
+                self.host.log("ParaParam: exported '{}' - {} bytes in {:.3f}s".format(filename, os.path.getsize(filename), elapsed))
+            else:
+                self.host.log("ParaParam: export failed - '" + filename + "'")
+
+            if self.bodyCache and filename in self.pendingFingerprints:
+                name, fingerprint = self.pendingFingerprints[filename]
+                if exported:
+                    self.bodyCache.record(name, fingerprint, filename)
+                else:
+                    self.bodyCache.forget(name)
+        if self.bodyCache:
+            self.pendingFingerprints = {}
+
+        return exportedFiles
+
+    # Link the STL file of a body to its previous export if the body has not
+    # changed since.  Returns True if the file was linked, otherwise the
+    # fingerprint of the body is kept until it is exported.
+    def reuseBodyExport(self, body, bodyFilename):
+        startTime = time.perf_counter()
+        fingerprint = bodyFingerprint(body)
+        previousFile = self.bodyCache.previousFile(body.name, fingerprint)
+        if previousFile is not None:
+            try:
+                linkFile(previousFile, bodyFilename)
+            except OSError:
+                # e.g. the previous file was moved by the post-processing
+                previousFile = None
+        self.addPhaseTime('export', time.perf_counter() - startTime)
+
+        if previousFile is None:
+            self.pendingFingerprints[bodyFilename] = (body.name, fingerprint)
+            return False
+
+        self.bodyCache.reuseCount += 1
+        self.host.log("ParaParam: body '{}' unchanged, linked '{}' to '{}'".format(body.name, bodyFilename, previousFile))
+        return True
+
+    # Apply the STL format and mesh refinement settings to the export options.
+    def setSTLOptions(self, stlOptions):
+        settings = self.settings
+        stlOptions.isBinaryFormat = settings.stlFormat == STL_BINARY
+        stlOptions.meshRefinement = self.host.meshRefinement(settings.meshRefinement)
+        if settings.meshRefinement == MESH_CUSTOM:
+            stlOptions.surfaceDeviation = settings.surfaceDeviation
+            stlOptions.normalDeviation = math.radians(settings.normalDeviation)
+            stlOptions.maximumEdgeLength = settings.maximumEdgeLength
+            stlOptions.aspectRatio = settings.aspectRatio
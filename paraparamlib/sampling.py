@@ -0,0 +1,236 @@
+#Author-Hans Kellner
+#Description-Sampling of a sweep plan for ParaParam
+#
+# A full grid grows with the product of the number of values of each
+# parameter.  Sampling visits a budget of variants spread over the grid
+# instead:
+#   Grid            - every variant, no sampling
+#   Random          - a random subset of the variants
+#   Latin Hypercube - each axis is split into as many strata as samples and
+#                     each stratum of each axis is visited once
+#   Sobol, Halton   - low-discrepancy sequences, which fill the space more
+#                     evenly than random points
+# The points are drawn in [0, 1) for each axis and mapped to the nearest
+# value of the axis.  The same seed always gives the same variants, so a
+# sampled sweep can be resumed and sharded like a grid.  The sampled
+# variants are then ordered so that consecutive variants change as few
+# parameters as possible.
+
+import random
+
+SAMPLING_GRID = 'Grid'
+SAMPLING_RANDOM = 'Random'
+SAMPLING_LHS = 'Latin Hypercube'
+SAMPLING_SOBOL = 'Sobol'
+SAMPLING_HALTON = 'Halton'
+SAMPLINGS = [SAMPLING_GRID, SAMPLING_RANDOM, SAMPLING_LHS, SAMPLING_SOBOL, SAMPLING_HALTON]
+
+# Above this number of samples the variants are visited in plan order
+# rather than by nearest neighbour, which takes time quadratic in the number
+# of samples.
+NEAREST_NEIGHBOUR_LIMIT = 2000
+
+# Sampled points that fall on a variant already drawn are drawn again, up to
+# this many times the budget.
+DRAW_LIMIT = 20
+
+# The Sobol direction numbers of dimensions 2 to 16 (Joe and Kuo): the
+# degree and coefficients of the primitive polynomial and the initial
+# direction numbers.  The first dimension is the van der Corput sequence.
+_SOBOL_DIRECTIONS = [
+    (1, 0, [1]),
+    (2, 1, [1, 3]),
+    (3, 1, [1, 3, 1]),
+    (3, 2, [1, 1, 1]),
+    (4, 1, [1, 1, 3, 3]),
+    (4, 4, [1, 3, 5, 13]),
+    (5, 2, [1, 1, 5, 5, 17]),
+    (5, 4, [1, 1, 5, 5, 5]),
+    (5, 7, [1, 1, 7, 11, 19]),
+    (5, 11, [1, 1, 5, 1, 1]),
+    (5, 13, [1, 1, 1, 3, 11]),
+    (5, 14, [1, 3, 5, 5, 31]),
+    (6, 1, [1, 3, 3, 9, 7, 49]),
+    (6, 13, [1, 1, 1, 15, 21, 21]),
+    (6, 16, [1, 3, 1, 13, 27, 49]),
+]
+SOBOL_MAX_DIMENSIONS = len(_SOBOL_DIRECTIONS) + 1
+SOBOL_BITS = 32
+
+_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97]
+
+# Return the direction numbers of each dimension of a Sobol sequence, as
+# integers of SOBOL_BITS bits.
+def sobolDirections(dimensions):
+    if dimensions > SOBOL_MAX_DIMENSIONS:
+        raise ValueError('Sobol sampling supports up to {} parameters'.format(SOBOL_MAX_DIMENSIONS))
+
+    directions = [[1 << (SOBOL_BITS - 1 - i) for i in range(SOBOL_BITS)]]
+    for degree, coefficients, initial in _SOBOL_DIRECTIONS[:dimensions - 1]:
+        m = list(initial)
+        for k in range(degree, SOBOL_BITS):
+            value = m[k - degree] ^ (m[k - degree] << degree)
+            for j in range(1, degree):
+                if (coefficients >> (degree - 1 - j)) & 1:
+                    value ^= m[k - j] << j
+            m.append(value)
+        directions.append([m[k] << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)])
+    return directions
+
+# Generate the points of a Sobol sequence in Gray code order, with a random
+# digital shift of each dimension.
+def sobolPoints(dimensions, rng):
+    directions = sobolDirections(dimensions)
+    shift = [rng.getrandbits(SOBOL_BITS) for i in range(dimensions)]
+    scale = 1.0 / (1 << SOBOL_BITS)
+    state = [0] * dimensions
+    index = 0
+    while True:
+        yield tuple((state[d] ^ shift[d]) * scale for d in range(dimensions))
+
+        # The lowest zero bit of the index selects the direction to add.
+        bit = 0
+        while (index >> bit) & 1:
+            bit += 1
+        if bit >= SOBOL_BITS:
+            return
+        for d in range(dimensions):
+            state[d] ^= directions[d][bit]
+        index += 1
+
+# Return the radical inverse of index in base, i.e. its digits mirrored
+# around the decimal point.
+def radicalInverse(index, base):
+    value = 0.0
+    factor = 1.0 / base
+    while index > 0:
+        index, digit = divmod(index, base)
+        value += digit * factor
+        factor /= base
+    return value
+
+# Generate the points of a Halton sequence, with a random shift of each
+# dimension.  The first point, all zeros, is skipped.
+def haltonPoints(dimensions, rng):
+    if dimensions > len(_PRIMES):
+        raise ValueError('Halton sampling supports up to {} parameters'.format(len(_PRIMES)))
+    shift = [rng.random() for i in range(dimensions)]
+    index = 1
+    while True:
+        yield tuple((radicalInverse(index, _PRIMES[d]) + shift[d]) % 1.0 for d in range(dimensions))
+        index += 1
+
+# Generate count points of a Latin hypercube, then random points.
+def latinHypercubePoints(dimensions, count, rng):
+    strata = []
+    for d in range(dimensions):
+        stratum = list(range(count))
+        rng.shuffle(stratum)
+        strata.append(stratum)
+    for i in range(count):
+        yield tuple((strata[d][i] + rng.random()) / count for d in range(dimensions))
+    while True:
+        yield tuple(rng.random() for d in range(dimensions))
+
+# The distance between two variants given by the indices of their values:
+# the number of parameters that change, then how far they move.
+def variantDistance(a, b):
+    changes = 0
+    steps = 0
+    for i, j in zip(a, b):
+        if i != j:
+            changes += 1
+            steps += abs(i - j)
+    return (changes, steps)
+
+# Order the points so that each point is followed by the nearest point not
+# yet visited, starting from the first one.  points is a list of (plan
+# index, axis indices).
+def nearestNeighbourOrder(points):
+    remaining = sorted(points)
+    ordered = [remaining.pop(0)]
+    while remaining:
+        current = ordered[-1][1]
+        nearest = min(range(len(remaining)), key=lambda i: variantDistance(current, remaining[i][1]))
+        ordered.append(remaining.pop(nearest))
+    return ordered
+
+# Return the plan indices of up to count variants of a sweep plan sampled by
+# method, in the order they should be visited.
+def sampleGrid(plan, method, count, seed):
+    rng = random.Random(seed)
+    if count >= plan.count:
+        return list(range(plan.count))
+
+    if method == SAMPLING_RANDOM:
+        points = rng.sample(range(plan.count), count)
+    else:
+        dimensions = len(plan.axes)
+        if method == SAMPLING_LHS:
+            generator = latinHypercubePoints(dimensions, count, rng)
+        elif method == SAMPLING_SOBOL:
+            generator = sobolPoints(dimensions, rng)
+        elif method == SAMPLING_HALTON:
+            generator = haltonPoints(dimensions, rng)
+        else:
+            raise ValueError('Unknown sampling: ' + str(method))
+
+        # Map each point to the nearest value of each axis and drop the
+        # points that fall on a variant already drawn.
+        sizes = [len(axis) for axis in plan.axes]
+        points = []
+        drawn = set()
+        for draws, point in enumerate(generator):
+            if len(points) >= count or draws >= count * DRAW_LIMIT:
+                break
+            indices = tuple(min(int(u * size), size - 1) for u, size in zip(point, sizes))
+            if indices not in drawn:
+                drawn.add(indices)
+                points.append(plan.indexOfAxisIndices(indices))
+
+    if len(points) > NEAREST_NEIGHBOUR_LIMIT:
+        return sorted(points)
+    return [index for index, indices in nearestNeighbourOrder([(index, plan.axisIndicesAt(index)) for index in points])]
+
+# Return the indices of a random subset of count variants of a design
+# table, in the order of the table.
+def sampleTable(table, method, count, seed):
+    if method != SAMPLING_RANDOM:
+        raise ValueError('Design tables only support ' + SAMPLING_RANDOM + ' sampling')
+    if count >= table.count:
+        return list(range(table.count))
+    return sorted(random.Random(seed).sample(range(table.count), count))
+
+# The variants of a plan chosen by sampling.  Unlike a SubsetPlan the
+# sampled variants are a plan of their own: they are numbered by their
+# position in the sample, in the order they are visited.  planIndices holds
+# the index of each sampled variant in the plan it was sampled from, it is
+# not named indices like the plan indices of a SubsetPlan since variantAt
+# takes the position in the sample.
+class SampledPlan:
+    def __init__(self, plan, method, count, seed=0):
+        self.plan = plan
+        self.names = plan.names
+        self.method = method
+        if hasattr(plan, 'axes'):
+            self.planIndices = sampleGrid(plan, method, count, seed)
+        else:
+            self.planIndices = sampleTable(plan, method, count, seed)
+        self.count = len(self.planIndices)
+        self.total = self.count
+        self.checkExpressions = plan.checkExpressions
+
+    def __len__(self):
+        return self.count
+
+    def setUnits(self, units):
+        self.plan.setUnits(units)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.variantAt(index)
+
+    def variantAt(self, index):
+        if index < 0 or index >= self.count:
+            raise IndexError('Variant index out of range: ' + str(index))
+        return self.plan.variantAt(self.planIndices[index])._replace(index=index)
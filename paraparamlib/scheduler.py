@@ -0,0 +1,174 @@
+#Author-Hans Kellner
+#Description-Background execution of a ParaParam sweep
+#
+# Fusion can only be used from its main thread, so a sweep can not simply run
+# on a thread of its own.  Instead a small ticker thread asks the main thread
+# to run the next time slice of the sweep, in Fusion by firing a custom event,
+# and the main thread processes variants until the slice is used up.  Between
+# slices Fusion handles the user interface as usual, and the sweep can be
+# paused, resumed or cancelled.
+
+import cProfile, threading, time
+
+# Seconds of variants processed per slice.  A slice always processes at
+# least one variant, however long it takes.
+SLICE_SECONDS = 0.25
+
+# Seconds between the ticks of the ticker thread
+TICK_INTERVAL = 0.05
+
+STATE_RUNNING = 'Running'
+STATE_PAUSED = 'Paused'
+STATE_FINISHED = 'Finished'
+
+# Calls fire() every interval seconds from its own thread, but only once the
+# previous tick has been handled, so that the ticks never pile up while a
+# long slice runs.
+class Ticker:
+    def __init__(self, fire, interval=TICK_INTERVAL):
+        self.fire = fire
+        self.interval = interval
+        self.pending = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='ParaParamTicker', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            if not self.pending.is_set():
+                self.pending.set()
+                self.fire()
+
+    # Called by the main thread once it has handled a tick.
+    def handled(self):
+        self.pending.clear()
+
+    def stop(self):
+        self.stopped.set()
+
+# The progress of a sweep run in the background.  Cancelling the scheduler
+# cancels the runner at its next progress update.
+class SchedulerProgress:
+    def __init__(self, scheduler, progress):
+        self.scheduler = scheduler
+        self.progress = progress
+
+    @property
+    def progressValue(self):
+        return self.progress.progressValue
+
+    @progressValue.setter
+    def progressValue(self, value):
+        self.progress.progressValue = value
+
+    @property
+    def message(self):
+        return self.progress.message
+
+    @message.setter
+    def message(self, message):
+        self.progress.message = message
+
+    @property
+    def wasCancelled(self):
+        return self.scheduler.cancelRequested or self.progress.wasCancelled
+
+    def hide(self):
+        self.progress.hide()
+
+# Runs a SweepRunner in time slices.  runSlice() must be called on the main
+# thread, typically from the handler of the event fired by the ticker, and
+# the other methods may be called from anywhere.  onFinished(completed,
+# error) is called on the main thread once the sweep has ended, completed is
+# False if it was cancelled and error is the exception that stopped it, if
+# any.
+class SweepScheduler:
+    def __init__(self, runner, onFinished, sliceSeconds=SLICE_SECONDS):
+        self.runner = runner
+        self.onFinished = onFinished
+        self.sliceSeconds = sliceSeconds
+        self.state = STATE_RUNNING
+        self.cancelRequested = False
+        self.profile = None
+        self.ticker = None
+
+    # Start ticking, fire() is called from the ticker thread and must make
+    # the main thread call runSlice().
+    def start(self, fire):
+        if self.runner.settings.profile:
+            self.profile = cProfile.Profile()
+        self.ticker = Ticker(fire)
+        self.ticker.start()
+
+    def pause(self):
+        if self.state == STATE_RUNNING:
+            self.state = STATE_PAUSED
+            self.runner.host.log('ParaParam: sweep paused')
+
+    def resume(self):
+        if self.state == STATE_PAUSED:
+            self.state = STATE_RUNNING
+            self.runner.host.log('ParaParam: sweep resumed')
+
+    # Cancel the sweep, it stops before its next variant.
+    def cancel(self):
+        self.cancelRequested = True
+
+    # Process variants for up to a slice of time.
+    def runSlice(self):
+        try:
+            if self.state == STATE_FINISHED:
+                return
+            if self.state == STATE_PAUSED and not self.cancelRequested:
+                return
+
+            if self.profile:
+                self.profile.enable()
+            try:
+                more = self.step()
+            finally:
+                if self.profile:
+                    self.profile.disable()
+
+            if not more:
+                self.finish(None)
+        except Exception as error:
+            self.finish(error)
+        finally:
+            if self.ticker:
+                self.ticker.handled()
+
+    # Returns False once the sweep has ended.
+    def step(self):
+        runner = self.runner
+        if not runner.started:
+            runner.start()
+            runner.progress = SchedulerProgress(self, runner.progress)
+
+        if self.cancelRequested:
+            runner.cancel()
+            return False
+
+        deadline = time.perf_counter() + self.sliceSeconds
+        while runner.step():
+            if time.perf_counter() >= deadline or self.state != STATE_RUNNING:
+                return True
+        return False
+
+    # Stop ticking and finish the runner.  onFinished is called even if the
+    # runner fails to finish.
+    def finish(self, error):
+        if self.state == STATE_FINISHED:
+            return
+        self.state = STATE_FINISHED
+        if self.ticker:
+            self.ticker.stop()
+        try:
+            self.runner.finish()
+            if self.profile:
+                self.runner.saveProfile(self.profile)
+        except Exception as finishError:
+            error = error or finishError
+        self.onFinished(error is None and not self.runner.cancelled, error)
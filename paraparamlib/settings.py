@@ -0,0 +1,194 @@
+#Author-Hans Kellner
+#Description-Sweep settings for ParaParam
+
+from .sweep import ORDERS, ORDER_NESTED, SHARD_MODES, SHARD_STRIDE
+from .progress import REFRESH_MODES, REFRESH_ALWAYS
+from .postprocess import LAYOUTS, LAYOUT_FLAT
+from .sampling import SAMPLINGS, SAMPLING_GRID
+from .archive import ARCHIVES, ARCHIVE_FOLDER
+from .filenames import DEFAULT_TEMPLATE, DEFAULT_BODY_TEMPLATE, MAX_PATH
+
+# Raised when a setting has an invalid value.
+class SettingsError(ValueError):
+    pass
+
+# Parsers for the values of the settings rows in a CSV file.
+def choiceSetting(choices):
+    def parse(text):
+        for choice in choices:
+            if choice.lower() == text.lower():
+                return choice
+        raise SettingsError("Invalid value '" + text + "' - Expected one of: " + ', '.join(choices))
+    return parse
+
+def intSetting(minimum):
+    def parse(text):
+        try:
+            value = int(text)
+        except ValueError:
+            raise SettingsError("Invalid number '" + text + "'")
+        if value < minimum:
+            raise SettingsError("Value '" + text + "' must be at least " + str(minimum))
+        return value
+    return parse
+
+def boolSetting(text):
+    if text.lower() in ('true', 'yes', '1'):
+        return True
+    if text.lower() in ('false', 'no', '0'):
+        return False
+    raise SettingsError("Invalid value '" + text + "' - Expected True or False")
+
+def textSetting(text):
+    return text
+
+def floatSetting(minimum):
+    def parse(text):
+        try:
+            value = float(text)
+        except ValueError:
+            raise SettingsError("Invalid number '" + text + "'")
+        if value <= minimum:
+            raise SettingsError("Value '" + text + "' must be greater than " + str(minimum))
+        return value
+    return parse
+
+# STL export options.  The custom mesh refinement uses the surface deviation
+# and maximum edge length in cm, the normal deviation in degrees and the
+# aspect ratio.
+STL_BINARY = 'Binary'
+STL_ASCII = 'ASCII'
+STL_FORMATS = [STL_BINARY, STL_ASCII]
+
+MESH_HIGH = 'High'
+MESH_MEDIUM = 'Medium'
+MESH_LOW = 'Low'
+MESH_CUSTOM = 'Custom'
+MESH_REFINEMENTS = [MESH_HIGH, MESH_MEDIUM, MESH_LOW, MESH_CUSTOM]
+
+# The accuracy of the physical properties of the Measure operation.
+ACCURACY_LOW = 'Low'
+ACCURACY_MEDIUM = 'Medium'
+ACCURACY_HIGH = 'High'
+ACCURACY_VERY_HIGH = 'Very High'
+ACCURACIES = [ACCURACY_LOW, ACCURACY_MEDIUM, ACCURACY_HIGH, ACCURACY_VERY_HIGH]
+
+# The settings of a sweep other than the parameters being swept.  Each entry
+# maps the name used in a CSV settings row ("@name,value") to the attribute
+# and the parser of its value.
+_SETTINGS = {
+    'order': ('order', choiceSetting(ORDERS)),
+    'refresh': ('refreshMode', choiceSetting(REFRESH_MODES)),
+    'refreshinterval': ('refreshInterval', intSetting(1)),
+    'postprocess': ('postProcess', boolSetting),
+    'compress': ('compress', boolSetting),
+    'validatestl': ('validateSTL', boolSetting),
+    'layout': ('layout', choiceSetting(LAYOUTS)),
+    'stlformat': ('stlFormat', choiceSetting(STL_FORMATS)),
+    'meshrefinement': ('meshRefinement', choiceSetting(MESH_REFINEMENTS)),
+    'surfacedeviation': ('surfaceDeviation', floatSetting(0)),
+    'normaldeviation': ('normalDeviation', floatSetting(0)),
+    'maxedgelength': ('maximumEdgeLength', floatSetting(0)),
+    'aspectratio': ('aspectRatio', floatSetting(0)),
+    'shardindex': ('shardIndex', intSetting(1)),
+    'shardcount': ('shardCount', intSetting(1)),
+    'shardmode': ('shardMode', choiceSetting(SHARD_MODES)),
+    'report': ('report', boolSetting),
+    'profile': ('profile', boolSetting),
+    'preflight': ('preflight', boolSetting),
+    'preflightsamples': ('preflightSamples', intSetting(0)),
+    'reusebodies': ('reuseBodies', boolSetting),
+    'sampling': ('sampling', choiceSetting(SAMPLINGS)),
+    'samples': ('samples', intSetting(1)),
+    'seed': ('seed', intSetting(0)),
+    'checkhealth': ('checkHealth', boolSetting),
+    'prune': ('prune', textSetting),
+    'measurebodies': ('measureBodies', boolSetting),
+    'measureaccuracy': ('measureAccuracy', choiceSetting(ACCURACIES)),
+    'measurenpy': ('measureNPY', boolSetting),
+    'background': ('background', boolSetting),
+    'archive': ('archive', choiceSetting(ARCHIVES)),
+    'archivesize': ('archiveSize', intSetting(0)),
+    'filename': ('filenameTemplate', textSetting),
+    'bodyfilename': ('bodyFilenameTemplate', textSetting),
+    'maxpath': ('maxPath', intSetting(64)),
+    'memorylimit': ('memoryLimit', intSetting(0)),
+}
+
+class SweepSettings:
+    def __init__(self):
+        self.order = ORDER_NESTED
+        self.refreshMode = REFRESH_ALWAYS
+        self.refreshInterval = 1
+        self.postProcess = False
+        self.compress = False
+        self.validateSTL = False
+        self.layout = LAYOUT_FLAT
+        self.stlFormat = STL_BINARY
+        self.meshRefinement = MESH_MEDIUM
+        self.surfaceDeviation = 0.005
+        self.normalDeviation = 10.0
+        self.maximumEdgeLength = 1.0
+        self.aspectRatio = 20.0
+        self.shardIndex = 1
+        self.shardCount = 1
+        self.shardMode = SHARD_STRIDE
+        self.mergeShards = False
+        self.report = False
+        self.profile = False
+        self.preflight = False
+        self.preflightSamples = 3
+        self.reuseBodies = True
+        self.sampling = SAMPLING_GRID
+        self.samples = 100
+        self.seed = 0
+        self.checkHealth = True
+        self.prune = ''
+        self.measureBodies = False
+        self.measureAccuracy = ACCURACY_LOW
+        self.measureNPY = False
+        self.background = False
+        self.archive = ARCHIVE_FOLDER
+        self.archiveSize = 1024
+        self.filenameTemplate = DEFAULT_TEMPLATE
+        self.bodyFilenameTemplate = DEFAULT_BODY_TEMPLATE
+        self.maxPath = MAX_PATH
+        self.memoryLimit = 0
+
+    # Apply the settings read from a CSV file, which override the dialog.
+    def update(self, options):
+        for name, text in options.items():
+            if name not in _SETTINGS:
+                raise SettingsError("Unknown setting '@" + name + "' - Expected one of: " + ', '.join('@' + key for key in _SETTINGS))
+            attribute, parse = _SETTINGS[name]
+            try:
+                setattr(self, attribute, parse(text))
+            except SettingsError as error:
+                raise SettingsError('@' + name + ': ' + str(error))
+
+    # Check the settings that depend on each other.
+    def validate(self):
+        if self.shardIndex > self.shardCount:
+            raise SettingsError('The shard must be between 1 and the shard count ' + str(self.shardCount))
+        if self.prune and not self.checkHealth:
+            raise SettingsError('@prune needs @checkhealth')
+
+    # A short description of the STL export options, e.g. "Binary/Medium",
+    # used to tell exports with different options apart.
+    def stlOptionsKey(self):
+        key = self.stlFormat + '/' + self.meshRefinement
+        if self.meshRefinement == MESH_CUSTOM:
+            key += '/{:g},{:g},{:g},{:g}'.format(self.surfaceDeviation, self.normalDeviation, self.maximumEdgeLength, self.aspectRatio)
+        return key
+
+    # The settings as a dict that can be stored in a sweep journal.
+    def asDict(self):
+        return dict(vars(self))
+
+    @staticmethod
+    def fromDict(values):
+        settings = SweepSettings()
+        for attribute, value in values.items():
+            if hasattr(settings, attribute):
+                setattr(settings, attribute, value)
+        return settings
@@ -0,0 +1,316 @@
+#Author-Hans Kellner
+#Description-Sweep planning for ParaParam
+#
+# A sweep plan turns the parameter rows used by ParaParam (name, start, end,
+# step) into the list of variants to visit.  The variants are generated lazily
+# from their index so that even very large grids never have to be held in
+# memory, and the number of variants is known before the sweep starts.
+
+import collections, decimal, re
+
+# A single combination of parameter values.
+#   index       - position of the variant within the plan
+#   indices     - position of each parameter value within its axis
+#   values      - the parameter values, in the same order as the plan names
+#   expressions - the expressions written to the parameters, None when they
+#                 are the values themselves
+Variant = collections.namedtuple('Variant', ['index', 'indices', 'values', 'expressions'], defaults=[None])
+
+# The kinds of parameter rows, chosen by the second column:
+#   name,start,end,step              - linear steps
+#   name,list,value,value,...        - explicit values (or expressions)
+#   name,geometric,start,end,ratio   - each value is the previous times ratio
+#   name,log,start,end,count         - count values evenly spaced on a log scale
+AXIS_LIST = 'list'
+AXIS_GEOMETRIC = 'geometric'
+AXIS_LOG = 'log'
+AXIS_KINDS = [AXIS_LIST, AXIS_GEOMETRIC, AXIS_LOG]
+
+# Relative tolerance used to include an end value that the steps only miss
+# because they are not exact, e.g. steps of 1/3.
+END_TOLERANCE = decimal.Decimal('1e-9')
+
+# Significant digits of the values of log axes
+LOG_DIGITS = 12
+
+# Convert a number read from a CSV file or a dialog input to an exact
+# decimal.  Floats are converted from their shortest representation, so
+# 0.1 is 0.1 and not 0.1000000000000000055511151231257827.
+def toDecimal(value):
+    try:
+        return decimal.Decimal(str(value).strip())
+    except decimal.InvalidOperation:
+        raise ValueError("Invalid number '" + str(value) + "'")
+
+# Format a value the way it is written to expressions and filenames.  Whole
+# numbers keep a ".0", as they did when the values were floats, so that the
+# names of existing exports do not change.
+def formatValue(value):
+    if value == value.to_integral_value():
+        return '{:f}'.format(value.quantize(decimal.Decimal(1))) + '.0'
+    return '{:f}'.format(value.normalize())
+
+# Returns True if the value is a plain number rather than an expression.
+def isNumber(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+# Compute the values of each kind of axis by their index, so that no error
+# accumulates from one value to the next.
+def linearValues(start, end, step):
+    if step == 0:
+        raise ValueError('The step must not be zero')
+
+    # Reverse the step if the start is greater than the end
+    if (start > end) != (step < 0):
+        step = -step
+
+    count = int(((end - start) / step + END_TOLERANCE).to_integral_value(rounding=decimal.ROUND_FLOOR)) + 1
+    values = [start + i * step for i in range(count)]
+
+    # Make sure the end value is exact when the last step reaches it,
+    # unless the end value is the one that is not exact, e.g. an end of
+    # 0.30000000000000004 for steps of 0.1.
+    if abs(values[-1] - end) <= abs(step) * END_TOLERANCE and len(formatValue(end)) <= len(formatValue(values[-1])):
+        values[-1] = end
+    return values
+
+def geometricValues(start, end, ratio):
+    if start == 0 or ratio <= 0 or ratio == 1:
+        raise ValueError('A geometric axis needs a non-zero start and a positive ratio other than 1')
+
+    values = []
+    value = start
+    limit = abs(end) * (1 + END_TOLERANCE)
+    growing = ratio > 1
+    while (abs(value) <= limit) if growing else (abs(value) >= abs(end) * (1 - END_TOLERANCE)):
+        values.append(value)
+        value = start * ratio ** len(values)
+
+    # Make sure the end value is exact when the last value reaches it.
+    if len(values) > 0 and abs(values[-1] - end) <= abs(end) * END_TOLERANCE and len(formatValue(end)) <= len(formatValue(values[-1])):
+        values[-1] = end
+    return values
+
+def logValues(start, end, count):
+    if start <= 0 or end <= 0:
+        raise ValueError('A log axis needs positive start and end values')
+    if count < 1 or count != count.to_integral_value():
+        raise ValueError('A log axis needs a whole number of values')
+
+    count = int(count)
+    if count == 1:
+        return [start]
+
+    # Computed with the full precision and then rounded, so that values
+    # like 10 between 1 and 100 come out exact.
+    rounding = decimal.Context(prec=LOG_DIGITS)
+    ratio = (end / start).ln()
+    values = [start]
+    for i in range(1, count - 1):
+        values.append(rounding.plus(start * (ratio * i / (count - 1)).exp()))
+    values.append(end)
+    return values
+
+# The values of one parameter visited by the sweep.  The values are the
+# formatted numbers (or the expressions of a list axis) and the expressions
+# are set once the units of the parameter are known.
+class SweepAxis:
+    def __init__(self, name, values, kind=None):
+        self.name = name
+        self.values = list(values)
+        self.kind = kind
+        self.expressions = self.values
+
+    def __len__(self):
+        return len(self.values)
+
+    # Create the axis from a parameter row, see AXIS_KINDS.  Raises
+    # ValueError if the row is not valid.
+    @staticmethod
+    def fromRow(row):
+        name = row[0]
+        kind = str(row[1]).strip().lower()
+        if kind == AXIS_LIST:
+            values = [str(value).strip() for value in row[2:]]
+            if len(values) == 0 or '' in values:
+                raise ValueError('A list axis needs at least one value')
+            values = [formatValue(toDecimal(value)) if isNumber(value) else value for value in values]
+            return SweepAxis(name, values, AXIS_LIST)
+
+        if kind in AXIS_KINDS:
+            if len(row) != 5:
+                raise ValueError('Expected ' + kind + ', start, end and ' + ('ratio' if kind == AXIS_GEOMETRIC else 'count'))
+            start, end, third = toDecimal(row[2]), toDecimal(row[3]), toDecimal(row[4])
+            if kind == AXIS_GEOMETRIC:
+                values = geometricValues(start, end, third)
+            else:
+                values = logValues(start, end, third)
+            return SweepAxis(name, [formatValue(value) for value in values], kind)
+
+        if len(row) != 4:
+            raise ValueError('Expected start, end and step')
+        values = linearValues(toDecimal(row[1]), toDecimal(row[2]), toDecimal(row[3]))
+        return SweepAxis(name, [formatValue(value) for value in values])
+
+    # Build the expressions of the values once, numbers get the units of
+    # the parameter, e.g. "2.5 mm".
+    def setUnits(self, unit):
+        if unit:
+            self.expressions = [value + ' ' + unit if isNumber(value) else value for value in self.values]
+        else:
+            self.expressions = self.values
+
+# Traversal orders of a plan.
+#   Nested     - every inner axis restarts from its first value whenever an
+#                outer axis steps, like plain nested for loops.
+#   Serpentine - inner axes run back and forth (reflected / boustrophedon
+#                order) so that consecutive variants differ in exactly one
+#                parameter and each step costs a single recompute.
+ORDER_NESTED = 'Nested'
+ORDER_SERPENTINE = 'Serpentine'
+ORDERS = [ORDER_NESTED, ORDER_SERPENTINE]
+
+# The Cartesian product of a list of axes.  The first axis is the outermost
+# loop and the last axis changes on every step, which in nested order is the
+# same as the loops:
+# for i in range(iCount)
+#   for j in range(jCount)
+#     for k in range(kCount)
+#       print(value(i,j,k))
+class SweepPlan:
+    def __init__(self, axes, order=ORDER_NESTED):
+        if order not in ORDERS:
+            raise ValueError('Unknown sweep order: ' + str(order))
+
+        self.axes = list(axes)
+        self.names = tuple(axis.name for axis in self.axes)
+        self.order = order
+
+        self.count = 1 if self.axes else 0
+        for axis in self.axes:
+            self.count *= len(axis)
+        self.total = self.count
+
+        # The values of list axes may be expressions written by hand
+        self.checkExpressions = any(axis.kind == AXIS_LIST for axis in self.axes)
+
+    # Create the plan from the parameter rows read from the CSV file or the
+    # single parameter dialog inputs.
+    @staticmethod
+    def fromRows(rows, order=ORDER_NESTED):
+        return SweepPlan([SweepAxis.fromRow(row) for row in rows], order)
+
+    def __len__(self):
+        return self.count
+
+    # Set the units of the parameters, a dict of the unit of each name.
+    def setUnits(self, units):
+        for axis in self.axes:
+            axis.setUnits(units.get(axis.name, ''))
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.variantAt(index)
+
+    # Return the indices of each axis value for the variant at index.
+    def axisIndicesAt(self, index):
+        indices = [0] * len(self.axes)
+        for i in range(len(self.axes) - 1, -1, -1):
+            size = len(self.axes[i])
+            index, indices[i] = divmod(index, size)
+
+            # In serpentine order an axis runs backwards whenever the
+            # combined position of the axes outside of it is odd.
+            if self.order == ORDER_SERPENTINE and index % 2 == 1:
+                indices[i] = size - 1 - indices[i]
+        return tuple(indices)
+
+    # Return the index of the variant with the given indices of each axis
+    # value, the inverse of axisIndicesAt.
+    def indexOfAxisIndices(self, indices):
+        index = 0
+        for axis, i in zip(self.axes, indices):
+            size = len(axis)
+            if self.order == ORDER_SERPENTINE and index % 2 == 1:
+                i = size - 1 - i
+            index = index * size + i
+        return index
+
+    def variantAt(self, index):
+        if index < 0 or index >= self.count:
+            raise IndexError('Variant index out of range: ' + str(index))
+
+        indices = self.axisIndicesAt(index)
+        values = tuple(axis.values[i] for axis, i in zip(self.axes, indices))
+        expressions = tuple(axis.expressions[i] for axis, i in zip(self.axes, indices))
+        return Variant(index, indices, values, expressions)
+
+# Build the part of an export filename that identifies a variant, e.g.
+# "Diameter_1_0_Height_2_5".
+def variantStem(names, values):
+    stem = '_'.join(name + '_' + str(value) for name, value in zip(names, values))
+    stem = re.sub(r"\s+", '_', stem)
+    return stem.replace('.', '_')
+
+# How the variants of a plan are split between shards.
+#   Stride - shard i gets the variants i, i + N, i + 2N, ...
+#   Block  - shard i gets one contiguous block of variants, which keeps the
+#            minimal changes of the serpentine order within the shard
+SHARD_STRIDE = 'Stride'
+SHARD_BLOCK = 'Block'
+SHARD_MODES = [SHARD_STRIDE, SHARD_BLOCK]
+
+# Return the range of plan indices of shard number shardIndex (1 based) of
+# shardCount shards.
+def shardRange(count, shardIndex, shardCount, mode=SHARD_STRIDE):
+    if shardCount < 1 or shardIndex < 1 or shardIndex > shardCount:
+        raise ValueError('Invalid shard {} of {}'.format(shardIndex, shardCount))
+
+    if mode == SHARD_STRIDE:
+        return range(shardIndex - 1, count, shardCount)
+    elif mode == SHARD_BLOCK:
+        return range((shardIndex - 1) * count // shardCount, shardIndex * count // shardCount)
+    raise ValueError('Unknown shard mode: ' + str(mode))
+
+# The variants of a plan at the given indices.  The variants keep their
+# index in the full plan.
+class SubsetPlan:
+    def __init__(self, plan, indices):
+        self.plan = plan
+        self.names = plan.names
+        self.indices = indices
+        self.count = len(self.indices)
+        self.total = plan.count
+        self.checkExpressions = plan.checkExpressions
+
+    def __len__(self):
+        return self.count
+
+    def setUnits(self, units):
+        self.plan.setUnits(units)
+
+    def __iter__(self):
+        for index in self.indices:
+            yield self.plan.variantAt(index)
+
+    def variantAt(self, index):
+        return self.plan.variantAt(index)
+
+# The part of a plan processed by one shard, so that the results of all the
+# shards can be combined.
+class ShardedPlan(SubsetPlan):
+    def __init__(self, plan, shardIndex, shardCount, mode=SHARD_STRIDE):
+        SubsetPlan.__init__(self, plan, shardRange(plan.count, shardIndex, shardCount, mode))
+
+# Return up to count indices spread evenly over a plan of size variants,
+# including the first and the last.
+def sampleIndices(size, count):
+    if size <= count:
+        return list(range(size))
+    if count <= 1:
+        return [0][:count]
+    return sorted(set(round(i * (size - 1) / (count - 1)) for i in range(count)))
@@ -0,0 +1,110 @@
+#Author-Hans Kellner
+#Description-Run report of the time spent in each phase of a sweep
+#
+# The time of each variant is split into the phases of the sweep loop so
+# that it is clear where a slow sweep spends its time:
+#   compute  - writing the parameter expressions, which computes the design
+#   doEvents - processing the UI events
+#   refresh  - refreshing the viewport
+#   measure  - computing the physical properties of the Measure operation
+#   export   - executing the exports
+#   archive  - streaming the exported files into archives
+#
+# The per-variant rows are written to a CSV file as the sweep goes and a
+# JSON file with the percentiles of each phase is written at the end.
+
+import array, csv, json, os
+
+PHASES = ['compute', 'doEvents', 'refresh', 'measure', 'export', 'archive']
+
+REPORT_FILENAME = 'ParaParamReport'
+PROFILE_FILENAME = 'ParaParamProfile.prof'
+
+# The name of the report files without the extension, e.g.
+# "ParaParamReport.shard-2-of-4"
+def reportFilename(shardIndex, shardCount):
+    if shardCount <= 1:
+        return REPORT_FILENAME
+    return '{}.shard-{}-of-{}'.format(REPORT_FILENAME, shardIndex, shardCount)
+
+# Return the value at fraction (0 to 1) of the sorted values, interpolating
+# between the nearest two.
+def percentile(sortedValues, fraction):
+    if len(sortedValues) == 0:
+        return None
+    position = (len(sortedValues) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sortedValues) - 1)
+    return sortedValues[lower] + (sortedValues[upper] - sortedValues[lower]) * (position - lower)
+
+# Summarise a list of durations in seconds.
+def summarize(values):
+    values = sorted(values)
+    if len(values) == 0:
+        return { 'count': 0 }
+    return {
+        'count': len(values),
+        'total': sum(values),
+        'mean': sum(values) / len(values),
+        'p50': percentile(values, 0.5),
+        'p90': percentile(values, 0.9),
+        'p99': percentile(values, 0.99),
+        'max': values[-1],
+    }
+
+class RunReport:
+    # Start the report in folder, filename is without the extension.
+    def __init__(self, folder, filename, names):
+        self.csvPath = os.path.join(folder, filename + '.csv')
+        self.jsonPath = os.path.join(folder, filename + '.json')
+        self.names = list(names)
+
+        # Only the durations are kept in memory, as arrays of doubles.
+        self.durations = { phase: array.array('d') for phase in PHASES + ['total'] }
+        self.row = None
+
+        self.file = open(self.csvPath, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['index'] + self.names + PHASES + ['total'])
+
+    # Start timing a variant.
+    def begin(self, index, values):
+        self.row = (index, values, dict.fromkeys(PHASES, 0.0))
+
+    def add(self, phase, seconds):
+        if self.row:
+            self.row[2][phase] += seconds
+
+    # Finish timing the variant and write its row.
+    def end(self):
+        if self.row is None:
+            return
+        index, values, phases = self.row
+        self.row = None
+
+        total = sum(phases.values())
+        for phase in PHASES:
+            self.durations[phase].append(phases[phase])
+        self.durations['total'].append(total)
+
+        self.writer.writerow([index + 1] + [str(value) for value in values] + ['{:.6f}'.format(phases[phase]) for phase in PHASES] + ['{:.6f}'.format(total)])
+
+    # Drop the variant being timed, e.g. when the sweep is cancelled.
+    def discard(self):
+        self.row = None
+
+    def summary(self):
+        return { phase: summarize(durations) for phase, durations in self.durations.items() }
+
+    # Close the CSV file and write the summary.
+    def close(self, info=None):
+        if self.file.closed:
+            return
+        self.file.close()
+
+        data = dict(info or {})
+        data['variants'] = len(self.durations['total'])
+        data['rows'] = os.path.basename(self.csvPath)
+        data['phases'] = self.summary()
+        with open(self.jsonPath, 'w') as file:
+            json.dump(data, file, indent=1)
@@ -0,0 +1,14 @@
+#Author-Hans Kellner
+#Description-Test setup for the ParaParam sweep logic
+#
+# The tests import paraparamlib and run sweeps against the adsk stand-in in
+# bench/fakeadsk, so that they run without Fusion, e.g.
+#
+#   python -m pytest -q
+
+import os, sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT, 'bench', 'fakeadsk'))
+sys.path.insert(0, os.path.join(_ROOT, 'bench'))
+sys.path.insert(0, _ROOT)
@@ -0,0 +1,67 @@
+import csv, os
+
+import pytest
+
+from paraparamlib.archive import ArchiveSink, splitMemberPath, outputSize, outputsExist, memberChecksum, ARCHIVE_ZIP, ARCHIVE_TAR
+from paraparamlib.manifest import fileChecksum
+
+def exportFiles(folder, index, size=1000):
+    path = os.path.join(folder, 'Gear_{}.stl'.format(index))
+    with open(path, 'wb') as file:
+        file.write(bytes([index % 256]) * size)
+    return { 'stl': [path] }
+
+@pytest.mark.parametrize('format', [ARCHIVE_ZIP, ARCHIVE_TAR])
+def testArchivesRotateAtTheSizeLimit(tmp_path, format):
+    folder = str(tmp_path)
+    sink = ArchiveSink(folder, 'ParaParamOutputs', format, 25000, ['A'])
+    members = []
+    for index in range(8):
+        outputs = exportFiles(folder, index, 4000)
+        checksum = fileChecksum(outputs['stl'][0])
+        memberPaths, checksums, sizes = sink.add(index, [str(index)], outputs)
+        assert checksums['stl'] == [checksum]
+        assert sizes['stl'] == [4000]
+        assert not os.path.exists(outputs['stl'][0])
+        members.extend(memberPaths['stl'])
+    sink.close()
+
+    archives = sorted(name for name in os.listdir(folder) if name.startswith('ParaParamOutputs-'))
+    assert len(archives) > 1
+    assert all(os.path.getsize(os.path.join(folder, name)) <= 25000 for name in archives)
+
+    # Every member can be found from its member path.
+    for index, path in enumerate(members):
+        archivePath, member = splitMemberPath(path)
+        assert member == 'Gear_{}.stl'.format(index)
+        assert outputSize(path) == 4000
+        assert memberChecksum(archivePath, member) is not None
+    assert outputsExist({ 'stl': members })
+
+    with open(os.path.join(folder, 'ParaParamOutputs.csv'), newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ['index', 'A', 'archive', 'member', 'size', 'sha256']
+    assert len(rows) == 9
+
+def testARerunStartsANewArchiveAndExtendsTheIndex(tmp_path):
+    folder = str(tmp_path)
+    for run in range(2):
+        sink = ArchiveSink(folder, 'ParaParamOutputs', ARCHIVE_ZIP, 0, ['A'])
+        sink.add(run, [str(run)], exportFiles(folder, run))
+        sink.close()
+
+    assert sorted(name for name in os.listdir(folder) if name.endswith('.zip')) == ['ParaParamOutputs-0001.zip', 'ParaParamOutputs-0002.zip']
+    with open(os.path.join(folder, 'ParaParamOutputs.csv'), newline='') as file:
+        assert len(list(csv.reader(file))) == 3
+
+def testAMissingMemberDoesNotExist(tmp_path):
+    folder = str(tmp_path)
+    sink = ArchiveSink(folder, 'ParaParamOutputs', ARCHIVE_ZIP, 0, ['A'])
+    sink.add(0, ['0'], exportFiles(folder, 0))
+    sink.close()
+    archivePath = os.path.join(folder, 'ParaParamOutputs-0001.zip')
+    assert outputSize(archivePath + '/Gear_0.stl') == 1000
+    assert outputSize(archivePath + '/Gear_1.stl') is None
+
+def testPlainFilesAreNotMemberPaths():
+    assert splitMemberPath('/out/Gear_1.stl') is None
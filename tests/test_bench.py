@@ -0,0 +1,42 @@
+from bench_sweep import runBenchmark, compareResults, resultKey
+from paraparamlib.sweep import ORDER_NESTED, ORDER_SERPENTINE
+from paraparamlib.progress import REFRESH_NEVER
+
+def result(**fields):
+    data = { 'size': 100, 'order': ORDER_NESTED, 'operations': [], 'variantsPerSecond': 1000.0,
+             'computes': 100, 'assignments': 111, 'exports': 0, 'peakMemory': 10000 }
+    data.update(fields)
+    return data
+
+def testTheSameResultsHaveNoRegressions():
+    assert compareResults([result()], [result()]) == []
+
+def testMoreWorkIsARegression():
+    for count in ['computes', 'assignments', 'exports']:
+        regressions = compareResults([result(**{ count: 200 })], [result()])
+        assert len(regressions) == 1
+        assert count in regressions[0]
+
+def testSpeedAndMemoryAreOnlyComparedWithATolerance():
+    slow = result(variantsPerSecond=100.0, peakMemory=100000)
+    assert compareResults([slow], [result()]) == []
+    assert len(compareResults([slow], [result()], 0.5)) == 2
+
+def testSpeedAndMemoryWithinTheTolerance():
+    assert compareResults([result(variantsPerSecond=600.0, peakMemory=14000)], [result()], 0.5) == []
+    assert len(compareResults([result(variantsPerSecond=400.0)], [result()], 0.5)) == 1
+    assert len(compareResults([result(peakMemory=16000)], [result()], 0.5)) == 1
+
+def testABaselineOfCountsOnly():
+    counts = { key: value for key, value in result().items() if key not in ('variantsPerSecond', 'peakMemory') }
+    assert compareResults([result(variantsPerSecond=1.0)], [counts], 0.5) == []
+
+def testSweepsNotInTheBaselineAreSkipped():
+    assert compareResults([result(order=ORDER_SERPENTINE, computes=200)], [result()]) == []
+    assert resultKey(result()) != resultKey(result(operations=['ExportSTL']))
+
+def testTheBenchmarkComputesEachVariantOnce():
+    for order in (ORDER_NESTED, ORDER_SERPENTINE):
+        data = runBenchmark(100, order, [], 0.0, 0.0, REFRESH_NEVER, False)
+        assert data['size'] == 100
+        assert data['computes'] <= 100
@@ -0,0 +1,83 @@
+import pytest
+
+from paraparamlib.sweep import Variant
+from paraparamlib.filenames import FilenameTemplate, ExportNames, FilenameError, sanitize, valueText, HASH_DIGITS
+
+def variant(index, values):
+    return Variant(index, (), tuple(values), tuple(values))
+
+def testInvalidCharactersAreReplaced():
+    assert sanitize('a/b:c*d?"e<f>g|h\\i') == 'a_b_c_d__e_f_g_h_i'
+    assert valueText('2.5 mm') == '2_5_mm'
+    assert valueText('10/2 mm') == '10_2_mm'
+
+def testTrailingDotsAndSpacesAreRemoved():
+    assert sanitize('Body. .') == 'Body'
+    assert sanitize('...') == '_'
+
+@pytest.mark.parametrize('name', ['CON', 'con', 'Aux', 'NUL.stl', 'com1', 'LPT9.tar.gz'])
+def testDeviceNamesGetAnUnderscore(name):
+    base, dot, ext = name.partition('.')
+    assert sanitize(name) == base + '_' + dot + ext
+
+def testADeviceNameFollowedBySpacesGetsAnUnderscore():
+    assert sanitize('prn .txt') == 'prn_ .txt'
+
+@pytest.mark.parametrize('name', ['CONSOLE', 'COM10', 'LPT0', 'Null', 'my.CON'])
+def testOtherNamesAreKept(name):
+    assert sanitize(name) == name
+
+def testTheDotsOfTheTemplateAreKept():
+    names = ExportNames('/out', 'con', ['Height'], '{Height}. {index}', '{body}_{params}', True)
+    names.begin(variant(0, ['nul']))
+    assert names.path('stl') == '/out/nul_. 1.stl'
+    assert names.path('stl', 'Aux.') == '/out/Aux__Height_nul_.stl'
+
+def testDefaultNames():
+    names = ExportNames('/out', 'Gear', ['Height', 'Width'])
+    names.begin(variant(0, ['1.5', '2 mm']))
+    assert names.path('stl') == '/out/Gear_Height_1_5_Width_2_mm.stl'
+
+def testTemplateFields():
+    names = ExportNames('/out', 'Gear', ['Height'], '{index:03}-{Height}', '{body}/{index}', True)
+    names.begin(variant(4, ['3']))
+    assert names.path('step') == '/out/005-3.step'
+    assert names.path('stl', 'Tooth:1') == '/out/Tooth_1_5.stl'
+
+def testTemplatesThatDoNotTellVariantsApartAreRejected():
+    with pytest.raises(FilenameError):
+        FilenameTemplate('{doc}.{ext}', ['Height'])
+    with pytest.raises(FilenameError):
+        FilenameTemplate('{doc}_{Height}', ['Height', 'Width'])
+    with pytest.raises(FilenameError):
+        FilenameTemplate('{doc}_{params}', ['Height'], perBody=True)
+    with pytest.raises(FilenameError):
+        FilenameTemplate('{doc}_{unknown}_{params}', ['Height'])
+
+def testCollidingValuesGetAHash():
+    names = ExportNames('/out', 'Gear', ['Height'])
+    paths = []
+    for i, value in enumerate(['1.5', '1_5']):
+        names.begin(variant(i, [value]))
+        paths.append(names.path('stl'))
+    assert paths[0] == '/out/Gear_Height_1_5.stl'
+    assert paths[1] != paths[0]
+    assert names.collisionCount == 1
+
+def testCollidingBodiesGetAHash():
+    names = ExportNames('/out', 'Gear', ['Height'], perBody=True)
+    names.begin(variant(0, ['1']))
+    assert names.path('stl', 'A/B') != names.path('stl', 'A:B')
+
+def testLongNamesAreShortened():
+    names = ExportNames('/out', 'G' * 300, ['Height'], maxPath=100)
+    names.begin(variant(0, ['1']))
+    path = names.path('stl')
+    assert len(path) <= 100
+    assert path.endswith('.stl')
+    assert names.shortenedCount == 1
+
+    # Different names stay different once shortened.
+    names.begin(variant(1, ['2']))
+    assert names.path('stl') != path
+    assert len(path.split('~')[1]) == HASH_DIGITS + len('.stl')
@@ -0,0 +1,40 @@
+from paraparamlib.sweep import SweepPlan, ORDER_NESTED, ORDER_SERPENTINE
+from paraparamlib.health import PruningFrontier, pruneNames
+
+# Visit the variants of the plan as the runner does, failing the variants
+# for which fails(values) is True.  Returns the values of the pruned
+# variants with the values of the failed variant that pruned them.
+def sweep(plan, prune, fails):
+    frontier = PruningFrontier(plan.names, pruneNames(prune))
+    pruned = []
+    for variant in plan:
+        failedIndex = frontier.prunedBy(variant)
+        if failedIndex is not None:
+            pruned.append((variant.values, plan.variantAt(failedIndex).values))
+            continue
+        frontier.visited(variant, fails(variant.values))
+    return pruned
+
+def plan(order=ORDER_NESTED):
+    return SweepPlan.fromRows([['Teeth', 1, 4, 1], ['Module', 1, 3, 1]], order)
+
+# Fails from 3 teeth with a module of 1 and from 2 teeth with a module of 3
+def fails(values):
+    teeth, module = float(values[0]), float(values[1])
+    return (module == 1 and teeth >= 3) or (module == 3 and teeth >= 2)
+
+def testAnOuterAxisOfANestedSweepIsPruned():
+    assert sweep(plan(), 'Teeth', fails) == [
+        (('3.0', '3.0'), ('2.0', '3.0')),
+        (('4.0', '1.0'), ('3.0', '1.0')),
+        (('4.0', '3.0'), ('2.0', '3.0')),
+    ]
+
+def testAnInnerAxisIsPruned():
+    assert sweep(plan(ORDER_SERPENTINE), 'Module', lambda values: float(values[1]) >= 2) == [
+        (('1.0', '3.0'), ('1.0', '2.0')),
+        (('3.0', '3.0'), ('3.0', '2.0')),
+    ]
+
+def testTheFirstVariantOfALineIsNotAFrontier():
+    assert sweep(plan(), 'Teeth', lambda values: True) == []
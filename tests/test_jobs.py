@@ -0,0 +1,65 @@
+import json, os
+
+import pytest
+
+from paraparamlib.jobs import Job, JobQueue, JobError, JOB_FAILED
+
+def writeJob(folder, name, data):
+    with open(os.path.join(folder, name + '.job.json'), 'w') as file:
+        json.dump(data, file)
+
+@pytest.fixture
+def spool(tmp_path):
+    folder = str(tmp_path)
+    with open(os.path.join(folder, 'gear.csv'), 'w') as file:
+        file.write('Height,1,3,1\n')
+    return folder
+
+def testJobsAreClaimedInTheOrderOfTheirNames(spool):
+    writeJob(spool, 'b', { 'params': 'gear.csv' })
+    writeJob(spool, 'a', { 'params': 'gear.csv', 'operations': ['ExportSTL'], 'exportFolder': 'out', 'settings': { '@order': 'Serpentine' } })
+    queue = JobQueue(spool)
+
+    job = queue.nextJob()
+    assert job.name == 'a'
+    assert os.path.isfile(os.path.join(spool, 'a.job.running'))
+    assert job.params == os.path.join(spool, 'gear.csv')
+    assert job.exportFolder == os.path.join(spool, 'out')
+    assert job.settings == { 'order': 'Serpentine' }
+    assert [job.name for job in queue.interruptedJobs()] == ['a']
+    assert queue.nextJob().name == 'b'
+    assert queue.nextJob() is None
+
+@pytest.mark.parametrize('data', [
+    { 'operations': ['ExportSTL'], 'exportFolder': 'out' },
+    { 'params': 'missing.csv' },
+    { 'params': 'gear.csv', 'operations': ['Bogus'] },
+    { 'params': 'gear.csv', 'operations': ['ExportSTL'] },
+    { 'params': 'gear.csv', 'resume': 'yes' },
+    { 'params': 'gear.csv', 'priority': 1 },
+])
+def testAnInvalidJobFails(spool, data):
+    writeJob(spool, 'bad', data)
+    assert JobQueue(spool).nextJob() is None
+    assert os.path.isfile(os.path.join(spool, 'bad.job.failed'))
+    with open(os.path.join(spool, 'bad.status.json')) as file:
+        status = json.load(file)
+    assert status['state'] == JOB_FAILED
+    assert status['message'] != ''
+
+def testAJobIsCancelledByACancelFile(spool):
+    writeJob(spool, 'a', { 'params': 'gear.csv' })
+    job = JobQueue(spool).nextJob()
+    assert not job.cancelRequested()
+    open(job.cancelPath, 'w').close()
+    assert job.cancelRequested()
+
+    job.finish('cancelled')
+    assert os.path.isfile(os.path.join(spool, 'a.job.cancelled'))
+    assert not os.path.exists(job.cancelPath)
+
+def testAJobFileThatIsNotAnObject(spool):
+    with open(os.path.join(spool, 'a.job.running'), 'w') as file:
+        file.write('[]')
+    with pytest.raises(JobError):
+        Job(spool, 'a').load()
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from paraparamlib.journal import SweepJournal, JournalError, loadJournal, isResumable
+
+def testCompletedVariantsAreReadBack(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = SweepJournal.create(path, { 'params': [['A', '1', '3', '1']] })
+    journal.completed(0, { 'stl': ['a.stl'] })
+    journal.completed(1, {})
+    journal.close()
+
+    sweep, completed, finished = loadJournal(path)
+    assert sweep == { 'params': [['A', '1', '3', '1']] }
+    assert completed == { 0: { 'stl': ['a.stl'] }, 1: {} }
+    assert not finished
+    assert isResumable(path)
+
+def testAFinishedSweepIsNotResumable(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = SweepJournal.create(path, {})
+    journal.finish()
+    assert loadJournal(path)[2]
+    assert not isResumable(path)
+
+def testResumeAfterALineCutShortByACrash(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = SweepJournal.create(path, {})
+    journal.completed(0, {})
+    journal.close()
+    with open(path, 'a') as file:
+        file.write('{"index": 1, "outp')
+
+    journal = SweepJournal.reopen(path)
+    journal.completed(1, {})
+    journal.close()
+    assert loadJournal(path)[1] == { 0: {}, 1: {} }
+
+def testAMissingJournal(tmp_path):
+    with pytest.raises(JournalError):
+        loadJournal(str(tmp_path / 'missing.jsonl'))
+    assert not isResumable(str(tmp_path / 'missing.jsonl'))
@@ -0,0 +1,41 @@
+import os
+
+from paraparamlib.manifest import ExportManifest, variantKey, mergeManifests, shardManifestFilename, MANIFEST_FILENAME
+
+def writeFile(path, data):
+    with open(path, 'wb') as file:
+        file.write(data)
+    return str(path)
+
+def testRecordedFilesAreCurrentUntilTheyChange(tmp_path):
+    path = writeFile(tmp_path / 'a.stl', b'solid')
+    key = variantKey('ExportSTL', 'v1', ('A',), ('1.0',))
+
+    manifest = ExportManifest(str(tmp_path))
+    manifest.record(key, 'ExportSTL', 'v1', ('A',), ('1.0',), [path])
+    manifest.save()
+
+    manifest = ExportManifest(str(tmp_path))
+    assert manifest.isCurrent(key)
+    assert not manifest.isCurrent(variantKey('ExportSTL', 'v2', ('A',), ('1.0',)))
+
+    writeFile(path, b'solid changed')
+    assert not manifest.isCurrent(key)
+    os.remove(path)
+    assert not manifest.isCurrent(key)
+
+def testShardManifestsAreMerged(tmp_path):
+    keys = []
+    for shardIndex in (1, 2):
+        path = writeFile(tmp_path / '{}.stl'.format(shardIndex), b'x' * shardIndex)
+        key = variantKey('ExportSTL', 'v1', ('A',), (str(shardIndex),))
+        manifest = ExportManifest(str(tmp_path), shardManifestFilename(shardIndex, 2))
+        manifest.record(key, 'ExportSTL', 'v1', ('A',), (str(shardIndex),), [path])
+        manifest.save()
+        keys.append(key)
+
+    merged, shardPaths = mergeManifests(str(tmp_path))
+    assert len(shardPaths) == 2
+    assert all(merged.isCurrent(key) for key in keys)
+    assert os.path.isfile(tmp_path / MANIFEST_FILENAME)
+    assert all(ExportManifest(str(tmp_path)).isCurrent(key) for key in keys)
@@ -0,0 +1,45 @@
+import pytest
+
+from paraparamlib.paramfile import readParamFile, isDesignTable, DesignTable, ParamFileError
+
+def writeFile(tmp_path, text, encoding='utf-8'):
+    path = tmp_path / 'params.csv'
+    path.write_text(text, encoding=encoding)
+    return str(path)
+
+def testAByteOrderMarkIsSkipped(tmp_path):
+    filename = writeFile(tmp_path, '@order,Serpentine\nHeight,1,4,0.5\n', 'utf-8-sig')
+    assert not isDesignTable(filename)
+    params, options = readParamFile(filename)
+    assert params == [['Height', '1', '4', '0.5']]
+    assert options == { 'order': 'Serpentine' }
+
+def testADesignTableWithAByteOrderMark(tmp_path):
+    filename = writeFile(tmp_path, 'Diameter,Height\n10 mm,20 mm\n', 'utf-8-sig')
+    assert isDesignTable(filename)
+    table = DesignTable(filename)
+    assert table.names == ('Diameter', 'Height')
+    assert [variant.values for variant in table] == [('10 mm', '20 mm')]
+
+def testTheRowsAreCountedAndStreamed(tmp_path):
+    filename = writeFile(tmp_path, '@refresh,Never\nDiameter,Height\n10 mm,20 mm\n\n12 mm,20 mm\n12 mm,35 mm\n')
+    table = DesignTable(filename)
+    assert table.count == 3
+    assert table.options == { 'refresh': 'Never' }
+    assert [variant.values for variant in table] == [('10 mm', '20 mm'), ('12 mm', '20 mm'), ('12 mm', '35 mm')]
+    assert table.offsets is None
+
+def testTheRowsAreIndexedWhenReadByIndex(tmp_path):
+    filename = writeFile(tmp_path, 'Diameter,Height\n10 mm,20 mm\n\n12 mm,20 mm\n12 mm,35 mm\n')
+    table = DesignTable(filename)
+    assert table.variantAt(2).values == ('12 mm', '35 mm')
+    assert list(table.lines) == [2, 4, 5]
+    assert [table.variantAt(i) for i in range(3)] == list(table)
+
+def testAMissingValueGivesItsLine(tmp_path):
+    filename = writeFile(tmp_path, 'Diameter,Height\n10 mm,20 mm\n\n12 mm\n')
+    table = DesignTable(filename)
+    with pytest.raises(ParamFileError, match='line 4'):
+        list(table)
+    with pytest.raises(ParamFileError, match='line 4'):
+        table.variantAt(1)
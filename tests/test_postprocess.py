@@ -0,0 +1,10 @@
+from paraparamlib.postprocess import layoutFolder, LAYOUT_FLAT, LAYOUT_EXTENSION, LAYOUT_FIRST_PARAM
+
+def testLayoutFolders():
+    assert layoutFolder(LAYOUT_FLAT, '/out/Gear.stl', ['Height'], ['10 mm']) == ''
+    assert layoutFolder(LAYOUT_EXTENSION, '/out/Gear.STL.gz', ['Height'], ['10 mm']) == 'stl'
+    assert layoutFolder(LAYOUT_FIRST_PARAM, '/out/Gear.stl', ['Height'], ['10 mm']) == 'Height_10_mm'
+
+def testTheFirstParameterFolderIsCleaned():
+    assert layoutFolder(LAYOUT_FIRST_PARAM, '/out/Gear.stl', ['Height'], ['10/2 mm']) == 'Height_10_2_mm'
+    assert layoutFolder(LAYOUT_FIRST_PARAM, '/out/Gear.stl', ['Height'], ['2.5']) == 'Height_2_5'
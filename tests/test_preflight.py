@@ -0,0 +1,43 @@
+import adsk.core, adsk.fusion
+
+from paraparamlib.sweep import SweepPlan
+from paraparamlib.settings import SweepSettings
+from paraparamlib.sampling import SampledPlan, SAMPLING_RANDOM
+from paraparamlib.preflight import runPreflight
+from paraparamlib.runner import SweepHost, OPERATIONS, OP_EXPORT_STL, OP_EXPORT_STEP
+
+class FakeHost(SweepHost):
+    # A name like the files of the run, which are not exports.
+    def documentName(self):
+        return 'ParaParamSample'
+
+    def valueInput(self, expression):
+        return adsk.core.ValueInput.createByString(expression)
+
+def design():
+    return adsk.fusion.Design([('A', '1 mm', 'mm'), ('B', '1 mm', 'mm')])
+
+def plan():
+    return SweepPlan.fromRows([['A', 1, 3, 1], ['B', 1, 3, 1]])
+
+def testTheSampleExportsAreCounted(tmp_path):
+    des = design()
+    operations = [OPERATIONS[OP_EXPORT_STL], OPERATIONS[OP_EXPORT_STEP]]
+    report = runPreflight(FakeHost(), des, plan(), operations, str(tmp_path), False, SweepSettings())
+    assert report.errors == []
+    assert report.sampleCount == 3
+    assert report.filesPerVariant == 2
+    assert report.bytesPerVariant == 134 + 27
+    assert [param.expression for param in des.userParameters.params] == ['1 mm', '1 mm']
+
+def testASampledPlanRunsItsOwnVariants(tmp_path):
+    sampled = SampledPlan(plan(), SAMPLING_RANDOM, 5, seed=3)
+    report = runPreflight(FakeHost(), design(), sampled, [OPERATIONS[OP_EXPORT_STL]], str(tmp_path), False, SweepSettings())
+    assert report.errors == []
+    assert report.sampleCount == 3
+
+def testAMissingParameterIsAnError(tmp_path):
+    des = adsk.fusion.Design([('A', '1 mm', 'mm')])
+    report = runPreflight(FakeHost(), des, plan(), [], str(tmp_path), False, SweepSettings())
+    assert report.errors == ["The user parameter 'B' does not exist."]
+    assert report.sampleCount == 0
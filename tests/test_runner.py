@@ -0,0 +1,142 @@
+import os
+
+import adsk.core, adsk.fusion
+
+from paraparamlib.sweep import SweepPlan, ORDER_NESTED, ORDER_SERPENTINE
+from paraparamlib.settings import SweepSettings
+from paraparamlib.journal import SweepJournal, loadJournal
+from paraparamlib.archive import ARCHIVE_ZIP
+from paraparamlib.runner import SweepRunner, SweepHost, applyVariant, OPERATIONS, OP_EXPORT_STL, OP_EXPORT_STEP
+
+STL = OPERATIONS[OP_EXPORT_STL]
+STEP = OPERATIONS[OP_EXPORT_STEP]
+
+class FakeHost(SweepHost):
+    def __init__(self):
+        self.messages = []
+
+    def showMessage(self, message):
+        self.messages.append(message)
+
+    def valueInput(self, expression):
+        return adsk.core.ValueInput.createByString(expression)
+
+ROWS = [['A', 1, 3, 1], ['B', 1, 2, 1], ['C', 1, 2, 1]]
+
+def design(bodies=('Body1',)):
+    return adsk.fusion.Design([(row[0], str(row[1])) for row in ROWS], bodies=bodies)
+
+def runSweep(des, folder, operations, order=ORDER_NESTED, settings=None, journal=None, completed=None, exportSTLPerBody=False):
+    if settings is None:
+        settings = SweepSettings()
+    settings.order = order
+    os.makedirs(folder, exist_ok=True)
+    plan = SweepPlan.fromRows(ROWS, order)
+    paramValues = { name: des.userParameters.itemByName(name).expression for name in plan.names }
+    runner = SweepRunner(FakeHost(), des, plan, paramValues, operations, folder, exportSTLPerBody, settings, journal, completed)
+    assert runner.run()
+    return runner
+
+def exportedFiles(folder):
+    return sorted(name for name in os.listdir(folder) if not name.startswith('ParaParam'))
+
+def testEachVariantIsComputedOnce(tmp_path):
+    for order in (ORDER_NESTED, ORDER_SERPENTINE):
+        des = design()
+        runSweep(des, str(tmp_path / order), [], order)
+        assert des.computeCount == 12
+
+def testSerpentineOrderMakesOneAssignmentPerVariant(tmp_path):
+    des = design()
+    runSweep(des, str(tmp_path), [], ORDER_SERPENTINE)
+    # The first variant writes all three expressions, with their units.
+    assert des.assignmentCount == 3 + 11
+
+def testSeveralChangesAreOneModifyParametersCall():
+    des = design()
+    userParams = { name: des.userParameters.itemByName(name) for name in ('A', 'B') }
+    paramValues = { 'A': '1', 'B': '1' }
+    changeCount, elapsed = applyVariant(des, userParams, paramValues, { 'A': '2', 'B': '3' }, adsk.core.ValueInput.createByString)
+    assert changeCount == 2
+    assert des.computeCount == 1
+    assert paramValues == { 'A': '2', 'B': '3' }
+    assert userParams['B'].expression == '3'
+
+def testEveryVariantIsExported(tmp_path):
+    des = design()
+    runSweep(des, str(tmp_path), [STL, STEP])
+    files = exportedFiles(str(tmp_path))
+    assert len(files) == 24
+    assert 'Untitled_A_1_0_B_1_0_C_1_0.stl' in files
+
+def testARerunSkipsTheExportedVariants(tmp_path):
+    runSweep(design(), str(tmp_path), [STL])
+    des = design()
+    runSweep(des, str(tmp_path), [STL])
+    assert des.exportCount == 0
+
+    # A variant whose file is gone is exported again.
+    os.remove(os.path.join(str(tmp_path), 'Untitled_A_2_0_B_1_0_C_2_0.stl'))
+    des = design()
+    runSweep(des, str(tmp_path), [STL])
+    assert des.exportCount == 1
+
+def testAResumedSweepSkipsTheJournalledVariants(tmp_path):
+    folder = str(tmp_path)
+    path = os.path.join(folder, 'ParaParamJournal.jsonl')
+    journal = SweepJournal.create(path, {})
+    runSweep(design(), folder, [STL], journal=journal)
+    journal.close()
+    completed = loadJournal(path)[1]
+    assert sorted(completed) == list(range(12))
+
+    # Forget the last four variants, as if the sweep had stopped there.
+    completed = { index: outputs for index, outputs in completed.items() if index < 8 }
+    for index in range(8, 12):
+        for files in loadJournal(path)[1][index].values():
+            for file in files:
+                os.remove(file)
+    os.remove(os.path.join(folder, 'ParaParamManifest.json'))
+
+    des = design()
+    journal = SweepJournal.reopen(path)
+    runSweep(des, folder, [STL], journal=journal, completed=completed)
+    journal.close()
+    assert des.exportCount == 4
+    assert len(exportedFiles(folder)) == 12
+
+def testARerunSkipsTheArchivedVariants(tmp_path):
+    settings = SweepSettings()
+    settings.archive = ARCHIVE_ZIP
+    runSweep(design(), str(tmp_path), [STL], settings=settings)
+    assert exportedFiles(str(tmp_path)) == []
+
+    des = design()
+    settings = SweepSettings()
+    settings.archive = ARCHIVE_ZIP
+    runSweep(des, str(tmp_path), [STL], settings=settings)
+    assert des.exportCount == 0
+
+def testUnchangedBodiesAreLinked(tmp_path):
+    des = design([('Moving', 'A'), 'Fixed'])
+    runSweep(des, str(tmp_path), [STL], exportSTLPerBody=True)
+    files = exportedFiles(str(tmp_path))
+    assert len(files) == 24
+    assert des.exportCount < 24
+
+def testARerunDoesNotWriteThroughALinkedFile(tmp_path):
+    folder = str(tmp_path / 'exports')
+    runSweep(design([('Moving', 'A'), 'Fixed']), folder, [STL], exportSTLPerBody=True)
+    fixed = os.path.join(folder, 'Untitled_Fixed_A_1_0_B_1_0_C_1_0.stl')
+
+    # A file sharing the inode of an export, like the exports linked to it
+    keep = str(tmp_path / 'keep.stl')
+    os.link(fixed, keep)
+    with open(keep, 'wb') as file:
+        file.write(b'keep')
+
+    os.remove(os.path.join(folder, 'ParaParamManifest.json'))
+    runSweep(design([('Moving', 'A'), 'Fixed']), folder, [STL], exportSTLPerBody=True)
+    with open(keep, 'rb') as file:
+        assert file.read() == b'keep'
+    assert os.path.getsize(fixed) > 4
@@ -0,0 +1,37 @@
+import pytest
+
+from paraparamlib.sweep import SweepPlan
+from paraparamlib.sampling import SampledPlan, sobolPoints, SAMPLING_RANDOM, SAMPLING_LHS, SAMPLING_SOBOL, SAMPLING_HALTON
+import random
+
+def grid():
+    return SweepPlan.fromRows([['A', 1, 10, 1], ['B', 1, 10, 1], ['C', 1, 10, 1]])
+
+@pytest.mark.parametrize('method', [SAMPLING_RANDOM, SAMPLING_LHS, SAMPLING_SOBOL, SAMPLING_HALTON])
+def testSamplesAreDistinctVariantsOfThePlan(method):
+    plan = grid()
+    sampled = SampledPlan(plan, method, 50, seed=1)
+    assert sampled.count == 50
+    assert len(set(sampled.planIndices)) == 50
+    assert all(0 <= index < plan.count for index in sampled.planIndices)
+    assert [variant.index for variant in sampled] == list(range(50))
+
+@pytest.mark.parametrize('method', [SAMPLING_RANDOM, SAMPLING_LHS, SAMPLING_SOBOL, SAMPLING_HALTON])
+def testTheSameSeedGivesTheSameSample(method):
+    assert SampledPlan(grid(), method, 30, seed=7).planIndices == SampledPlan(grid(), method, 30, seed=7).planIndices
+
+def testABudgetAboveThePlanKeepsEveryVariant():
+    assert SampledPlan(grid(), SAMPLING_SOBOL, 5000).planIndices == list(range(1000))
+
+def testSobolPointsAreInTheUnitCube():
+    points = sobolPoints(3, random.Random(0))
+    for i in range(256):
+        point = next(points)
+        assert len(point) == 3
+        assert all(0 <= u < 1 for u in point)
+
+def testSobolFillsEachHalfEvenly():
+    points = sobolPoints(2, random.Random(0))
+    firstPoints = [next(points) for i in range(64)]
+    for dimension in range(2):
+        assert sum(point[dimension] < 0.5 for point in firstPoints) == 32
@@ -0,0 +1,103 @@
+import itertools
+
+import pytest
+
+from paraparamlib.sweep import SweepAxis, SweepPlan, ShardedPlan, shardRange, sampleIndices, variantStem, ORDER_NESTED, ORDER_SERPENTINE, SHARD_STRIDE, SHARD_BLOCK
+
+def values(row):
+    return SweepAxis.fromRow(row).values
+
+def testLinearValuesIncludeTheEnd():
+    assert values(['Height', '0', '0.3', '0.1']) == ['0.0', '0.1', '0.2', '0.3']
+    assert values(['Height', '1', '4', '0.5']) == ['1.0', '1.5', '2.0', '2.5', '3.0', '3.5', '4.0']
+
+def testLinearValuesAreExact():
+    axisValues = values(['Height', '0', '1', '0.1'])
+    assert len(axisValues) == 11
+    assert axisValues[3] == '0.3'
+    assert axisValues[-1] == '1.0'
+
+def testLinearValuesStopBeforeAnEndBetweenSteps():
+    assert values(['Height', '0', '1', '0.3']) == ['0.0', '0.3', '0.6', '0.9']
+
+def testLinearValuesRunDownFromAStartAboveTheEnd():
+    assert values(['Height', '4', '1', '1']) == ['4.0', '3.0', '2.0', '1.0']
+
+def testListGeometricAndLogAxes():
+    assert values(['Width', 'list', '1', '2.5', 'Height*2']) == ['1.0', '2.5', 'Height*2']
+    assert values(['Width', 'geometric', '1', '8', '2']) == ['1.0', '2.0', '4.0', '8.0']
+    assert values(['Width', 'log', '1', '100', '3']) == ['1.0', '10.0', '100.0']
+
+def testInvalidRows():
+    with pytest.raises(ValueError):
+        SweepAxis.fromRow(['Height', '0', '1', '0'])
+    with pytest.raises(ValueError):
+        SweepAxis.fromRow(['Height', 'list'])
+    with pytest.raises(ValueError):
+        SweepAxis.fromRow(['Height', '0', 'x', '1'])
+
+def grid(order=ORDER_NESTED):
+    return SweepPlan.fromRows([['A', 1, 3, 1], ['B', 1, 2, 1], ['C', 1, 4, 1]], order)
+
+def testNestedOrderIsTheProductOfTheAxes():
+    plan = grid()
+    assert [variant.values for variant in plan] == list(itertools.product(*(axis.values for axis in plan.axes)))
+
+@pytest.mark.parametrize('order', [ORDER_NESTED, ORDER_SERPENTINE])
+def testEveryCombinationIsVisitedOnce(order):
+    plan = grid(order)
+    visited = [variant.values for variant in plan]
+    assert len(visited) == plan.count == 24
+    assert len(set(visited)) == plan.count
+
+def testVariantsAreGeneratedByIndex():
+    plan = grid()
+    assert plan.variantAt(5).indices == (0, 1, 1)
+    with pytest.raises(IndexError):
+        plan.variantAt(plan.count)
+
+def testExpressionsHaveTheUnits():
+    plan = SweepPlan.fromRows([['Height', 'list', '1', 'Width*2']])
+    plan.setUnits({ 'Height': 'mm' })
+    assert [variant.expressions for variant in plan] == [('1.0 mm',), ('Width*2',)]
+
+def testSerpentineOrderChangesOneParameterPerStep():
+    plan = grid(ORDER_SERPENTINE)
+    variants = list(plan)
+    for previous, variant in zip(variants, variants[1:]):
+        assert sum(a != b for a, b in zip(previous.values, variant.values)) == 1
+
+@pytest.mark.parametrize('order', [ORDER_NESTED, ORDER_SERPENTINE])
+def testIndexOfAxisIndicesInvertsAxisIndicesAt(order):
+    plan = grid(order)
+    for index in range(plan.count):
+        assert plan.indexOfAxisIndices(plan.axisIndicesAt(index)) == index
+
+def testInvalidOrder():
+    with pytest.raises(ValueError):
+        grid('Spiral')
+
+def testVariantStem():
+    assert variantStem(('Height', 'Width'), ('1.5', '2 mm')) == 'Height_1_5_Width_2_mm'
+
+@pytest.mark.parametrize('mode', [SHARD_STRIDE, SHARD_BLOCK])
+@pytest.mark.parametrize('count, shardCount', [(10, 3), (24, 4), (2, 5), (0, 2)])
+def testShardsAreDisjointAndComplete(mode, count, shardCount):
+    indices = []
+    for shardIndex in range(1, shardCount + 1):
+        indices.extend(shardRange(count, shardIndex, shardCount, mode))
+    assert sorted(indices) == list(range(count))
+
+def testBlockShardsAreContiguous():
+    plan = grid(ORDER_SERPENTINE)
+    shard = ShardedPlan(plan, 2, 3, SHARD_BLOCK)
+    assert list(shard.indices) == list(range(8, 16))
+    assert [variant.index for variant in shard] == list(range(8, 16))
+
+def testInvalidShard():
+    with pytest.raises(ValueError):
+        shardRange(10, 4, 3)
+
+def testSampleIndicesIncludeTheEnds():
+    assert sampleIndices(100, 3) == [0, 50, 99]
+    assert sampleIndices(2, 3) == [0, 1]